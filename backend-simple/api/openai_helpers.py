@@ -1,67 +1,23 @@
-import os
 import logging
 import asyncio
 import time
 from typing import List, Dict, Any, Optional
-from openai import AsyncOpenAI
 from dotenv import load_dotenv
 
-# Load environment variables
+# Load environment variables before the providers read their keys
 load_dotenv()
 
-# Constants for API request timeout
-BASE_TIMEOUT = 30
-CONNECT_TIMEOUT = 10  # Time to establish connection
-BASE_READ_TIMEOUT = 30  # Base time to wait for response
-TIMEOUT_PER_1K_TOKENS = 3  # Additional seconds per 1K tokens
+from api.providers import APIError, provider_router
+from utils.metrics import metrics
 
 # Initialize logger
 logger = logging.getLogger(__name__)
 
-# Get API key from environment variables
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-if not OPENAI_API_KEY:
-    raise ValueError("OPENAI_API_KEY not found in environment variables")
-
-# Initialize OpenAI client - use only documented parameters
-client = AsyncOpenAI(
-    api_key=OPENAI_API_KEY,
-    timeout=BASE_TIMEOUT
-)
-
-def calculate_timeout(num_tokens: int) -> float:
-    """Calculate appropriate timeout based on input token count."""
-    return BASE_TIMEOUT + (num_tokens / 1000) * TIMEOUT_PER_1K_TOKENS
-
-class APIError(Exception):
-    """Custom exception for API errors with handling logic."""
-    def __init__(self, message: str, status_code: Optional[int] = None):
-        self.message = message
-        self.status_code = status_code
-        super().__init__(self.message)
-    
-    async def handle(self, attempt: int, max_retries: int) -> None:
-        """Handle API errors with appropriate backoff based on status code."""
-        if self.status_code:
-            if self.status_code == 429:  # Rate limit
-                wait_time = 2 * (2 ** attempt)
-                logger.warning(f"Rate limited. Waiting {wait_time} seconds...")
-                await asyncio.sleep(wait_time)
-            elif self.status_code >= 500:  # Server error
-                wait_time = 1 * (2 ** attempt)
-                logger.warning(f"Server error. Waiting {wait_time} seconds...")
-                await asyncio.sleep(wait_time)
-            else:  # Client error
-                if attempt < max_retries - 1:
-                    wait_time = 1 * (2 ** attempt)
-                    logger.warning(f"Client error. Waiting {wait_time} seconds...")
-                    await asyncio.sleep(wait_time)
-                else:
-                    logger.error(f"Unrecoverable client error: {self.message}")
-        else:
-            wait_time = 1 * (2 ** attempt)
-            logger.warning(f"Unknown error. Waiting {wait_time} seconds...")
-            await asyncio.sleep(wait_time)
+# Calls go through the provider router; at least one provider key must be set
+if not provider_router.providers:
+    raise ValueError(
+        "No LLM provider configured; set OPENAI_API_KEY (or GROQ_API_KEY, CEREBRAS_API_KEY, LLAMA_API_KEY)"
+    )
 
 async def make_api_call(
     messages: List[Dict[str, str]],
@@ -70,34 +26,25 @@ async def make_api_call(
     max_tokens: int = 1000,
     timeout: Optional[float] = None
 ) -> str:
-    """Make an API call to OpenAI with appropriate error handling."""
+    """Make an API call on the best provider for the model, failing over between providers.
+
+    Without a timeout, each attempt gets one derived from the provider's
+    observed latency for calls of this size.
+    """
     try:
-        # Calculate timeout if not provided
-        if timeout is None:
-            # Estimate token count from messages
-            from utils.token_counter import count_tokens
-            input_tokens = sum(count_tokens(msg["content"]) for msg in messages)
-            timeout = calculate_timeout(input_tokens)
-        
-        # Make the API call
-        response = await asyncio.wait_for(
-            client.chat.completions.create(
-                model=model_name,
-                messages=messages,
-                temperature=temperature,
-                max_tokens=max_tokens
-            ),
+        return await provider_router.complete(
+            messages,
+            model_name,
+            temperature=temperature,
+            max_tokens=max_tokens,
             timeout=timeout
         )
+
+    except asyncio.CancelledError:
+        # Job cancelled or a hedge lost the race; the HTTP request is aborted with it
+        metrics.increment("llm_calls_cancelled", model=model_name)
+        raise
         
-        return response.choices[0].message.content
-        
-    except asyncio.TimeoutError:
-        logger.error(f"Request timed out after {timeout} seconds")
-        raise APIError(f"Request timed out after {timeout} seconds")
-        
-    except Exception as e:
-        status_code = getattr(e, "status_code", None)
-        error_message = str(e)
-        logger.error(f"OpenAI API error: {error_message}")
-        raise APIError(error_message, status_code) 
\ No newline at end of file
+    except APIError as e:
+        logger.error(f"LLM API error: {e.message}")
+        raise
@@ -0,0 +1,560 @@
+"""
+LLM providers behind one async interface, and a router across them.
+
+Groq, Cerebras, OpenAI and LlamaAPI all expose OpenAI-compatible chat
+endpoints, so each provider is an AsyncOpenAI client pointed at its base
+URL. A provider is configured when at least one API key is set for it;
+with several keys (NAME_API_KEYS) each key has its own client and rate
+limits, and calls go to the key with the most headroom (utils.credential_pool). Models list the
+providers that serve them (MODEL_CONFIGS[...]["providers"]); the router
+sends each call to the serving provider with the best recent latency and
+free capacity, and fails over to the next one when a call fails with a
+retryable error. A provider that keeps failing is marked degraded and only
+used again after a cool-down, or when nothing else is left. Calls are only
+sent once the target's shared RPM/TPM buckets can cover them
+(see utils.rate_limiter), so load spills over to providers with capacity.
+Every response's rate-limit headers are fed back into those buckets.
+The router is the only layer that retries (the clients' own retries are
+off), and every retry draws on the job's budget (utils.retry_budget). All
+attempts of one call carry the same Idempotency-Key header. Each attempt's
+timeout comes from the target's observed latency for calls of that size
+(utils.latency_tracker) and grows on later retry rounds.
+"""
+
+import os
+import time
+import uuid
+import inspect
+import asyncio
+import logging
+from typing import Any, AsyncIterator, Dict, List, Mapping, Optional, Set, Tuple
+from openai import AsyncOpenAI
+
+from utils.metrics import metrics
+from utils.model_constants import MODEL_CONFIGS, get_model_config
+from utils.token_counter import count_tokens
+from utils.rate_limiter import parse_rate_limit_headers, rate_limiter
+from utils.credential_pool import AUTH_FAILURE_STATUS_CODES, Credential, CredentialPool, load_api_keys
+from utils.retry_budget import backoff_delay, take_retry
+from utils.latency_tracker import latency_tracker
+
+PROVIDER_SPECS = {
+    "openai": {"api_key_env": "OPENAI_API_KEY", "base_url": None},
+    "groq": {"api_key_env": "GROQ_API_KEY", "base_url": "https://api.groq.com/openai/v1"},
+    "cerebras": {"api_key_env": "CEREBRAS_API_KEY", "base_url": "https://api.cerebras.ai/v1"},
+    "llamaapi": {"api_key_env": "LLAMA_API_KEY", "base_url": "https://api.llama-api.com"},
+}
+LATENCY_SMOOTHING = 0.2  # Weight of the newest call in the moving latency average
+DEGRADED_AFTER_FAILURES = 3  # Consecutive failures before a provider is skipped
+DEGRADED_COOLDOWN_SECONDS = float(os.getenv("PROVIDER_COOLDOWN_SECONDS", 30))
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+TIMEOUT_RETRY_GROWTH = 0.5  # Extra fraction of the timeout per retry round
+
+logger = logging.getLogger(__name__)
+
+class APIError(Exception):
+    """Custom exception for API errors with handling logic."""
+    def __init__(self, message: str, status_code: Optional[int] = None, headers: Optional[Mapping[str, str]] = None):
+        self.message = message
+        self.status_code = status_code
+        self.headers = headers or {}
+        super().__init__(self.message)
+
+    @property
+    def retryable(self) -> bool:
+        """Whether another attempt (here or on another provider) may succeed."""
+        return self.status_code is None or self.status_code in RETRYABLE_STATUS_CODES
+
+    async def handle(self, attempt: int, max_retries: int) -> None:
+        """Handle API errors with appropriate backoff based on status code."""
+        if self.status_code:
+            if self.status_code == 429:  # Rate limit
+                wait_time = 2 * (2 ** attempt)
+                logger.warning(f"Rate limited. Waiting {wait_time} seconds...")
+                await asyncio.sleep(wait_time)
+            elif self.status_code >= 500:  # Server error
+                wait_time = 1 * (2 ** attempt)
+                logger.warning(f"Server error. Waiting {wait_time} seconds...")
+                await asyncio.sleep(wait_time)
+            else:  # Client error
+                if attempt < max_retries - 1:
+                    wait_time = 1 * (2 ** attempt)
+                    logger.warning(f"Client error. Waiting {wait_time} seconds...")
+                    await asyncio.sleep(wait_time)
+                else:
+                    logger.error(f"Unrecoverable client error: {self.message}")
+        else:
+            wait_time = 1 * (2 ** attempt)
+            logger.warning(f"Unknown error. Waiting {wait_time} seconds...")
+            await asyncio.sleep(wait_time)
+
+def as_api_error(error: Exception, provider: str) -> APIError:
+    if isinstance(error, APIError):
+        return error
+    if isinstance(error, asyncio.TimeoutError):
+        return APIError(f"{provider}: request timed out", 408)
+    response = getattr(error, "response", None)
+    return APIError(
+        f"{provider}: {str(error)}",
+        getattr(error, "status_code", None),
+        getattr(response, "headers", None)
+    )
+
+async def _parsed(raw: Any) -> Any:
+    """Parse a raw response (sync in older openai clients, awaitable in newer)."""
+    parsed = raw.parse()
+    return await parsed if inspect.isawaitable(parsed) else parsed
+
+class Provider:
+    """One OpenAI-compatible endpoint and a pooled client per API key."""
+
+    def __init__(self, name: str, api_keys: List[str], base_url: Optional[str] = None):
+        self.name = name
+        self.pool = CredentialPool(name, api_keys)
+        # Retries are the router's job; a client retrying too would multiply them
+        self._clients = {
+            credential.key_id: AsyncOpenAI(api_key=credential.api_key, base_url=base_url, max_retries=0)
+            for credential in self.pool.credentials
+        }
+
+    def limit_key(self, model: str, credential: Credential) -> str:
+        """Rate-limit bucket for this provider, model and API key."""
+        return f"{self.name}:{model}:{credential.key_id}"
+
+    def client(self, credential: Optional[Credential] = None) -> AsyncOpenAI:
+        """Client for a key (default: the first one)."""
+        credential = credential or self.pool.credentials[0]
+        return self._clients[credential.key_id]
+
+    async def complete(
+        self,
+        messages: List[Dict[str, str]],
+        model: str,
+        temperature: float = 0.7,
+        max_tokens: int = 1000,
+        headers: Optional[Dict[str, str]] = None,
+        credential: Optional[Credential] = None,
+        idempotency_key: Optional[str] = None
+    ) -> str:
+        """Return the full completion text; pass a dict as headers to receive the response headers."""
+        raw = await self.client(credential).chat.completions.with_raw_response.create(
+            model=model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            extra_headers={"Idempotency-Key": idempotency_key} if idempotency_key else None
+        )
+        if headers is not None:
+            headers.update(raw.headers)
+        response = await _parsed(raw)
+        return response.choices[0].message.content
+
+    async def stream(
+        self,
+        messages: List[Dict[str, str]],
+        model: str,
+        temperature: float = 0.7,
+        max_tokens: int = 1000,
+        headers: Optional[Dict[str, str]] = None,
+        credential: Optional[Credential] = None,
+        idempotency_key: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        """Yield completion text as it is generated; headers are filled before the first fragment."""
+        raw = await self.client(credential).chat.completions.with_raw_response.create(
+            model=model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            stream=True,
+            extra_headers={"Idempotency-Key": idempotency_key} if idempotency_key else None
+        )
+        if headers is not None:
+            headers.update(raw.headers)
+        response = await _parsed(raw)
+        async for chunk in response:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+    def count_tokens(self, text: str) -> int:
+        """Approximate prompt size (cl100k; close enough for Llama-family models)."""
+        return count_tokens(text)
+
+    def limits(self, model_name: str) -> Dict[str, int]:
+        """Requests and tokens per minute each of this provider's keys allows for a model."""
+        model_config = get_model_config(model_name)
+        served = model_config.get("providers", {}).get(self.name, {})
+        return {
+            "requests_per_minute": served.get("requests_per_minute", model_config["requests_per_minute"]),
+            "tokens_per_minute": served.get("tokens_per_minute", model_config["tokens_per_minute"]),
+            "max_concurrent_requests": served.get(
+                "max_concurrent_requests", model_config["max_concurrent_requests"]
+            ),
+        }
+
+class TargetStats:
+    """Recent health of one (provider, model) pair."""
+
+    def __init__(self):
+        self.latency: Optional[float] = None
+        self.in_flight = 0
+        self.consecutive_failures = 0
+        self.degraded_until = 0.0
+
+    @property
+    def degraded(self) -> bool:
+        return time.monotonic() < self.degraded_until
+
+    def record_success(self, seconds: float) -> None:
+        self.consecutive_failures = 0
+        self.degraded_until = 0.0
+        if self.latency is None:
+            self.latency = seconds
+        else:
+            self.latency += LATENCY_SMOOTHING * (seconds - self.latency)
+
+    def record_failure(self) -> bool:
+        """Count a failure; True if it just tipped the target into degraded."""
+        self.consecutive_failures += 1
+        if self.consecutive_failures >= DEGRADED_AFTER_FAILURES and not self.degraded:
+            self.degraded_until = time.monotonic() + DEGRADED_COOLDOWN_SECONDS
+            return True
+        return False
+
+class ProviderRouter:
+    def __init__(self, providers: Dict[str, Provider]):
+        self.providers = providers
+        self._stats: Dict[Tuple[str, str], TargetStats] = {}
+
+    def stats(self, provider: str, model_name: str) -> TargetStats:
+        key = (provider, model_name)
+        if key not in self._stats:
+            self._stats[key] = TargetStats()
+        return self._stats[key]
+
+    def targets(self, model_name: str) -> List[Tuple[Provider, str]]:
+        """
+        Configured (provider, provider model id) pairs for a model, best first.
+
+        Healthy targets come before degraded ones. Among them, the score is
+        the recent latency scaled up by how busy the target is relative to
+        its concurrency limit; untried targets go first so every provider
+        gets measured.
+        """
+        # Models without a config are passed straight through to OpenAI
+        served = MODEL_CONFIGS.get(model_name, {}).get("providers") or {"openai": {"model": model_name}}
+        candidates = []
+        for name, spec in served.items():
+            provider = self.providers.get(name)
+            if provider is None:
+                continue
+            keys = sum(1 for credential in provider.pool.credentials if not credential.quarantined)
+            if not keys:
+                continue
+            stats = self.stats(name, model_name)
+            capacity = max(1, provider.limits(model_name)["max_concurrent_requests"] * keys)
+            load = stats.in_flight / capacity
+            score = -1.0 if stats.latency is None else stats.latency * (1 + load)
+            candidates.append(((stats.degraded, load >= 1, score), provider, spec["model"]))
+        candidates.sort(key=lambda candidate: candidate[0])
+        return [(provider, model) for _, provider, model in candidates]
+
+    def _credentials(self, provider: Provider, model: str, tried: Set[str]) -> List[Credential]:
+        """Usable keys of a provider not yet tried for this call, most headroom first."""
+        available = provider.pool.available(
+            lambda credential: rate_limiter.headroom(provider.limit_key(model, credential))
+        )
+        return [credential for credential in available if credential.key_id not in tried]
+
+    async def _admit(
+        self,
+        remaining: List[Tuple[Provider, str]],
+        model_name: str,
+        tokens: int,
+        tried: Set[str]
+    ) -> Optional[Tuple[Provider, str, Credential]]:
+        """
+        Take the best remaining target and key whose rate limits can cover the call.
+
+        Degraded targets are only tried once no healthy one is left. If none
+        has capacity, waits until the soonest one will. Targets without an
+        untried usable key are dropped from remaining; None once it is empty.
+        """
+        while True:
+            for target in list(remaining):
+                if not self._credentials(target[0], target[1], tried):
+                    remaining.remove(target)
+            if not remaining:
+                return None
+            pool = [target for target in remaining if not self.stats(target[0].name, model_name).degraded]
+            pool = pool or list(remaining)
+
+            waits = []
+            for provider, model in pool:
+                limits = provider.limits(model_name)
+                for credential in self._credentials(provider, model, tried):
+                    wait = await rate_limiter.reserve(
+                        provider.limit_key(model, credential),
+                        limits["requests_per_minute"],
+                        limits["tokens_per_minute"],
+                        tokens
+                    )
+                    if wait <= 0:
+                        return provider, model, credential
+                    waits.append(wait)
+            metrics.increment("rate_limit_waits", model=model_name)
+            logger.info(f"All providers for {model_name} at their rate limit, waiting {min(waits):.2f}s")
+            await asyncio.sleep(min(waits))
+
+    async def _observe(
+        self,
+        provider: Provider,
+        model: str,
+        model_name: str,
+        credential: Credential,
+        headers: Mapping[str, str]
+    ) -> None:
+        """Feed a response's rate-limit headers to the limiter and the remaining-capacity gauges."""
+        if not headers:
+            return
+        observed = parse_rate_limit_headers(headers)
+        limits = provider.limits(model_name)
+        await rate_limiter.observe(
+            provider.limit_key(model, credential),
+            limits["requests_per_minute"],
+            limits["tokens_per_minute"],
+            observed
+        )
+        for kind in ("requests", "tokens"):
+            remaining = observed[f"remaining_{kind}"]
+            if remaining is not None:
+                metrics.set_gauge(
+                    "rate_limit_remaining", remaining,
+                    provider=provider.name, model=model, key=credential.key_id, kind=kind
+                )
+
+    def _record_error(
+        self,
+        error: APIError,
+        provider: Provider,
+        model: str,
+        model_name: str,
+        credential: Credential,
+        remaining: List[Tuple[Provider, str]]
+    ) -> None:
+        """
+        Account for a failed attempt and decide where the next one may go.
+
+        An auth failure quarantines the key and leaves the provider's other
+        keys in play; so does a 429, which is per key. Other client errors
+        (400, 422, ...) are the request's fault and leave the provider's
+        health alone. Any other error is taken as the provider's, so its
+        other keys are skipped for this call.
+        """
+        metrics.increment("provider_calls", provider=provider.name, model=model_name, outcome="error")
+        if error.status_code in AUTH_FAILURE_STATUS_CODES:
+            provider.pool.quarantine(credential, error.message)
+            return
+        if error.status_code is not None and 400 <= error.status_code < 500 and error.status_code not in RETRYABLE_STATUS_CODES:
+            return
+        if self.stats(provider.name, model_name).record_failure():
+            logger.warning(f"{provider.name} degraded for {model_name}, cooling down")
+        if error.status_code != 429 and (provider, model) in remaining:
+            remaining.remove((provider, model))
+
+    async def _prepare_retry(
+        self,
+        error: APIError,
+        model_name: str,
+        attempt: int,
+        targets: List[Tuple[Provider, str]],
+        tried: Set[str],
+        round_num: int
+    ) -> int:
+        """
+        Decide whether a failed call may try again, and where.
+
+        Each retry - failover or another round - takes one from the job's
+        retry budget. Once every target has failed, targets and tried are
+        refilled for another round after a backoff (none after a 429; the
+        rate limiter already holds that key until it may be used again).
+
+        Returns:
+            The round number for the next attempt
+
+        Raises:
+            APIError: error itself, if it is not retryable or no retry is left
+        """
+        if not error.retryable and error.status_code not in AUTH_FAILURE_STATUS_CODES:
+            raise error
+        if not take_retry(attempt, model_name):
+            raise error
+        if not any(self._credentials(provider, model, tried) for provider, model in targets):
+            targets[:] = self.targets(model_name)
+            tried.clear()
+            if error.status_code != 429:
+                delay = backoff_delay(round_num)
+                logger.warning(f"Every target for {model_name} failed, retrying in {delay:.2f}s: {error.message}")
+                await asyncio.sleep(delay)
+            round_num += 1
+        return round_num
+
+    async def complete(
+        self,
+        messages: List[Dict[str, str]],
+        model_name: str,
+        temperature: float = 0.7,
+        max_tokens: int = 1000,
+        timeout: Optional[float] = None
+    ) -> str:
+        """
+        Complete on the best target and key for the model, retrying on retryable errors.
+
+        Without an explicit timeout, each attempt gets the target's latency-based
+        timeout (see utils.latency_tracker).
+
+        Raises:
+            APIError: A non-retryable error straight away, or the last error
+                once the call or the job is out of retries
+        """
+        targets = self.targets(model_name)
+        if not targets:
+            raise APIError(f"No configured provider serves {model_name}", 400)
+
+        # Reserve the worst case up front; providers count max_tokens against TPM too
+        input_tokens = sum(count_tokens(message["content"]) for message in messages)
+        tokens = input_tokens + max_tokens
+        idempotency_key = uuid.uuid4().hex
+        tried: Set[str] = set()
+        last_error: Optional[APIError] = None
+        attempt = 0
+        round_num = 0
+        while True:
+            admitted = await self._admit(targets, model_name, tokens, tried)
+            if admitted is None:
+                break
+            provider, model, credential = admitted
+            tried.add(credential.key_id)
+            attempt += 1
+            if last_error is not None:
+                metrics.increment("provider_failovers", provider=provider.name, model=model_name)
+                logger.warning(f"Retrying {model_name} on {provider.name}: {last_error.message}")
+            stats = self.stats(provider.name, model_name)
+            stats.in_flight += 1
+            credential.in_flight += 1
+            attempt_timeout = timeout
+            if attempt_timeout is None:
+                attempt_timeout = latency_tracker.timeout(model_name, input_tokens, provider.name)
+                attempt_timeout *= 1 + TIMEOUT_RETRY_GROWTH * round_num
+            start = time.monotonic()
+            headers: Dict[str, str] = {}
+            try:
+                content = await asyncio.wait_for(
+                    provider.complete(
+                        messages, model, temperature, max_tokens,
+                        headers=headers, credential=credential, idempotency_key=idempotency_key
+                    ),
+                    timeout=attempt_timeout
+                )
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                last_error = as_api_error(e, provider.name)
+                if last_error.status_code == 408:
+                    # The call took at least this long; keep the timeout from ratcheting down
+                    latency_tracker.record(model_name, input_tokens, attempt_timeout, provider.name)
+                    logger.warning(f"{provider.name} timed out on {model_name} after {attempt_timeout:.1f}s")
+                await self._observe(provider, model, model_name, credential, last_error.headers)
+                self._record_error(last_error, provider, model, model_name, credential, targets)
+                round_num = await self._prepare_retry(last_error, model_name, attempt, targets, tried, round_num)
+                continue
+            finally:
+                stats.in_flight -= 1
+                credential.in_flight -= 1
+
+            elapsed = time.monotonic() - start
+            stats.record_success(elapsed)
+            latency_tracker.record(model_name, input_tokens, elapsed, provider.name)
+            await self._observe(provider, model, model_name, credential, headers)
+            metrics.increment("provider_calls", provider=provider.name, model=model_name, outcome="ok")
+            return content
+
+        raise last_error or APIError(f"No usable API key for {model_name}", 401)
+
+    async def stream(
+        self,
+        messages: List[Dict[str, str]],
+        model_name: str,
+        temperature: float = 0.7,
+        max_tokens: int = 1000
+    ) -> AsyncIterator[str]:
+        """
+        Stream from the best target and key for the model.
+
+        Retries only until the first fragment arrives; after that an error
+        is raised, since the caller already has part of the answer.
+        """
+        targets = self.targets(model_name)
+        if not targets:
+            raise APIError(f"No configured provider serves {model_name}", 400)
+
+        tokens = sum(count_tokens(message["content"]) for message in messages) + max_tokens
+        idempotency_key = uuid.uuid4().hex
+        tried: Set[str] = set()
+        last_error: Optional[APIError] = None
+        attempt = 0
+        round_num = 0
+        while True:
+            admitted = await self._admit(targets, model_name, tokens, tried)
+            if admitted is None:
+                break
+            provider, model, credential = admitted
+            tried.add(credential.key_id)
+            attempt += 1
+            if last_error is not None:
+                metrics.increment("provider_failovers", provider=provider.name, model=model_name)
+            stats = self.stats(provider.name, model_name)
+            stats.in_flight += 1
+            credential.in_flight += 1
+            start = time.monotonic()
+            started = False
+            headers: Dict[str, str] = {}
+            try:
+                async for fragment in provider.stream(
+                    messages, model, temperature, max_tokens,
+                    headers=headers, credential=credential, idempotency_key=idempotency_key
+                ):
+                    if not started:
+                        started = True
+                        await self._observe(provider, model, model_name, credential, headers)
+                    yield fragment
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                last_error = as_api_error(e, provider.name)
+                await self._observe(provider, model, model_name, credential, last_error.headers)
+                self._record_error(last_error, provider, model, model_name, credential, targets)
+                if started:
+                    raise last_error
+                round_num = await self._prepare_retry(last_error, model_name, attempt, targets, tried, round_num)
+                continue
+            finally:
+                stats.in_flight -= 1
+                credential.in_flight -= 1
+
+            stats.record_success(time.monotonic() - start)
+            metrics.increment("provider_calls", provider=provider.name, model=model_name, outcome="ok")
+            return
+
+        raise last_error or APIError(f"No usable API key for {model_name}", 401)
+
+def configured_providers() -> Dict[str, Provider]:
+    """Providers with at least one API key set in the environment."""
+    providers = {}
+    for name, spec in PROVIDER_SPECS.items():
+        api_keys = load_api_keys(spec["api_key_env"])
+        if api_keys:
+            providers[name] = Provider(name, api_keys, spec["base_url"])
+    return providers
+
+# Shared router for the process
+provider_router = ProviderRouter(configured_providers())
@@ -11,6 +11,7 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 # Import centralized routers
 from routers import routers
+from utils.metrics import metrics
 
 # Configure logging
 logging.basicConfig(
@@ -47,6 +48,11 @@ app.add_middleware(
 async def health_check():
     return {"status": "healthy"}
 
+# Per-process counters (cache hits/misses, etc.)
+@app.get("/metrics")
+async def get_metrics():
+    return metrics.snapshot()
+
 # Include all routers from the registry
 for router_config in routers.values():
     app.include_router(
@@ -0,0 +1,16 @@
+"""
+Prompt template for summarizing several short texts in one request.
+"""
+
+BATCH_SUMMARY_PROMPT = """You are a precise summarization assistant. Below are NUM_PARTS separate texts, each between \
+<part id="N"> and </part> tags. Summarize EACH text on its own in about TARGET_TOKENS tokens, following these rules:
+
+1. Keep title and author if available
+2. Use a conversational tone
+3. Include all key points, main arguments, and important details
+4. Do not mix content between texts
+5. Do not include: references, citations, release notes, trademarks, source code, logos, disclaimers, legal notices, or appendices
+
+Reply with ONLY a JSON array of NUM_PARTS strings, the summary of part 1 first, in part order. No other text.
+
+PARTS_TEXT"""
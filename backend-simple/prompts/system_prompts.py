@@ -6,4 +6,7 @@ System prompts for different tasks.
 SUMMARY_SYSTEM_PROMPT = "You are a helpful assistant that summarizes text accurately."
 
 # System prompt for combining summaries
-COMBINE_SUMMARIES_SYSTEM_PROMPT = "You are a helpful assistant that combines text summaries." 
\ No newline at end of file
+COMBINE_SUMMARIES_SYSTEM_PROMPT = "You are a helpful assistant that combines text summaries." 
+
+# System prompt for summarizing several texts in one request
+BATCH_SUMMARY_SYSTEM_PROMPT = "You are a helpful assistant that summarizes texts accurately and replies in JSON."
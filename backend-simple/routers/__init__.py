@@ -1,4 +1,6 @@
 from .summary import router as summary_router
+from .notebook import router as notebook_router
+from .tree import router as tree_router
 
 # Create router registry
 routers = {
@@ -6,5 +8,15 @@ routers = {
         "router": summary_router,
         "prefix": "/api",
         "tags": ["summary"]
+    },
+    "notebook": {
+        "router": notebook_router,
+        "prefix": "/api",
+        "tags": ["notebook"]
+    },
+    "tree": {
+        "router": tree_router,
+        "prefix": "/api",
+        "tags": ["tree"]
     }
 } 
\ No newline at end of file
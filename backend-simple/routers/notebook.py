@@ -0,0 +1,70 @@
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel
+from typing import Dict, Any, List, Optional
+import logging
+
+from utils.chunk_handler import combine_summaries
+from utils.source_store import source_store
+from utils.decorators import timeit
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+# Create router
+router = APIRouter()
+
+class NotebookSummaryRequest(BaseModel):
+    notebookId: str
+    sourceIds: List[str]
+    model_name: Optional[str] = "gpt-3.5-turbo"
+
+@router.post("/notebooks/summary")
+@timeit
+async def summarize_notebook(request: NotebookSummaryRequest) -> Dict[str, Any]:
+    """Summarize a notebook from its sources' stored summaries.
+
+    Sources must have been summarized with a sourceId. Only the cross-source
+    reduce runs here - usually one call, or a few for large notebooks - and
+    it is cached, so an unchanged notebook costs nothing the second time.
+    """
+    if not request.sourceIds:
+        raise HTTPException(
+            status_code=400,
+            detail="At least one source id is required"
+        )
+
+    states = await source_store.get_many(request.sourceIds)
+    summarized = [
+        source_id for source_id in request.sourceIds
+        if states[source_id] and states[source_id].get("summary")
+    ]
+    missing = [source_id for source_id in request.sourceIds if source_id not in summarized]
+    if not summarized:
+        raise HTTPException(
+            status_code=404,
+            detail=f"No stored summaries for notebook {request.notebookId}; summarize its sources first"
+        )
+    if missing:
+        logger.warning(f"Notebook {request.notebookId}: no stored summary for {len(missing)} sources")
+
+    try:
+        summary = await combine_summaries(
+            [states[source_id]["summary"] for source_id in summarized],
+            request.model_name
+        )
+    except Exception as e:
+        logger.error(f"Error summarizing notebook {request.notebookId}: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error summarizing notebook: {str(e)}"
+        )
+
+    return {
+        "notebookId": request.notebookId,
+        "summary": summary,
+        "sources": summarized,
+        "missing_sources": missing,
+        "partial_sources": [
+            source_id for source_id in summarized if states[source_id].get("partial")
+        ]
+    }
@@ -6,8 +6,14 @@ import requests
 from bs4 import BeautifulSoup
 from fastapi.responses import JSONResponse
 import os
+import uuid
 
-from utils.chunk_handler import process_text_document, get_processing_status
+from utils.chunk_handler import process_text_document
+from utils.job_registry import ProcessingStatus, job_registry
+from utils.single_flight import single_flight, job_key
+from utils.metrics import metrics
+from utils.reduction_planner import plan_candidates
+from utils.token_counter import count_tokens
 from utils.decorators import timeit
 
 # Initialize logger
@@ -20,23 +26,124 @@ router = APIRouter()
 class TextSummaryRequest(BaseModel):
     text: str
     model_name: Optional[str] = "gpt-3.5-turbo"
+    sourceId: Optional[str] = None
+    dry_run: Optional[bool] = False
+    deadline_seconds: Optional[float] = None
+    token_budget: Optional[int] = None
+    cost_budget: Optional[float] = None
+    extractive_ratio: Optional[float] = None
 
 class WebsiteSourceRequest(BaseModel):
     url: str
     notebookId: Optional[str] = None
     userId: Optional[str] = None
     model_name: Optional[str] = "gpt-3.5-turbo"
+    dry_run: Optional[bool] = False
+    deadline_seconds: Optional[float] = None
+    token_budget: Optional[int] = None
+    cost_budget: Optional[float] = None
+    extractive_ratio: Optional[float] = None
 
 # New unified source request model
 class SourceRequest(BaseModel):
     name: str
     type: Literal["TEXT", "WEBSITE"]
     content: str
+    sourceId: Optional[str] = None
     notebookId: Optional[str] = None
     userId: Optional[str] = None
     model_name: Optional[str] = "gpt-3.5-turbo"
+    dry_run: Optional[bool] = False
+    deadline_seconds: Optional[float] = None
+    token_budget: Optional[int] = None
+    cost_budget: Optional[float] = None
+    extractive_ratio: Optional[float] = None
 
-@router.post("/summarize")
+def request_options(request: BaseModel) -> Dict[str, Any]:
+    """Deadline, budget and extractive fields of a request, as process_text_document kwargs."""
+    return {
+        "deadline_seconds": request.deadline_seconds,
+        "token_budget": request.token_budget,
+        "cost_budget": request.cost_budget,
+        "extractive_ratio": request.extractive_ratio,
+    }
+
+async def start_summary_job(
+    text: str,
+    model_name: str,
+    source_id: Optional[str] = None,
+    dry_run: bool = False,
+    **options
+) -> JSONResponse:
+    """Start summarizing text in the background and return 202 with the job id.
+
+    With a source_id, a re-submitted source is only re-summarized where it changed.
+    options are passed to process_text_document: deadline_seconds, token_budget
+    and cost_budget bound the job (the result is then flagged partial if not
+    every chunk could be summarized); extractive_ratio enables the extractive pass.
+    With dry_run, nothing is summarized; the reduction plan and the rejected
+    alternatives are returned instead.
+    An identical request (same text, model and options) that is already
+    running is not started again: the response carries that job's id and
+    "coalesced": true. Its source_id is recorded on the running job, which
+    stores the source state and summary tree under it as well.
+    """
+    if dry_run:
+        candidates = plan_candidates(count_tokens(text), model_name)
+        return JSONResponse(
+            status_code=200,
+            content={
+                "dry_run": True,
+                "plan": candidates[0].to_dict(),
+                "candidates": [plan.to_dict() for plan in candidates]
+            }
+        )
+
+    # The job is only created once it is known to run; attached requests reuse the running one
+    job_id = uuid.uuid4().hex
+    key = job_key(text, model_name, options)
+    in_flight_job_id = await single_flight.claim(key, job_id, source_id)
+    if in_flight_job_id:
+        metrics.increment("jobs_coalesced")
+        logger.info(f"Attached request to in-flight summary job {in_flight_job_id}")
+        status = await job_registry.get(in_flight_job_id)
+        return JSONResponse(
+            status_code=202,
+            content={
+                "job_id": in_flight_job_id,
+                "status": status["status"] if status else ProcessingStatus.PENDING,
+                "status_url": f"/api/status/{in_flight_job_id}",
+                "coalesced": True
+            }
+        )
+
+    progress = job_registry.create(job_id)
+
+    async def attached_source_ids():
+        # Releasing returns the attached sources; later requests start a new (cached) job
+        return await single_flight.release(key, job_id)
+
+    async def run_job():
+        try:
+            return await process_text_document(
+                text, model_name, progress=progress, source_id=source_id,
+                attached_source_ids=attached_source_ids, **options
+            )
+        finally:
+            await single_flight.release(key, job_id)
+
+    job_registry.run_in_background(progress, run_job())
+    logger.info(f"Started summary job {progress.job_id}")
+    return JSONResponse(
+        status_code=202,
+        content={
+            "job_id": progress.job_id,
+            "status": progress.status,
+            "status_url": f"/api/status/{progress.job_id}"
+        }
+    )
+
+@router.post("/summarize", status_code=202)
 @timeit
 async def summarize_text(request: TextSummaryRequest) -> Dict[str, Any]:
     """Summarize text content directly."""
@@ -49,8 +156,10 @@ async def summarize_text(request: TextSummaryRequest) -> Dict[str, Any]:
                 detail="Text content is required"
             )
             
-        result = await process_text_document(request.text, request.model_name)
-        return result
+        return await start_summary_job(
+            request.text, request.model_name, request.sourceId, request.dry_run,
+            **request_options(request)
+        )
         
     except Exception as e:
         logger.error(f"Error processing text: {str(e)}")
@@ -59,7 +168,7 @@ async def summarize_text(request: TextSummaryRequest) -> Dict[str, Any]:
             detail=f"Error processing text: {str(e)}"
         )
 
-@router.post("/website")
+@router.post("/website", status_code=202)
 @timeit
 async def process_website(request: WebsiteSourceRequest) -> Dict[str, Any]:
     """Fetch and summarize content from a website URL."""
@@ -86,9 +195,7 @@ async def process_website(request: WebsiteSourceRequest) -> Dict[str, Any]:
         text = ' '.join(chunk for chunk in chunks if chunk)
         
         # Process the text content
-        result = await process_text_document(text, request.model_name)
-        
-        return JSONResponse(content=result)
+        return await start_summary_job(text, request.model_name, dry_run=request.dry_run, **request_options(request))
         
     except requests.RequestException as e:
         logger.error(f"Failed to fetch website: {str(e)}")
@@ -104,7 +211,7 @@ async def process_website(request: WebsiteSourceRequest) -> Dict[str, Any]:
         )
 
 # New unified endpoint for handling different source types
-@router.post("/sources")
+@router.post("/sources", status_code=202)
 @timeit
 async def process_source(request: SourceRequest) -> Dict[str, Any]:
     """Process different types of sources based on the type field."""
@@ -120,8 +227,10 @@ async def process_source(request: SourceRequest) -> Dict[str, Any]:
                 )
                 
             logger.info("Processing TEXT source type")
-            result = await process_text_document(request.content, request.model_name)
-            return result
+            return await start_summary_job(
+                request.content, request.model_name, request.sourceId, request.dry_run,
+                **request_options(request)
+            )
             
         elif request.type == "WEBSITE":
             # Handle website source
@@ -154,9 +263,10 @@ async def process_source(request: SourceRequest) -> Dict[str, Any]:
                 text = ' '.join(chunk for chunk in chunks if chunk)
                 
                 # Process the text content
-                result = await process_text_document(text, request.model_name)
-                
-                return JSONResponse(content=result)
+                return await start_summary_job(
+                    text, request.model_name, request.sourceId, request.dry_run,
+                    **request_options(request)
+                )
             
             except requests.RequestException as e:
                 logger.error(f"Failed to fetch website: {str(e)}")
@@ -178,8 +288,13 @@ async def process_source(request: SourceRequest) -> Dict[str, Any]:
             detail=f"Error processing source: {str(e)}"
         )
 
-@router.get("/status")
-async def get_processing_status_endpoint() -> Dict[str, Any]:
-    """Get current processing status."""
-    status = await get_processing_status()
-    return status 
\ No newline at end of file
+@router.get("/status/{job_id}")
+async def get_processing_status_endpoint(job_id: str) -> Dict[str, Any]:
+    """Get processing status for a summary job."""
+    status = await job_registry.get(job_id)
+    if status is None:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Unknown job: {job_id}"
+        )
+    return status
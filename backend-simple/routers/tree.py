@@ -0,0 +1,55 @@
+from fastapi import APIRouter, HTTPException
+from typing import Dict, Any
+import logging
+
+from utils.summary_tree import summary_tree_store, node_outline
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+# Create router
+router = APIRouter()
+
+async def get_tree_or_404(tree_id: str) -> Dict[str, Any]:
+    tree = await summary_tree_store.get(tree_id)
+    if tree is None:
+        raise HTTPException(
+            status_code=404,
+            detail=f"No summary tree {tree_id}; summarize the source first"
+        )
+    return tree
+
+@router.get("/trees/{tree_id}")
+async def get_summary_tree(tree_id: str) -> Dict[str, Any]:
+    """Get a stored summary tree: the document summary and every node's outline.
+
+    Outlines carry offsets, token counts and children but not summary text;
+    fetch a node to read it.
+    """
+    tree = await get_tree_or_404(tree_id)
+    root = tree["nodes"].get(tree["root"]) if tree["root"] else None
+    return {
+        "tree_id": tree_id,
+        "model_name": tree["model_name"],
+        "root": tree["root"],
+        "depth": tree["depth"],
+        "extractive": tree["extractive"],
+        "summary": root["summary"] if root else "",
+        "nodes": [node_outline(node) for node in tree["nodes"].values()]
+    }
+
+@router.get("/trees/{tree_id}/nodes/{node_id}")
+async def get_summary_tree_node(tree_id: str, node_id: str) -> Dict[str, Any]:
+    """Get one node's summary and its children's summaries (one level more detail)."""
+    tree = await get_tree_or_404(tree_id)
+    node = tree["nodes"].get(node_id)
+    if node is None:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Summary tree {tree_id} has no node {node_id}"
+        )
+    return {
+        "tree_id": tree_id,
+        "node": node,
+        "children": [tree["nodes"][child] for child in node["children"]]
+    }
@@ -0,0 +1,24 @@
+"""Shared test setup: import paths, a dummy API key and an offline tokenizer."""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+
+import pytest
+
+from utils import token_counter
+
+class WhitespaceTokenizer:
+    """One token per word; tiktoken downloads its encodings on first use."""
+
+    def encode(self, text):
+        return text.split()
+
+    def decode(self, tokens):
+        return " ".join(tokens)
+
+@pytest.fixture(autouse=True)
+def offline_tokenizer(monkeypatch):
+    monkeypatch.setattr(token_counter, "get_tokenizer", lambda model_name="gpt-3.5-turbo": WhitespaceTokenizer())
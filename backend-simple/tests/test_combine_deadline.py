@@ -0,0 +1,66 @@
+import asyncio
+
+import pytest
+
+from utils import chunk_handler, summary_cache as summary_cache_module
+from utils.model_constants import get_model_config
+from utils.summary_budget import SummaryBudget
+from utils.summary_cache import SummaryCache
+
+@pytest.fixture(autouse=True)
+def fresh_cache(monkeypatch):
+    monkeypatch.setattr(summary_cache_module, "get_redis_client", lambda: None)
+    monkeypatch.setattr(chunk_handler, "summary_cache", SummaryCache())
+
+def fake_call(delay=0.0, error=None):
+    async def call(messages, model_name, **kwargs):
+        await asyncio.sleep(delay)
+        if error is not None:
+            raise error
+        return "combined"
+    return call
+
+def budget(deadline_seconds=None):
+    return SummaryBudget(get_model_config("gpt-3.5-turbo"), deadline_seconds=deadline_seconds)
+
+def combine(parts, job_budget):
+    return asyncio.run(chunk_handler.combine_summary_group(parts, "gpt-3.5-turbo", job_budget))
+
+def test_combine_within_the_deadline(monkeypatch):
+    monkeypatch.setattr(chunk_handler, "make_api_call", fake_call())
+    job_budget = budget(5)
+    assert combine(["a", "b"], job_budget) == "combined"
+    assert not job_budget.partial
+
+def test_deadline_falls_back_to_the_joined_inputs(monkeypatch):
+    monkeypatch.setattr(chunk_handler, "make_api_call", fake_call(delay=5))
+    job_budget = budget(0.05)
+    assert combine(["first", "second"], job_budget) == "first\n\nsecond"
+    assert job_budget.combine_timeouts == 1
+    assert job_budget.partial
+    assert job_budget.limit_hit == "deadline"
+
+def test_passed_deadline_skips_the_call(monkeypatch):
+    calls = []
+
+    async def call(messages, model_name, **kwargs):
+        calls.append(model_name)
+        return "combined"
+
+    monkeypatch.setattr(chunk_handler, "make_api_call", call)
+    job_budget = budget(0.01)
+    asyncio.run(asyncio.sleep(0.02))
+    assert combine(["a", "b"], job_budget) == "a\n\nb"
+    assert calls == []
+
+def test_call_timeout_without_a_budget_is_raised(monkeypatch):
+    monkeypatch.setattr(chunk_handler, "make_api_call", fake_call(error=asyncio.TimeoutError()))
+    with pytest.raises(asyncio.TimeoutError):
+        combine(["a", "b"], None)
+
+def test_call_timeout_before_the_deadline_is_raised(monkeypatch):
+    monkeypatch.setattr(chunk_handler, "make_api_call", fake_call(error=asyncio.TimeoutError()))
+    job_budget = budget(60)
+    with pytest.raises(asyncio.TimeoutError):
+        combine(["a", "b"], job_budget)
+    assert job_budget.combine_timeouts == 0
@@ -0,0 +1,34 @@
+import math
+
+from utils.extractive import extract_key_sentences, split_sentences
+
+def test_empty_text():
+    reduced, stats = extract_key_sentences("", 0.5)
+    assert reduced == ""
+    assert stats["sentences"] == 0
+    assert stats["token_reduction"] == 0.0
+
+def test_keeps_the_ratio_per_section_and_every_heading():
+    body = " ".join(f"Sentence {i} covers storage engines and indexes." for i in range(10))
+    text = f"# Storage\n\n{body}\n\n# Indexes\n\n{body}"
+    reduced, stats = extract_key_sentences(text, 0.3)
+    assert "# Storage" in reduced and "# Indexes" in reduced
+    assert stats["kept_sentences"] == 2 + 2 * math.ceil(0.3 * 10)
+
+def test_kept_sentences_stay_in_document_order():
+    sentences = [f"Point {i} is about caching layers." for i in range(12)]
+    reduced, _ = extract_key_sentences(" ".join(sentences), 0.5)
+    kept = [sentence for sentence in sentences if sentence in reduced]
+    assert reduced == " ".join(kept)
+
+def test_non_latin_text_is_reduced_without_errors():
+    text = "这是第一句。这是第二句。\n\n第三段落在这里。\n\n第四段落也在这里。"
+    reduced, stats = extract_key_sentences(text, 0.5)
+    assert reduced
+    assert 1 <= stats["kept_sentences"] <= stats["sentences"]
+
+def test_accented_text_keeps_whole_sentences():
+    text = "Première phrase ici. Deuxième phrase là. Troisième phrase encore."
+    reduced, stats = extract_key_sentences(text, 0.34)
+    assert stats["kept_sentences"] == 2
+    assert all(sentence in split_sentences(text) for sentence in split_sentences(reduced))
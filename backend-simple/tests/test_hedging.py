@@ -0,0 +1,70 @@
+import asyncio
+
+import pytest
+
+from utils import hedging
+from utils.hedging import hedged, start_hedge_budget
+
+@pytest.fixture(autouse=True)
+def hedging_on(monkeypatch):
+    monkeypatch.setattr(hedging, "HEDGE_REQUESTS", True)
+
+class Attempt:
+    def __init__(self, result, delay):
+        self.result = result
+        self.delay = delay
+        self.started = False
+        self.cancelled = False
+
+    async def __call__(self):
+        self.started = True
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        if isinstance(self.result, Exception):
+            raise self.result
+        return self.result
+
+def run_job(primary, hedge, delay, num_calls=10):
+    async def job():
+        start_hedge_budget(num_calls)
+        result = await hedged(primary, hedge, delay)
+        await asyncio.sleep(0)
+        return result
+    return asyncio.run(job())
+
+def test_fast_primary_is_not_hedged():
+    primary, hedge = Attempt("primary", 0.01), Attempt("hedge", 0.01)
+    assert run_job(primary, hedge, 0.1) == "primary"
+    assert not hedge.started
+
+def test_hedge_wins_and_the_primary_is_cancelled():
+    primary, hedge = Attempt("primary", 1), Attempt("hedge", 0.01)
+    assert run_job(primary, hedge, 0.02) == "hedge"
+    assert primary.cancelled
+
+def test_primary_wins_and_the_hedge_is_cancelled():
+    primary, hedge = Attempt("primary", 0.05), Attempt("hedge", 1)
+    assert run_job(primary, hedge, 0.02) == "primary"
+    assert hedge.started and hedge.cancelled
+
+def test_failed_hedge_leaves_the_primary_running():
+    primary, hedge = Attempt("primary", 0.05), Attempt(RuntimeError("hedge failed"), 0)
+    assert run_job(primary, hedge, 0.02) == "primary"
+
+def test_spent_budget_waits_for_the_primary():
+    async def job():
+        budget = start_hedge_budget(1)
+        budget.used = budget.max_hedges
+        hedge = Attempt("hedge", 0)
+        result = await hedged(Attempt("primary", 0.05), hedge, 0.01)
+        return result, hedge.started
+
+    assert asyncio.run(job()) == ("primary", False)
+
+def test_no_budget_outside_a_job_means_no_hedge():
+    hedge = Attempt("hedge", 0)
+    assert asyncio.run(hedged(Attempt("primary", 0.03), hedge, 0.01)) == "primary"
+    assert not hedge.started
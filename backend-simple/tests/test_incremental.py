@@ -0,0 +1,53 @@
+from utils.chunk_handler import split_text_into_chunks
+from utils.incremental import align_chunks, plan_reduce_levels, split_units
+from utils.summary_cache import text_hash
+
+def split_fn(part):
+    return split_text_into_chunks(part, 300)
+
+def sentences(count):
+    return [f"Sentence {i} is about topic {i % 7} and adds a few more words." for i in range(count)]
+
+def test_split_units_uses_paragraphs_when_present():
+    units, separator = split_units("First para. Two sentences.\n\nSecond para.")
+    assert units == ["First para. Two sentences.", "Second para."]
+    assert separator == "\n\n"
+
+def test_split_units_falls_back_to_sentences():
+    units, separator = split_units("One. Two! Three? Four")
+    assert units == ["One.", "Two!", "Three?", "Four"]
+    assert separator == " "
+
+def test_first_run_matches_plain_chunking_for_paragraph_text():
+    text = "\n\n".join(" ".join(sentences(20)) for _ in range(10))
+    chunks, layout, reused = align_chunks(text, [], split_fn)
+    assert chunks == split_fn(text)
+    assert reused == 0
+    assert layout == [[text_hash(p) for p in chunk.split("\n\n")] for chunk in chunks]
+
+def test_paragraph_edit_reuses_untouched_chunks():
+    paragraphs = [" ".join(sentences(5)) + f" Paragraph {i}." for i in range(60)]
+    _, layout, _ = align_chunks("\n\n".join(paragraphs), [], split_fn)
+    edited = paragraphs[:30] + ["A new paragraph."] + paragraphs[30:]
+    chunks, _, reused = align_chunks("\n\n".join(edited), layout, split_fn)
+    assert reused >= len(chunks) - 2
+
+def test_website_edit_reuses_most_chunks():
+    # Scraped website text is joined with spaces, so it has no paragraph breaks
+    page = sentences(600)
+    chunks, layout, _ = align_chunks(" ".join(page), [], split_fn)
+    assert len(chunks) > 10
+    assert all(chunk in " ".join(page) for chunk in chunks)
+
+    edited = page[:300] + ["One new sentence was added to the page."] + page[300:]
+    new_chunks, _, reused = align_chunks(" ".join(edited), layout, split_fn)
+    assert reused >= len(new_chunks) - 2
+
+def test_unchanged_text_reuses_every_chunk_and_reduce_group():
+    text = " ".join(sentences(400))
+    chunks, layout, _ = align_chunks(text, [], split_fn)
+    _, levels = plan_reduce_levels([text_hash(c) for c in chunks], 3)
+    again, _, reused = align_chunks(text, layout, split_fn)
+    assert again == chunks and reused == len(chunks)
+    _, levels_again = plan_reduce_levels([text_hash(c) for c in again], 3, levels)
+    assert levels_again == levels
@@ -0,0 +1,84 @@
+import asyncio
+
+import pytest
+
+from utils import job_registry as job_registry_module
+from utils.job_registry import JobRegistry, ProcessingProgress, ProcessingStatus
+
+@pytest.fixture(autouse=True)
+def in_memory(monkeypatch):
+    monkeypatch.setattr(job_registry_module, "get_redis_client", lambda: None)
+
+def test_progress_transitions():
+    progress = ProcessingProgress("job")
+    assert progress.status == ProcessingStatus.PENDING
+    progress.advance(4)
+    progress.advance(4)
+    assert (progress.status, progress.processed_chunks, progress.progress) == (ProcessingStatus.PROCESSING, 2, 50)
+    progress.complete({"summary": "done"})
+    assert (progress.status, progress.progress) == (ProcessingStatus.COMPLETED, 100)
+    progress.set_error("boom")
+    assert (progress.status, progress.error) == (ProcessingStatus.ERROR, "boom")
+
+def test_jobs_get_their_own_ids():
+    registry = JobRegistry()
+    assert registry.create().job_id != registry.create().job_id
+    assert registry.create("given").job_id == "given"
+
+def test_background_job_stores_its_result():
+    registry = JobRegistry()
+    progress = registry.create()
+
+    async def job():
+        assert (await registry.get(progress.job_id))["status"] == ProcessingStatus.PENDING
+        return {"summary": "done"}
+
+    async def run():
+        await registry.run_in_background(progress, job())
+        return await registry.get(progress.job_id)
+
+    snapshot = asyncio.run(run())
+    assert snapshot["status"] == ProcessingStatus.COMPLETED
+    assert snapshot["result"] == {"summary": "done"}
+
+def test_failed_job_is_stored_as_error():
+    registry = JobRegistry()
+    progress = registry.create()
+
+    async def job():
+        raise RuntimeError("provider down")
+
+    async def run():
+        await registry.run_in_background(progress, job())
+        return await registry.get(progress.job_id)
+
+    snapshot = asyncio.run(run())
+    assert (snapshot["status"], snapshot["error"]) == (ProcessingStatus.ERROR, "provider down")
+
+def test_cancelled_job_is_stored_as_cancelled():
+    registry = JobRegistry()
+    progress = registry.create()
+
+    async def run():
+        task = registry.run_in_background(progress, asyncio.sleep(10))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        return await registry.get(progress.job_id)
+
+    assert asyncio.run(run())["status"] == ProcessingStatus.CANCELLED
+
+def test_job_that_reports_its_own_error_keeps_it():
+    registry = JobRegistry()
+    progress = registry.create()
+
+    async def job():
+        progress.set_error("No valid summaries generated")
+        return {"status": ProcessingStatus.ERROR}
+
+    async def run():
+        await registry.run_in_background(progress, job())
+        return await registry.get(progress.job_id)
+
+    assert asyncio.run(run())["status"] == ProcessingStatus.ERROR
@@ -0,0 +1,80 @@
+import asyncio
+import json
+
+from utils.micro_batch import MicroBatcher, build_batch_messages, parse_batch_response
+from utils.retry_budget import current_retry_budget, start_retry_budget, take_retry
+
+def test_parse_accepts_strings_and_summary_objects_around_prose():
+    reply = 'Here you go:\n```json\n["first", {"summary": " second "}]\n```'
+    assert parse_batch_response(reply, 2) == ["first", "second"]
+
+def test_parse_rejects_wrong_count_empty_items_and_non_json():
+    assert parse_batch_response('["only one"]', 2) is None
+    assert parse_batch_response('["a", ""]', 2) is None
+    assert parse_batch_response('["a", 3]', 2) is None
+    assert parse_batch_response("Sure! Here are the summaries.", 1) is None
+    assert parse_batch_response("[not json]", 1) is None
+
+def test_batch_messages_number_every_part():
+    messages = build_batch_messages(["alpha", "beta"], 200)
+    prompt = messages[-1]["content"]
+    assert '<part id="1">\nalpha\n</part>' in prompt
+    assert '<part id="2">\nbeta\n</part>' in prompt
+
+def submit_all(batcher, chunks, call):
+    async def run():
+        return await asyncio.gather(*(
+            batcher.submit(chunk, 10, "gpt-3.5-turbo", 100, call) for chunk in chunks
+        ))
+    return asyncio.run(run())
+
+def test_full_batch_goes_out_as_one_call():
+    calls = []
+
+    async def call(messages, max_tokens):
+        calls.append(messages)
+        return json.dumps([f"summary {i}" for i in range(3)])
+
+    summaries = submit_all(MicroBatcher(max_parts=3, window_ms=1000), ["a", "b", "c"], call)
+    assert summaries == ["summary 0", "summary 1", "summary 2"]
+    assert len(calls) == 1
+
+def test_unparsable_reply_or_failed_call_falls_back_to_single_requests():
+    async def garbled(messages, max_tokens):
+        return "I summarized them for you."
+
+    async def failing(messages, max_tokens):
+        raise RuntimeError("provider down")
+
+    assert submit_all(MicroBatcher(max_parts=2, window_ms=10), ["a", "b"], garbled) == [None, None]
+    assert submit_all(MicroBatcher(max_parts=2, window_ms=10), ["a", "b"], failing) == [None, None]
+
+def test_lone_chunk_is_not_batched():
+    async def call(messages, max_tokens):
+        raise AssertionError("a batch of one should not be sent")
+
+    assert submit_all(MicroBatcher(max_parts=4, window_ms=10), ["a"], call) == [None]
+
+def test_batch_runs_outside_the_jobs_and_charges_their_retry_budgets():
+    seen = []
+
+    async def call(messages, max_tokens):
+        seen.append(current_retry_budget())
+        for attempt in range(1, 4):
+            take_retry(attempt, "gpt-3.5-turbo")
+        return json.dumps(["x", "y"])
+
+    batcher = MicroBatcher(max_parts=2, window_ms=1000)
+
+    async def job(chunk):
+        budget = start_retry_budget(100)
+        summary = await batcher.submit(chunk, 10, "gpt-3.5-turbo", 100, call)
+        return budget, summary
+
+    async def run():
+        return await asyncio.gather(job("a"), job("b"))
+
+    results = asyncio.run(run())
+    job_budgets = [budget for budget, _ in results]
+    assert seen[0] not in job_budgets
+    assert sorted(budget.used for budget in job_budgets) == [1, 2]
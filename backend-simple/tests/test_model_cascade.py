@@ -0,0 +1,58 @@
+import asyncio
+
+import pytest
+
+from utils import chunk_handler, model_cascade, summary_cache as summary_cache_module
+from utils.model_cascade import stage_models
+from utils.reduction_planner import ReductionPlan
+from utils.summary_cache import SummaryCache
+
+@pytest.fixture(autouse=True)
+def fresh_cache(monkeypatch):
+    monkeypatch.setattr(summary_cache_module, "get_redis_client", lambda: None)
+    monkeypatch.setattr(chunk_handler, "summary_cache", SummaryCache())
+
+@pytest.fixture
+def models(monkeypatch):
+    def configure(**stages):
+        for stage in ("map", "reduce", "final"):
+            monkeypatch.setitem(model_cascade.STAGE_MODELS, stage, stages.get(stage))
+    return configure
+
+def test_stages_default_to_the_requested_model(models):
+    models()
+    assert stage_models("gpt-3.5-turbo") == {"map": "gpt-3.5-turbo", "reduce": "gpt-3.5-turbo", "final": "gpt-3.5-turbo"}
+
+def test_stage_overrides_apply_per_stage(models):
+    models(map="gpt-3.5-turbo", final="gpt-4")
+    assert stage_models("gpt-4o") == {"map": "gpt-3.5-turbo", "reduce": "gpt-4o", "final": "gpt-4"}
+
+def test_document_routes_each_stage_to_its_model(models, monkeypatch):
+    models(map="gpt-3.5-turbo", reduce="gpt-4o", final="gpt-4")
+    calls = []
+
+    async def fake_call(messages, model_name, **kwargs):
+        calls.append(model_name)
+        return f"summary {len(calls)}"
+
+    monkeypatch.setattr(chunk_handler, "make_api_call", fake_call)
+    paragraphs = [" ".join(f"word{i}" for _ in range(40)) for i in range(8)]
+    plan = ReductionPlan(
+        ReductionPlan.MULTI_ROUND, "gpt-3.5-turbo", document_tokens=320, chunk_tokens=40, num_chunks=8,
+        map_target_tokens=20, final_target_tokens=50, fan_in=2, reduce_rounds=3, calls=15,
+        total_tokens=1000, estimated_seconds=1.0
+    )
+    result = asyncio.run(chunk_handler.process_text_document(
+        "\n\n".join(paragraphs), "gpt-4o", plan=plan, extractive_ratio=1
+    ))
+
+    assert result["status"] == "completed"
+    stages = result["stages"]
+    assert stages["map"]["model"] == "gpt-3.5-turbo"
+    assert stages["map"]["calls"] == 8
+    assert stages["reduce"]["model"] == "gpt-4o"
+    # Only the root combine runs on the final model
+    assert stages["final"]["model"] == "gpt-4"
+    assert stages["final"]["calls"] == 1
+    assert calls.count("gpt-4") == 1
+    assert result["summary"] == f"summary {len(calls)}"
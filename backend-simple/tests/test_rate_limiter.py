@@ -0,0 +1,77 @@
+import asyncio
+
+import pytest
+
+from utils import rate_limiter
+from utils.rate_limiter import RateLimiter, hold_seconds, parse_duration, parse_rate_limit_headers
+
+@pytest.fixture(params=["memory", "redis"])
+def limiter(request, monkeypatch):
+    redis = None
+    if request.param == "redis":
+        # The Lua scripts need fakeredis with lupa
+        pytest.importorskip("lupa")
+        redis = pytest.importorskip("fakeredis").aioredis.FakeRedis(decode_responses=True)
+        asyncio.run(redis.flushall())
+    monkeypatch.setattr(rate_limiter, "get_redis_client", lambda: redis)
+    monkeypatch.setattr(rate_limiter, "RATE_LIMIT_REQUESTS", True)
+    return RateLimiter()
+
+def test_request_bucket_admits_up_to_the_limit_then_waits(limiter):
+    async def reserve_all():
+        return [await limiter.reserve("p:m:k", 3, 100000, 10) for _ in range(4)]
+
+    waits = asyncio.run(reserve_all())
+    assert waits[:3] == [0, 0, 0]
+    assert waits[3] == pytest.approx(20, abs=0.5)
+    assert limiter.headroom("p:m:k") == pytest.approx(0, abs=0.01)
+
+def test_token_bucket_waits_without_taking_capacity(limiter):
+    async def run():
+        first = await limiter.reserve("p:m:k", 100, 1000, 800)
+        second = await limiter.reserve("p:m:k", 100, 1000, 800)
+        third = await limiter.reserve("p:m:k", 100, 1000, 150)
+        return first, second, third
+
+    first, second, third = asyncio.run(run())
+    assert first == 0
+    assert second == pytest.approx(36, abs=0.5)
+    assert third == 0
+
+def test_parse_duration_formats():
+    assert parse_duration("1s") == 1
+    assert parse_duration("6m0s") == 360
+    assert parse_duration("20ms") == pytest.approx(0.02)
+    assert parse_duration("1h2m") == 3720
+    assert parse_duration("0.5") == 0.5
+    assert parse_duration("") is None
+    assert parse_duration("soon") is None
+
+def test_parse_rate_limit_headers():
+    limits = parse_rate_limit_headers({
+        "x-ratelimit-remaining-requests": "0",
+        "x-ratelimit-remaining-tokens": "1500",
+        "x-ratelimit-reset-requests": "2s",
+        "x-ratelimit-reset-tokens": "150ms",
+    })
+    assert limits == {
+        "remaining_requests": 0,
+        "remaining_tokens": 1500,
+        "reset_requests": 2,
+        "reset_tokens": pytest.approx(0.15),
+        "retry_after": None,
+    }
+    assert parse_rate_limit_headers({"x-ratelimit-remaining-tokens": "lots"})["remaining_tokens"] is None
+
+def test_hold_seconds_only_for_exhausted_limits_or_retry_after():
+    assert hold_seconds({"remaining_requests": 5, "reset_requests": 10}) == 0
+    assert hold_seconds({"remaining_requests": 0, "reset_requests": 10}) == 10
+    assert hold_seconds({"remaining_tokens": 0, "reset_tokens": 3, "retry_after": 7}) == 7
+    assert hold_seconds({"retry_after": 4}) == 4
+
+def test_observed_headers_lower_and_block_the_bucket(limiter):
+    async def run():
+        await limiter.observe("p:m:k", 100, 1000, {"remaining_requests": 0, "reset_requests": 5})
+        return await limiter.reserve("p:m:k", 100, 1000, 10)
+
+    assert asyncio.run(run()) == pytest.approx(5, abs=0.5)
@@ -0,0 +1,100 @@
+import asyncio
+
+from utils.reduce_engine import tree_reduce, tree_reduce_levels
+
+def run(coro):
+    return asyncio.run(coro)
+
+def test_groups_respect_fan_in_and_keep_document_order():
+    groups = []
+
+    async def combine(parts):
+        groups.append(parts)
+        return "(" + " ".join(parts) + ")"
+
+    result = run(tree_reduce([str(i) for i in range(7)], combine, fan_in=3))
+    assert result == "((0 1 2) (3 4 5) 6)"
+    assert all(len(group) <= 3 for group in groups)
+
+def test_order_holds_when_inputs_finish_out_of_order():
+    async def leaf(value, delay):
+        await asyncio.sleep(delay)
+        return value
+
+    async def combine(parts):
+        return "".join(parts)
+
+    leaves = [leaf(c, delay) for c, delay in zip("abcd", (0.04, 0.01, 0.03, 0.0))]
+    assert run(tree_reduce(leaves, combine, fan_in=2)) == "abcd"
+
+def test_levels_and_sizes_follow_the_plan():
+    async def combine(parts):
+        return "+".join(parts)
+
+    outputs, sizes = run(tree_reduce_levels(list("abcde"), combine, fan_in=2, plan=[[3, 2]]))
+    assert sizes == [[3, 2], [2]]
+    assert outputs == [list("abcde"), ["a+b+c", "d+e"], ["a+b+c+d+e"]]
+
+def test_empty_parts_are_dropped_and_single_parts_pass_through():
+    calls = []
+
+    async def combine(parts):
+        calls.append(parts)
+        return "+".join(parts)
+
+    assert run(tree_reduce(["a", "", "", ""], combine, fan_in=2)) == "a"
+    assert calls == []
+    assert run(tree_reduce([], combine)) == ""
+
+def test_final_fn_combines_only_the_root():
+    async def combine(parts):
+        return "r(" + ",".join(parts) + ")"
+
+    async def final(parts):
+        return "f(" + ",".join(parts) + ")"
+
+    outputs, _ = run(tree_reduce_levels(list("abcd"), combine, fan_in=2, final_fn=final))
+    assert outputs[-1] == ["f(r(a,b),r(c,d))"]
+
+def test_a_group_combines_while_other_leaves_are_still_running():
+    events = []
+
+    async def leaf(value, delay):
+        await asyncio.sleep(delay)
+        events.append(f"leaf {value}")
+        return value
+
+    async def combine(parts):
+        events.append("combine " + "".join(parts))
+        return "".join(parts)
+
+    leaves = [leaf("a", 0), leaf("b", 0), leaf("c", 0.1), leaf("d", 0.1)]
+    run(tree_reduce(leaves, combine, fan_in=2))
+    assert events.index("combine ab") < events.index("leaf c")
+
+def test_a_failed_branch_cancels_the_rest():
+    cancelled = []
+
+    async def slow():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+        return "slow"
+
+    async def failing():
+        raise RuntimeError("chunk failed")
+
+    async def combine(parts):
+        return "".join(parts)
+
+    async def main():
+        try:
+            await tree_reduce([failing(), slow()], combine, fan_in=2)
+        except RuntimeError:
+            await asyncio.sleep(0)
+            return cancelled
+        return None
+
+    assert run(main()) == [True]
@@ -0,0 +1,59 @@
+import asyncio
+
+from utils import chunk_handler
+from utils.model_constants import get_model_config
+from utils.reduction_planner import ReductionPlan, plan_candidates, plan_reduction
+
+def test_short_document_is_one_call():
+    plan = plan_reduction(1000, "gpt-3.5-turbo")
+    assert plan.strategy == ReductionPlan.SINGLE_SHOT
+    assert plan.calls == 1
+    assert plan.num_chunks == 1
+
+def test_chunks_fit_the_model():
+    config = get_model_config("gpt-3.5-turbo")
+    for tokens in (10000, 60000, 400000):
+        plan = plan_reduction(tokens, "gpt-3.5-turbo")
+        assert plan.chunk_tokens <= config["max_tokens_per_chunk"] - config["overhead_tokens"]
+        assert plan.num_chunks * plan.chunk_tokens >= tokens
+
+def test_map_reduce_summaries_fit_one_combine():
+    config = get_model_config("gpt-3.5-turbo")
+    plan = plan_reduction(10000, "gpt-3.5-turbo")
+    assert plan.strategy == ReductionPlan.MAP_REDUCE
+    assert plan.num_chunks * plan.map_target_tokens <= config["max_tokens_per_chunk"] - config["overhead_tokens"]
+    assert plan.calls == plan.num_chunks + 1
+
+def test_map_target_steps_by_halving_the_model_target():
+    target = get_model_config("gpt-3.5-turbo-16k")["target_summary_tokens"]
+    steps = {target, target // 2, target // 4}
+    map_targets = set()
+    for tokens in range(40000, 110000, 5000):
+        plan = plan_reduction(tokens, "gpt-3.5-turbo-16k")
+        if plan.strategy == ReductionPlan.MAP_REDUCE:
+            map_targets.add(plan.map_target_tokens)
+    assert map_targets and map_targets <= steps
+
+def test_one_more_chunk_keeps_the_map_target():
+    plans = [plan_reduction(tokens, "gpt-3.5-turbo-16k") for tokens in (60000, 66000)]
+    assert plans[0].num_chunks != plans[1].num_chunks
+    assert plans[0].map_target_tokens == plans[1].map_target_tokens
+
+def test_chosen_plan_is_the_fastest_candidate():
+    candidates = plan_candidates(60000, "gpt-3.5-turbo")
+    chosen = plan_reduction(60000, "gpt-3.5-turbo")
+    assert chosen.estimated_seconds == min(plan.estimated_seconds for plan in candidates)
+
+def test_summary_calls_may_run_past_their_target(monkeypatch):
+    limits = []
+
+    async def fake_call(messages, model_name, max_tokens=1000, **kwargs):
+        limits.append(max_tokens)
+        return "summary"
+
+    monkeypatch.setattr(chunk_handler, "make_api_call", fake_call)
+    plan = plan_reduction(1000, "gpt-4-turbo")
+    asyncio.run(chunk_handler.process_chunk("some text", "gpt-4-turbo", plan.map_target_tokens))
+    assert plan.map_target_tokens == 1200
+    assert limits == [1500]
+    assert chunk_handler.summary_max_tokens("gpt-3.5-turbo", 8000) == get_model_config("gpt-3.5-turbo")["max_output_tokens"]
@@ -0,0 +1,51 @@
+import asyncio
+
+from utils import retry_budget
+from utils.retry_budget import RetryBudget, current_retry_budget, start_retry_budget, take_retry
+
+def test_budget_is_a_fraction_of_planned_calls_with_a_floor(monkeypatch):
+    monkeypatch.setattr(retry_budget, "RETRY_BUDGET_FRACTION", 0.2)
+    monkeypatch.setattr(retry_budget, "RETRY_BUDGET_MIN", 3)
+
+    async def sizes():
+        return start_retry_budget(4).max_retries, start_retry_budget(100).max_retries
+
+    assert asyncio.run(sizes()) == (3, 20)
+
+def test_take_retry_draws_from_the_jobs_budget_until_spent(monkeypatch):
+    monkeypatch.setattr(retry_budget, "MAX_ATTEMPTS_PER_CALL", 10)
+
+    async def job():
+        budget = start_retry_budget(0)
+        results = [take_retry(1, "gpt-3.5-turbo") for _ in range(budget.max_retries + 1)]
+        return budget, results
+
+    budget, results = asyncio.run(job())
+    assert results == [True] * budget.max_retries + [False]
+    assert budget.used == budget.max_retries
+    assert budget.exhausted
+
+def test_attempt_cap_applies_with_or_without_a_budget(monkeypatch):
+    monkeypatch.setattr(retry_budget, "MAX_ATTEMPTS_PER_CALL", 2)
+    assert take_retry(1, "gpt-3.5-turbo")
+    assert not take_retry(2, "gpt-3.5-turbo")
+
+def test_tasks_of_a_job_share_its_budget():
+    async def job():
+        budget = start_retry_budget(50)
+
+        async def call():
+            take_retry(1, "gpt-3.5-turbo")
+            return current_retry_budget()
+
+        seen = await asyncio.gather(*(asyncio.create_task(call()) for _ in range(3)))
+        return budget, seen
+
+    budget, seen = asyncio.run(job())
+    assert all(other is budget for other in seen)
+    assert budget.used == 3
+
+def test_charge_counts_against_the_budget():
+    budget = RetryBudget(2)
+    budget.charge(2)
+    assert not budget.try_acquire()
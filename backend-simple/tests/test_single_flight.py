@@ -0,0 +1,54 @@
+import asyncio
+
+import pytest
+
+from utils import single_flight as single_flight_module
+from utils.single_flight import SingleFlight, job_key
+
+@pytest.fixture(params=["memory", "redis"])
+def registry(request, monkeypatch):
+    redis = None
+    if request.param == "redis":
+        # The Lua scripts need fakeredis with lupa
+        pytest.importorskip("lupa")
+        redis = pytest.importorskip("fakeredis").aioredis.FakeRedis(decode_responses=True)
+    monkeypatch.setattr(single_flight_module, "get_redis_client", lambda: redis)
+    monkeypatch.setattr(single_flight_module, "SINGLE_FLIGHT_ENABLED", True)
+    return SingleFlight(ttl=60)
+
+def test_job_key_depends_on_text_model_and_options():
+    key = job_key("text", "gpt-4", {"deadline_seconds": 10})
+    assert key == job_key("text", "gpt-4", {"deadline_seconds": 10})
+    assert key != job_key("text", "gpt-3.5-turbo", {"deadline_seconds": 10})
+    assert key != job_key("text", "gpt-4", {"deadline_seconds": 20})
+    assert key != job_key("other text", "gpt-4", {"deadline_seconds": 10})
+
+def test_second_claim_attaches_to_the_running_job(registry):
+    async def run():
+        first = await registry.claim("k", "job-1", "source-a")
+        second = await registry.claim("k", "job-2", "source-b")
+        third = await registry.claim("k", "job-3")
+        return first, second, third
+
+    assert asyncio.run(run()) == (None, "job-1", "job-1")
+
+def test_release_returns_attached_sources_and_frees_the_key(registry):
+    async def run():
+        await registry.claim("k", "job-1", "source-a")
+        await registry.claim("k", "job-2", "source-b")
+        await registry.claim("k", "job-3", "source-c")
+        attached = await registry.release("k", "job-1")
+        reclaimed = await registry.claim("k", "job-4")
+        return attached, reclaimed
+
+    assert asyncio.run(run()) == (["source-b", "source-c"], None)
+
+def test_only_the_owner_releases(registry):
+    async def run():
+        await registry.claim("k", "job-1")
+        await registry.claim("k", "job-2", "source-b")
+        stale = await registry.release("k", "job-2")
+        still_running = await registry.claim("k", "job-3")
+        return stale, still_running
+
+    assert asyncio.run(run()) == ([], "job-1")
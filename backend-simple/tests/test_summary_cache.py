@@ -0,0 +1,66 @@
+import asyncio
+
+import pytest
+
+from utils import chunk_handler, summary_cache as summary_cache_module
+from utils.summary_cache import SummaryCache, combined_hash, prompt_version, text_hash
+
+@pytest.fixture
+def calls(monkeypatch):
+    calls = []
+
+    async def fake_call(messages, model_name, **kwargs):
+        calls.append(model_name)
+        return f"summary {len(calls)}"
+
+    monkeypatch.setattr(summary_cache_module, "get_redis_client", lambda: None)
+    monkeypatch.setattr(chunk_handler, "summary_cache", SummaryCache())
+    monkeypatch.setattr(chunk_handler, "make_api_call", fake_call)
+    return calls
+
+def summarize(chunk, model_name="gpt-3.5-turbo", target_tokens=300):
+    return asyncio.run(chunk_handler.process_chunk(chunk, model_name, target_tokens))
+
+def test_key_covers_model_prompt_target_and_text():
+    base = SummaryCache.make_key("chunk", text_hash("text"), "gpt-4", "p1", 300)
+    assert base == SummaryCache.make_key("chunk", text_hash("text"), "gpt-4", "p1", 300)
+    assert base != SummaryCache.make_key("chunk", text_hash("text"), "gpt-3.5-turbo", "p1", 300)
+    assert base != SummaryCache.make_key("chunk", text_hash("text"), "gpt-4", "p2", 300)
+    assert base != SummaryCache.make_key("chunk", text_hash("text"), "gpt-4", "p1", 400)
+    assert base != SummaryCache.make_key("chunk", text_hash("other"), "gpt-4", "p1", 300)
+    assert base != SummaryCache.make_key("combine", text_hash("text"), "gpt-4", "p1", 300)
+
+def test_prompt_version_and_combined_hash_change_with_their_inputs():
+    assert prompt_version("summarize", "system") != prompt_version("summarize it", "system")
+    assert combined_hash(["a", "b"]) != combined_hash(["b", "a"])
+
+def test_repeated_chunk_is_served_from_cache(calls):
+    assert summarize("some chunk text") == summarize("some chunk text")
+    assert len(calls) == 1
+
+def test_model_prompt_and_target_changes_miss(calls, monkeypatch):
+    summarize("some chunk text")
+    summarize("some chunk text", model_name="gpt-4")
+    summarize("some chunk text", target_tokens=400)
+    monkeypatch.setattr(chunk_handler, "SUMMARY_PROMPT_VERSION", "edited")
+    summarize("some chunk text")
+    assert len(calls) == 4
+
+def test_lru_evicts_oldest_and_ttl_expires(monkeypatch):
+    monkeypatch.setattr(summary_cache_module, "get_redis_client", lambda: None)
+    cache = SummaryCache(max_entries=2, ttl=60)
+
+    async def run():
+        for key in ("a", "b", "c"):
+            await cache.set(key, key.upper())
+        return [await cache.get(key) for key in ("a", "b", "c")]
+
+    assert asyncio.run(run()) == [None, "B", "C"]
+    expired = SummaryCache(ttl=0)
+
+    async def run_expired():
+        await expired.set("a", "A")
+        await asyncio.sleep(0.01)
+        return await expired.get("a")
+
+    assert asyncio.run(run_expired()) is None
@@ -1,12 +1,29 @@
+import os
+import time
 import logging
 import asyncio
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Awaitable, Callable, Tuple, Union
 import aiofiles
 
 from utils.token_counter import count_tokens, truncate_text_to_tokens
 from api.openai_helpers import make_api_call
-from utils.decorators import timeit, retry_with_backoff
+from utils.decorators import timeit
 from utils.model_constants import get_model_config
+from utils.reduce_engine import tree_reduce_levels
+from utils.job_registry import ProcessingStatus, ProcessingProgress, job_registry
+from utils.summary_cache import SummaryCache, summary_cache, text_hash, prompt_version, combined_hash
+from utils.source_store import source_store
+from utils.summary_tree import build_summary_tree, summary_tree_store
+from utils.incremental import align_chunks, plan_reduce_levels
+from utils.reduction_planner import ReductionPlan, plan_reduction
+from utils.latency_tracker import latency_tracker
+from utils.hedging import HEDGE_MODEL, HEDGE_PERCENTILE, hedged, start_hedge_budget
+from utils.retry_budget import record_job_retries, start_retry_budget
+from utils.summary_budget import SummaryBudget, prioritize_chunks
+from utils.extractive import extract_key_sentences
+from utils.micro_batch import micro_batcher
+from utils.model_cascade import record_stage_call, stage_models, start_stage_report
+from utils.metrics import metrics
 from prompts.summary_prompt import SUMMARY_PROMPT
 from prompts.combine_summaries_prompt import COMBINE_SUMMARIES_PROMPT
 from prompts.system_prompts import SUMMARY_SYSTEM_PROMPT, COMBINE_SUMMARIES_SYSTEM_PROMPT
@@ -20,47 +37,21 @@ CONTEXT_WINDOW = default_config["context_window"]  # Default for GPT-3.5-turbo
 CHUNK_OVERLAP = default_config["chunk_overlap"]  # Overlap between chunks
 TARGET_SUMMARY_TOKENS = default_config["target_summary_tokens"]  # Target length for summaries
 OVERHEAD_TOKENS = default_config["overhead_tokens"]  # System prompt, formatting, etc.
+MAX_CONCURRENT_REQUESTS = default_config["max_concurrent_requests"]  # Chunk calls in flight at once
 MAX_INPUT_TOKENS = CONTEXT_WINDOW - TARGET_SUMMARY_TOKENS - OVERHEAD_TOKENS
+REDUCE_FAN_IN = int(os.getenv("REDUCE_FAN_IN", 0))  # Summaries per combine call (0 = derive from model)
+EXTRACTIVE_KEEP_RATIO = float(os.getenv("EXTRACTIVE_KEEP_RATIO", 0))  # Sentences kept by the extractive pass (0 = off)
+EXTRACTIVE_MIN_TOKENS = int(os.getenv("EXTRACTIVE_MIN_TOKENS", 8000))  # Shorter documents skip the extractive pass
+
+# Prompt versions are part of the summary cache key, so editing a prompt invalidates old entries
+SUMMARY_PROMPT_VERSION = prompt_version(SUMMARY_PROMPT, SUMMARY_SYSTEM_PROMPT)
+COMBINE_PROMPT_VERSION = prompt_version(COMBINE_SUMMARIES_PROMPT, COMBINE_SUMMARIES_SYSTEM_PROMPT)
 
 # Add a logger
 logger = logging.getLogger(__name__)
 
-# Define status tracking classes
-class ProcessingStatus:
-    PENDING = "pending"
-    PROCESSING = "processing"
-    COMPLETED = "completed"
-    ERROR = "error"
-
-class ProcessingProgress:
-    def __init__(self):
-        self.status = ProcessingStatus.PENDING
-        self.progress = 0
-        self.total_chunks = 0
-        self.processed_chunks = 0
-        self.current_chunk = 0
-        self.error = None
-
-    def update(self, chunk_num: int, total_chunks: int):
-        self.current_chunk = chunk_num
-        self.total_chunks = total_chunks
-        self.processed_chunks = chunk_num
-        self.progress = int((chunk_num / total_chunks) * 100)
-        self.status = ProcessingStatus.PROCESSING
-
-    def complete(self):
-        self.status = ProcessingStatus.COMPLETED
-        self.progress = 100
-
-    def set_error(self, error: str):
-        self.status = ProcessingStatus.ERROR
-        self.error = error
-
-# Global progress tracker
-processing_progress = ProcessingProgress()
-
-def split_text_into_chunks(text: str) -> List[str]:
-    """Split text into chunks that fit within token limits."""
+def split_text_into_chunks(text: str, max_input_tokens: int = MAX_INPUT_TOKENS) -> List[str]:
+    """Split text into chunks of at most max_input_tokens."""
     if not text:
         return []
         
@@ -79,7 +70,7 @@ def split_text_into_chunks(text: str) -> List[str]:
         para_tokens = count_tokens(paragraph)
         
         # If paragraph alone exceeds limit, split it
-        if para_tokens > MAX_INPUT_TOKENS:
+        if para_tokens > max_input_tokens:
             # If we have a current chunk, add it first
             if current_chunk:
                 chunks.append('\n\n'.join(current_chunk))
@@ -99,7 +90,7 @@ def split_text_into_chunks(text: str) -> List[str]:
                 sent_tokens = count_tokens(sentence)
                 
                 # If adding this sentence would exceed limit
-                if temp_tokens + sent_tokens > MAX_INPUT_TOKENS:
+                if temp_tokens + sent_tokens > max_input_tokens:
                     # Save current temp chunk if it exists
                     if temp_chunk:
                         chunks.append('. '.join(temp_chunk) + '.')
@@ -115,7 +106,7 @@ def split_text_into_chunks(text: str) -> List[str]:
                 chunks.append('. '.join(temp_chunk) + '.')
             
         # If adding this paragraph would exceed limit
-        elif current_tokens + para_tokens > MAX_INPUT_TOKENS:
+        elif current_tokens + para_tokens > max_input_tokens:
             # Save current chunk and start new one
             chunks.append('\n\n'.join(current_chunk))
             current_chunk = [paragraph]
@@ -133,20 +124,44 @@ def split_text_into_chunks(text: str) -> List[str]:
     logger.info(f"Split text into {len(chunks)} chunks")
     return chunks
 
-@retry_with_backoff()
-async def process_chunk(chunk: str, model_name: str) -> str:
-    """Process a single chunk to generate a summary."""
+async def process_chunk(
+    chunk: str,
+    model_name: str,
+    target_tokens: int = None,
+    max_input_tokens: int = None,
+    budget: SummaryBudget = None
+) -> str:
+    """Process a single chunk to generate a summary.
+
+    target_tokens and max_input_tokens default to the model configuration;
+    a reduction plan overrides them (shorter map summaries, single-shot input).
+    Returns "" without calling the API if the job's budget can't cover the chunk.
+    Small chunks may share a request with other small chunks (see utils/micro_batch.py).
+    """
     # Get model configuration
     model_config = get_model_config(model_name)
-    max_tokens = model_config["max_tokens_per_chunk"]
-    target_tokens = model_config["target_summary_tokens"]
     overhead = model_config["overhead_tokens"]
+    if target_tokens is None:
+        target_tokens = model_config["target_summary_tokens"]
+    if max_input_tokens is None:
+        max_input_tokens = model_config["max_tokens_per_chunk"] - overhead
+
+    cache_key = SummaryCache.make_key(
+        "chunk", text_hash(chunk), model_name, SUMMARY_PROMPT_VERSION, target_tokens
+    )
+    cached = await summary_cache.get(cache_key, kind="chunk")
+    if cached:
+        return cached
     
     chunk_tokens = count_tokens(chunk)
-    if chunk_tokens > max_tokens:
-        logger.warning(f"Chunk size ({chunk_tokens}) exceeds max tokens ({max_tokens})")
+    if chunk_tokens > max_input_tokens:
+        logger.warning(f"Chunk size ({chunk_tokens}) exceeds max input tokens ({max_input_tokens})")
         # Truncate chunk if needed
-        chunk = truncate_text_to_tokens(chunk, max_tokens - overhead)
+        chunk = truncate_text_to_tokens(chunk, max_input_tokens)
+        chunk_tokens = max_input_tokens
+
+    if budget is not None and not budget.reserve_map_call(chunk_tokens + overhead, target_tokens):
+        return ""
         
     prompt_with_count = SUMMARY_PROMPT.replace("TARGET_TOKENS", str(target_tokens))
     messages = [
@@ -154,34 +169,125 @@ async def process_chunk(chunk: str, model_name: str) -> str:
         {"role": "user", "content": f"{prompt_with_count}\n{chunk}"}
     ]
 
-    return await make_api_call(messages=messages, model_name=model_name)
+    started_at = time.monotonic()
+    summary = None
+    if micro_batcher.accepts(chunk_tokens):
+        summary = await micro_batcher.submit(
+            chunk, chunk_tokens, model_name, target_tokens,
+            lambda batch_messages, max_tokens: call_with_hedging(batch_messages, model_name, max_tokens)
+        )
+    if summary is None:
+        summary = await call_with_hedging(messages, model_name, summary_max_tokens(model_name, target_tokens))
+    record_stage_call("map", model_name, chunk_tokens + overhead, count_tokens(summary), started_at)
+    if budget is not None:
+        # The reservation assumed a full-length summary
+        budget.record_call(0, count_tokens(summary) - target_tokens)
+    await summary_cache.set(cache_key, summary)
+    return summary
+
+def summary_max_tokens(model_name: str, target_tokens: int) -> int:
+    """Completion limit for a summary of target_tokens: the target plus room to overshoot, within the model's output limit."""
+    return min(get_model_config(model_name)["max_output_tokens"], target_tokens + target_tokens // 4)
+
+async def call_with_hedging(messages: List[Dict[str, str]], model_name: str, max_tokens: int) -> str:
+    """Make a chunk call, hedging it if it runs past the observed p95 for its size."""
+    input_tokens = sum(count_tokens(msg["content"]) for msg in messages)
+
+    # The router records every attempt's latency, so hedges and timeouts share one model
+    return await hedged(
+        lambda: make_api_call(messages=messages, model_name=model_name, max_tokens=max_tokens),
+        lambda: make_api_call(messages=messages, model_name=HEDGE_MODEL or model_name, max_tokens=max_tokens),
+        latency_tracker.percentile(model_name, input_tokens, HEDGE_PERCENTILE)
+    )
+
+def schedule_chunk_summaries(
+    chunks: List[str],
+    model_name: str,
+    semaphore: asyncio.Semaphore,
+    progress: ProcessingProgress = None,
+    target_tokens: int = None,
+    max_input_tokens: int = None,
+    budget: SummaryBudget = None,
+    order: List[int] = None
+) -> List[asyncio.Task]:
+    """Start one summary task per chunk, gated by a shared semaphore.
 
-@retry_with_backoff()
-async def combine_summaries(summaries: List[str], model_name: str) -> str:
-    """Combine multiple summaries into one cohesive summary."""
+    Tasks take the semaphore in the given order (chunk indices, e.g. from
+    prioritize_chunks); the returned list is always in document order.
+    With a budget, chunks it can't cover and calls still running at the
+    deadline yield "" and are left out of the reduce.
+    """
+    if progress is None:
+        progress = ProcessingProgress()
+    total_chunks = len(chunks)
+
+    async def summarize(chunk: str) -> str:
+        async with semaphore:
+            if budget is None:
+                summary = await process_chunk(chunk, model_name, target_tokens, max_input_tokens)
+            else:
+                try:
+                    summary = await asyncio.wait_for(
+                        process_chunk(chunk, model_name, target_tokens, max_input_tokens, budget=budget),
+                        budget.map_time_left()
+                    )
+                except asyncio.TimeoutError:
+                    budget.record_timeout()
+                    summary = ""
+        progress.advance(total_chunks)
+        await job_registry.save(progress)
+        return summary
+
+    tasks: List[asyncio.Task] = [None] * total_chunks
+    for index in (order if order is not None else range(total_chunks)):
+        tasks[index] = asyncio.create_task(summarize(chunks[index]))
+    return tasks
+
+def get_reduce_fan_in(model_name: str) -> int:
+    """Number of summaries that fit in one combine request for this model."""
+    if REDUCE_FAN_IN:
+        return REDUCE_FAN_IN
+    model_config = get_model_config(model_name)
+    usable_tokens = model_config["max_tokens_per_chunk"] - model_config["overhead_tokens"]
+    return max(2, usable_tokens // model_config["target_summary_tokens"])
+
+async def combine_summary_group(
+    summaries: List[str],
+    model_name: str,
+    budget: SummaryBudget = None,
+    stage: str = "reduce"
+) -> str:
+    """Combine one group of summaries with a single API call, recorded under stage.
+
+    With a deadline budget the call gets the time left until the deadline;
+    if it runs out, the summaries are returned joined instead of combined.
+    """
     # Get model configuration
     model_config = get_model_config(model_name)
     max_tokens = model_config["max_tokens_per_chunk"]
     target_tokens = model_config["target_summary_tokens"]
-    
-    if not summaries:
-        return ""
-    if len(summaries) == 1:
-        return summaries[0]
+    overhead = model_config["overhead_tokens"]
 
-    # Check total size before combining
+    # Keyed by the children's hashes so an unchanged branch is never recombined
+    cache_key = SummaryCache.make_key(
+        "combine",
+        combined_hash(text_hash(s) for s in summaries),
+        model_name,
+        COMBINE_PROMPT_VERSION,
+        target_tokens
+    )
+    cached = await summary_cache.get(cache_key, kind="combine")
+    if cached:
+        return cached
+
+    # Give every part an equal share of the request if the group runs long
     total_tokens = sum(count_tokens(s) for s in summaries)
-    if total_tokens > max_tokens * 2:
-        # If too large, recursively combine smaller groups
-        mid = len(summaries) // 2
-        first_half = await combine_summaries(summaries[:mid], model_name)
-        second_half = await combine_summaries(summaries[mid:], model_name)
-        combined = [first_half, second_half]
-    else:
-        combined = summaries
+    if total_tokens > max_tokens - overhead:
+        share = (max_tokens - overhead) // len(summaries)
+        summaries = [truncate_text_to_tokens(s, share) for s in summaries]
 
     # Format summaries with part numbers
-    combined_text = "\n\n".join([f"Part {i+1}:\n{summary}" for i, summary in enumerate(combined)])
+    combined_text = "\n\n".join([f"Part {i+1}:\n{summary}" for i, summary in enumerate(summaries)])
     
     # Use the template from the prompts module
     prompt = COMBINE_SUMMARIES_PROMPT
@@ -193,54 +299,277 @@ async def combine_summaries(summaries: List[str], model_name: str) -> str:
         {"role": "user", "content": prompt}
     ]
 
-    return await make_api_call(messages=messages, model_name=model_name)
+    time_left = budget.time_left() if budget is not None else None
+    started_at = time.monotonic()
+    try:
+        if time_left is not None and time_left <= 0:
+            raise asyncio.TimeoutError()
+        combined = await asyncio.wait_for(
+            make_api_call(messages=messages, model_name=model_name, max_tokens=summary_max_tokens(model_name, target_tokens)),
+            time_left
+        )
+    except asyncio.TimeoutError:
+        # Only the job deadline falls back; a call's own timeout fails like any other error
+        if time_left is None or budget.time_left() > 0:
+            raise
+        logger.warning(f"Combine of {len(summaries)} summaries ran past the deadline, passing them up uncombined")
+        budget.record_combine_timeout()
+        return "\n\n".join(summaries)
+    input_tokens, output_tokens = count_tokens(prompt) + overhead, count_tokens(combined)
+    record_stage_call(stage, model_name, input_tokens, output_tokens, started_at)
+    if budget is not None:
+        budget.record_call(input_tokens, output_tokens)
+    await summary_cache.set(cache_key, combined)
+    return combined
+
+async def combine_summary_tree(
+    summaries: List[Union[str, Awaitable[str]]],
+    model_name: str,
+    fan_in: int = None,
+    semaphore: asyncio.Semaphore = None,
+    plan: List[List[int]] = None,
+    budget: SummaryBudget = None,
+    final_model: str = None
+) -> Tuple[List[List[str]], List[List[int]]]:
+    """Combine summaries like combine_summaries, keeping every level of the tree.
+
+    Intermediate groups are combined with model_name and the root group
+    with final_model (default: model_name).
+    Returns the summaries per level (inputs first, final summary last) and
+    the group sizes per level above the inputs.
+    """
+    if fan_in is None:
+        fan_in = get_reduce_fan_in(model_name)
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(get_model_config(model_name)["max_concurrent_requests"])
+
+    async def combine(parts: List[str]) -> str:
+        async with semaphore:
+            return await combine_summary_group(parts, model_name, budget, stage="reduce")
+
+    async def combine_final(parts: List[str]) -> str:
+        async with semaphore:
+            return await combine_summary_group(parts, final_model or model_name, budget, stage="final")
+
+    return await tree_reduce_levels(summaries, combine, fan_in, plan, final_fn=combine_final)
+
+async def combine_summaries(
+    summaries: List[Union[str, Awaitable[str]]],
+    model_name: str,
+    fan_in: int = None,
+    semaphore: asyncio.Semaphore = None,
+    plan: List[List[int]] = None,
+    budget: SummaryBudget = None
+) -> str:
+    """Combine multiple summaries into one cohesive summary.
+
+    Summaries may still be in flight; groups of fan_in are combined as soon
+    as their inputs are ready and sibling groups run concurrently. An optional
+    plan fixes the group sizes per level (see utils.incremental).
+    """
+    outputs, _ = await combine_summary_tree(summaries, model_name, fan_in, semaphore, plan, budget)
+    return outputs[-1][0] if outputs[-1] else ""
 
 @timeit
-async def process_text_document(text: str, model_name: str = "gpt-3.5-turbo") -> Dict[str, Any]:
-    """Process a text document by chunking, summarizing each chunk, and combining summaries."""
+async def process_text_document(
+    text: str,
+    model_name: str = "gpt-3.5-turbo",
+    max_concurrency: int = None,
+    progress: ProcessingProgress = None,
+    source_id: str = None,
+    plan: ReductionPlan = None,
+    deadline_seconds: float = None,
+    token_budget: int = None,
+    cost_budget: float = None,
+    extractive_ratio: float = None,
+    attached_source_ids: Callable[[], Awaitable[List[str]]] = None
+) -> Dict[str, Any]:
+    """Process a text document by chunking, summarizing each chunk, and combining summaries.
+
+    Chunk size, summary length and fan-in come from a reduction plan, which
+    is computed from the document size when not given.
+    Pass a ProcessingProgress from the job registry to make progress pollable.
+    Pass a source_id to re-summarize an edited source incrementally: chunks and
+    reduce groups from the previous run are kept where the text is unchanged,
+    so only changed chunks and the branches above them miss the summary cache.
+    With a deadline (seconds), token budget or cost budget (USD), chunks are
+    summarized intro, conclusion and section starts first; chunks the limits
+    can't cover are skipped, combines still running at the deadline fall back
+    to their joined inputs, and the result is flagged partial.
+    With an extractive_ratio (default EXTRACTIVE_KEEP_RATIO), long documents
+    are first cut to that fraction of their sentences on the CPU.
+    The full summary tree is stored under the source_id (or the job id) and
+    returned as tree_id, for drilling into sections without new calls.
+    attached_source_ids, called once the summary is ready, returns the source
+    ids of coalesced requests; state and tree are stored under those too.
+    Failed calls are retried by the provider router only, within a retry
+    budget shared by the whole job; the result reports the retries used.
+    Chunk summaries, intermediate combines and the final combine run on
+    MAP_MODEL, REDUCE_MODEL and FINAL_MODEL when set (see
+    utils/model_cascade.py); the result reports calls, tokens and cost per stage.
+    """
+    if progress is None:
+        progress = ProcessingProgress()
+    retry_budget = None
     try:
-        processing_progress.status = ProcessingStatus.PROCESSING
-        chunks = split_text_into_chunks(text)
-        processing_progress.total_chunks = len(chunks)
-        
-        summaries = []
-        for i, chunk in enumerate(chunks, 1):
-            processing_progress.update(i, len(chunks))
-            summary = await process_chunk(chunk, model_name)
-            if summary:
-                summaries.append(summary)
+        progress.status = ProcessingStatus.PROCESSING
+        document_tokens = count_tokens(text)
+        if extractive_ratio is None:
+            extractive_ratio = EXTRACTIVE_KEEP_RATIO
+        extractive_stats = None
+        if 0 < extractive_ratio < 1 and document_tokens > EXTRACTIVE_MIN_TOKENS:
+            text, extractive_stats = extract_key_sentences(text, extractive_ratio)
+            document_tokens = extractive_stats["reduced_tokens"]
+            metrics.increment(
+                "extractive_tokens_saved",
+                extractive_stats["original_tokens"] - extractive_stats["reduced_tokens"]
+            )
+            logger.info(
+                f"Extractive pass kept {extractive_stats['kept_sentences']} of "
+                f"{extractive_stats['sentences']} sentences, "
+                f"{extractive_stats['token_reduction']:.0%} fewer tokens "
+                f"in {extractive_stats['milliseconds']:.0f}ms"
+            )
+
+        models = stage_models(model_name)
+        if plan is None:
+            plan = plan_reduction(document_tokens, models["map"])
+        logger.info(
+            f"Using {plan.strategy} plan: {plan.num_chunks} chunks, "
+            f"{plan.calls} calls, ~{plan.estimated_seconds:.1f}s"
+        )
+        fan_in = REDUCE_FAN_IN or plan.fan_in
+
+        def split_fn(part: str) -> List[str]:
+            return split_text_into_chunks(part, plan.chunk_tokens)
+
+        previous = await source_store.get(source_id) if source_id else None
+        # Chunked the same way with or without a previous run, so the stored layout always matches
+        chunks, chunk_layout, reused_chunks = align_chunks(
+            text, previous.get("chunks", []) if previous else [], split_fn
+        )
+        if previous:
+            logger.info(f"Source {source_id}: reusing {reused_chunks} of {len(chunks)} chunks")
+        tree_plan, levels = plan_reduce_levels(
+            [text_hash(chunk) for chunk in chunks],
+            fan_in,
+            previous.get("levels") if previous else None
+        )
+        progress.total_chunks = len(chunks)
+        progress.processed_chunks = 0
+        await job_registry.save(progress)
+        # Chunk tasks created below inherit this job's hedge and retry budgets
+        start_hedge_budget(len(chunks))
+        retry_budget = start_retry_budget(plan.calls)
+        stage_report = start_stage_report()
+
+        # Map calls are most of the job, so they set concurrency and budget prices
+        model_config = get_model_config(models["map"])
+        if max_concurrency is None:
+            max_concurrency = model_config["max_concurrent_requests"]
+        semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+        budget = None
+        order = None
+        if deadline_seconds or token_budget or cost_budget:
+            budget = SummaryBudget(
+                model_config,
+                deadline_seconds=deadline_seconds,
+                token_budget=token_budget,
+                cost_budget=cost_budget,
+                reserve_seconds=plan.reduce_seconds,
+                reserve_tokens=plan.reduce_tokens
+            )
+            order = prioritize_chunks(chunks)
+
+        # Map and reduce overlap: combines start as soon as their chunks finish
+        chunk_tasks = schedule_chunk_summaries(
+            chunks, models["map"], semaphore, progress,
+            target_tokens=plan.map_target_tokens,
+            max_input_tokens=plan.chunk_tokens,
+            budget=budget,
+            order=order
+        )
+        outputs, group_sizes = await combine_summary_tree(
+            chunk_tasks, models["reduce"], fan_in=fan_in, semaphore=semaphore, plan=tree_plan,
+            budget=budget, final_model=models["final"]
+        )
+        final_summary = outputs[-1][0] if outputs[-1] else ""
                 
-        if not summaries:
+        if not final_summary:
             error = "No valid summaries generated"
-            processing_progress.set_error(error)
+            if budget is not None and budget.limit_hit:
+                error = f"Budget exhausted ({budget.limit_hit}) before any chunk was summarized"
+            progress.set_error(error)
+            await job_registry.save(progress)
             return {
                 "status": ProcessingStatus.ERROR,
                 "error": error
             }
-            
-        final_summary = await combine_summaries(summaries, model_name)
         
-        processing_progress.complete()
-        return {
+        result = {
             "status": ProcessingStatus.COMPLETED,
             "summary": final_summary,
-            "progress": 100
+            "progress": 100,
+            "plan": plan.to_dict(),
+            "retries": retry_budget.used,
+            "stages": stage_report.to_dict()
+        }
+        if extractive_stats is not None:
+            result["extractive"] = extractive_stats
+        partial = budget is not None and budget.partial
+        if budget is not None:
+            result["partial"] = partial
+            result["summarized_chunks"] = len(chunks) - budget.skipped_chunks
+            result["total_chunks"] = len(chunks)
+            result["budget"] = budget.to_dict()
+        source_ids = [source_id] if source_id else []
+        if attached_source_ids is not None:
+            source_ids += [other for other in await attached_source_ids() if other not in source_ids]
+        if source_id:
+            result["reused_chunks"] = reused_chunks
+            result["total_chunks"] = len(chunks)
+        source_state = {
+            "model_name": model_name,
+            "chunks": chunk_layout,
+            "levels": levels,
+            "summary": final_summary,
+            "partial": partial
         }
+        for state_id in source_ids:
+            await source_store.save(state_id, source_state)
+        tree_id = source_id or progress.job_id
+        tree = {
+            "model_name": model_name,
+            "extractive": extractive_stats is not None,
+            **build_summary_tree(text, chunks, outputs, group_sizes)
+        }
+        for tree_key in dict.fromkeys([tree_id] + source_ids):
+            if tree_key:
+                await summary_tree_store.save(tree_key, tree)
+        if tree_id:
+            result["tree_id"] = tree_id
+        progress.complete(result)
+        await job_registry.save(progress)
+        return result
+
+    except asyncio.CancelledError:
+        # tree_reduce has already cancelled every chunk and combine call
+        logger.info("Text processing cancelled")
+        progress.cancel()
+        await job_registry.save(progress)
+        raise
         
     except Exception as e:
         error_msg = str(e)
         logger.error(f"Error processing text: {error_msg}")
-        processing_progress.set_error(error_msg)
+        progress.set_error(error_msg)
+        await job_registry.save(progress)
         return {
             "status": ProcessingStatus.ERROR,
             "error": error_msg,
-            "progress": processing_progress.progress
+            "progress": progress.progress
         }
 
-async def get_processing_status() -> Dict[str, Any]:
-    """Get the current processing status."""
-    return {
-        "status": processing_progress.status,
-        "progress": processing_progress.progress,
-        "error": processing_progress.error
-    } 
\ No newline at end of file
+    finally:
+        record_job_retries(retry_budget)
@@ -0,0 +1,66 @@
+"""
+Pools of API keys per provider.
+
+A provider can be given several keys (e.g. GROQ_API_KEYS=key1,key2). Each
+key has its own rate-limit buckets, so throughput grows with the number of
+keys. Calls go to the key with the most headroom left, and a key the
+provider rejects as unauthorized is quarantined for a while instead of
+failing every call routed to it.
+"""
+
+import os
+import time
+import hashlib
+import logging
+from typing import Callable, List
+
+from utils.metrics import metrics
+
+CREDENTIAL_QUARANTINE_SECONDS = float(os.getenv("CREDENTIAL_QUARANTINE_SECONDS", 600))
+AUTH_FAILURE_STATUS_CODES = {401, 403}
+
+logger = logging.getLogger(__name__)
+
+def load_api_keys(env_name: str) -> List[str]:
+    """Keys from NAME_API_KEYS (comma-separated) and NAME_API_KEY, without duplicates."""
+    keys = [key.strip() for key in os.getenv(env_name + "S", "").split(",")]
+    keys.append((os.getenv(env_name) or "").strip())
+    return list(dict.fromkeys(key for key in keys if key))
+
+class Credential:
+    def __init__(self, api_key: str):
+        self.api_key = api_key
+        # Identifies the key in logs, metrics and shared state without exposing it
+        self.key_id = hashlib.sha256(api_key.encode()).hexdigest()[:12]
+        self.in_flight = 0
+        self.quarantined_until = 0.0
+
+    @property
+    def quarantined(self) -> bool:
+        return time.monotonic() < self.quarantined_until
+
+class CredentialPool:
+    def __init__(self, provider: str, api_keys: List[str]):
+        self.provider = provider
+        self.credentials = [Credential(api_key) for api_key in api_keys]
+
+    def available(self, headroom: Callable[[Credential], float]) -> List[Credential]:
+        """
+        Keys that are not quarantined, most headroom first.
+
+        Args:
+            headroom: Fraction of a key's rate limit still free (0-1)
+        """
+        active = [credential for credential in self.credentials if not credential.quarantined]
+        return sorted(active, key=lambda credential: (-headroom(credential), credential.in_flight))
+
+    def quarantine(self, credential: Credential, reason: str) -> None:
+        """Stop using a key for CREDENTIAL_QUARANTINE_SECONDS."""
+        if credential.quarantined:
+            return
+        credential.quarantined_until = time.monotonic() + CREDENTIAL_QUARANTINE_SECONDS
+        metrics.increment("credentials_quarantined", provider=self.provider, key=credential.key_id)
+        logger.warning(
+            f"Quarantined {self.provider} key {credential.key_id} for "
+            f"{CREDENTIAL_QUARANTINE_SECONDS:.0f}s: {reason}"
+        )
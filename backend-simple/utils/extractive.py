@@ -0,0 +1,148 @@
+"""
+CPU-only extractive pre-summarization.
+
+Before chunking, long documents can be shrunk by keeping only the most
+informative sentences of each section. Sentences are scored with TextRank
+over TF-IDF vectors (NumPy only), and the top keep_ratio of each section
+is kept in document order. Headings are always kept so the LLM still sees
+the document's structure.
+"""
+
+import re
+import math
+import time
+from collections import Counter
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+from utils.token_counter import count_tokens
+from utils.summary_budget import is_heading
+
+SENTENCE_SPLIT = re.compile(r"(?<=[.!?])[\"')\]]*\s+(?=[\"'(\[]?[A-Z0-9])")
+WORD_PATTERN = re.compile(r"[a-z][a-z'-]+")
+
+# Section size cap; TextRank builds an n x n similarity matrix per section
+MAX_SECTION_SENTENCES = 400
+TEXTRANK_DAMPING = 0.85
+TEXTRANK_ITERATIONS = 30
+MIN_WORD_LENGTH = 3
+
+def split_sentences(paragraph: str) -> List[str]:
+    """Split a paragraph into sentences, joining hard-wrapped lines."""
+    flat = " ".join(paragraph.split())
+    return [s for s in SENTENCE_SPLIT.split(flat) if s]
+
+def _words(sentence: str) -> List[str]:
+    return [w for w in WORD_PATTERN.findall(sentence.lower()) if len(w) >= MIN_WORD_LENGTH]
+
+def _split_sections(paragraphs: List[str], sentence_counts: List[int]) -> List[List[int]]:
+    """Group paragraph indices into sections at headings, capped in size."""
+    sections: List[List[int]] = []
+    current: List[int] = []
+    current_sentences = 0
+    for index, paragraph in enumerate(paragraphs):
+        sentences = sentence_counts[index]
+        if current and (is_heading(paragraph) or current_sentences + sentences > MAX_SECTION_SENTENCES):
+            sections.append(current)
+            current, current_sentences = [], 0
+        current.append(index)
+        current_sentences += sentences
+    if current:
+        sections.append(current)
+    return sections
+
+def textrank_scores(word_ids: List[np.ndarray], idf: np.ndarray) -> np.ndarray:
+    """
+    Score sentences by TextRank over TF-IDF cosine similarity.
+
+    Args:
+        word_ids: Vocabulary ids of each sentence's words, for one section
+        idf: Inverse document frequency per vocabulary id
+
+    Returns:
+        One score per sentence (higher is more central)
+    """
+    n = len(word_ids)
+    lengths = np.array([len(ids) for ids in word_ids])
+    if n <= 2 or not lengths.sum():
+        return np.ones(n)
+
+    # Term-frequency matrix over just this section's words
+    rows = np.repeat(np.arange(n), lengths)
+    section_words, cols = np.unique(np.concatenate(word_ids), return_inverse=True)
+    width = len(section_words)
+    tf = np.bincount(rows * width + cols, minlength=n * width).reshape(n, width).astype(np.float32)
+
+    tfidf = tf * idf[section_words]
+    norms = np.linalg.norm(tfidf, axis=1, keepdims=True)
+    tfidf = np.divide(tfidf, norms, out=np.zeros_like(tfidf), where=norms > 0)
+
+    similarity = tfidf @ tfidf.T
+    np.fill_diagonal(similarity, 0.0)
+    row_sums = similarity.sum(axis=1, keepdims=True)
+    transition = np.divide(similarity, row_sums, out=np.full_like(similarity, 1.0 / n), where=row_sums > 0)
+
+    scores = np.full(n, 1.0 / n, dtype=np.float32)
+    for _ in range(TEXTRANK_ITERATIONS):
+        scores = (1 - TEXTRANK_DAMPING) / n + TEXTRANK_DAMPING * (transition.T @ scores)
+    return scores
+
+def extract_key_sentences(text: str, keep_ratio: float) -> Tuple[str, Dict[str, Any]]:
+    """
+    Keep the top keep_ratio of sentences in each section.
+
+    Args:
+        text: Document text, paragraphs separated by blank lines
+        keep_ratio: Fraction of sentences to keep per section (0-1)
+
+    Returns:
+        (reduced text, stats with token counts and timing)
+    """
+    start = time.perf_counter()
+    paragraphs = [p.strip() for p in text.split('\n\n') if p.strip()]
+    sentences = [split_sentences(p) for p in paragraphs]
+    tokens = [[_words(s) for s in para] for para in sentences]
+
+    # Vocabulary ids and IDF over all sentences of the document
+    total_sentences = sum(len(para) for para in sentences)
+    document_frequency = Counter(w for para in tokens for s in para for w in set(s))
+    vocab = {w: i for i, w in enumerate(document_frequency)}
+    idf = np.log((1 + total_sentences) / (1 + np.array(list(document_frequency.values()), dtype=np.float32))) + 1
+    word_ids = [[np.array([vocab[w] for w in s], dtype=np.int64) for s in para] for para in tokens]
+
+    keep = [[False] * len(para) for para in sentences]
+    for section in _split_sections(paragraphs, [len(para) for para in sentences]):
+        positions = []
+        for p in section:
+            if is_heading(paragraphs[p]):
+                keep[p] = [True] * len(sentences[p])
+                continue
+            positions.extend((p, s) for s in range(len(sentences[p])))
+        if not positions:
+            continue
+        scores = textrank_scores([word_ids[p][s] for p, s in positions], idf)
+        top = max(1, math.ceil(keep_ratio * len(positions)))
+        for i in np.argsort(-scores, kind="stable")[:top]:
+            p, s = positions[i]
+            keep[p][s] = True
+
+    reduced = "\n\n".join(
+        " ".join(s for s, kept in zip(para, keep[p]) if kept)
+        for p, para in enumerate(sentences)
+        if any(keep[p])
+    )
+    elapsed_ms = (time.perf_counter() - start) * 1000
+
+    original_tokens = count_tokens(text)
+    reduced_tokens = count_tokens(reduced)
+    stats = {
+        "keep_ratio": keep_ratio,
+        "sentences": total_sentences,
+        "kept_sentences": sum(sum(k) for k in keep),
+        "original_tokens": original_tokens,
+        "reduced_tokens": reduced_tokens,
+        "token_reduction": round(1 - reduced_tokens / original_tokens, 3) if original_tokens else 0.0,
+        "milliseconds": round(elapsed_ms, 1),
+    }
+    return reduced, stats
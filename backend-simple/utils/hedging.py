@@ -0,0 +1,98 @@
+"""
+Hedged requests for tail-latency reduction.
+
+If a call is still running after the observed p95 latency for its size, a
+duplicate is sent (to the same model or HEDGE_MODEL) and whichever finishes
+first wins; the other is cancelled. Each job gets a hedge budget so a slow
+provider can't double the job's request volume. The budget lives in a
+context variable, so tasks created by the job share it without threading
+it through every call.
+"""
+
+import os
+import math
+import asyncio
+import logging
+from contextvars import ContextVar
+from typing import Awaitable, Callable, Optional, TypeVar
+
+from utils.metrics import metrics
+
+HEDGE_REQUESTS = os.getenv("HEDGE_REQUESTS", "false").lower() == "true"
+HEDGE_PERCENTILE = float(os.getenv("HEDGE_PERCENTILE", 95))
+HEDGE_BUDGET_FRACTION = float(os.getenv("HEDGE_BUDGET_FRACTION", 0.1))  # Hedges per chunk call
+HEDGE_MODEL = os.getenv("HEDGE_MODEL")  # Alternate model for hedges (default: same model)
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+class HedgeBudget:
+    """Caps how many hedges one job may issue."""
+
+    def __init__(self, max_hedges: int):
+        self.max_hedges = max_hedges
+        self.used = 0
+
+    def try_acquire(self) -> bool:
+        if self.used >= self.max_hedges:
+            return False
+        self.used += 1
+        return True
+
+_hedge_budget: ContextVar[Optional[HedgeBudget]] = ContextVar("hedge_budget", default=None)
+
+def start_hedge_budget(num_calls: int) -> Optional[HedgeBudget]:
+    """Give the current job a budget proportional to its call count (None if hedging is off)."""
+    if not HEDGE_REQUESTS:
+        return None
+    budget = HedgeBudget(max(1, math.ceil(num_calls * HEDGE_BUDGET_FRACTION)))
+    _hedge_budget.set(budget)
+    return budget
+
+async def hedged(
+    primary: Callable[[], Awaitable[T]],
+    hedge: Callable[[], Awaitable[T]],
+    delay: Optional[float]
+) -> T:
+    """
+    Run primary; if it hasn't finished after delay seconds, race it against hedge.
+
+    Args:
+        primary: Starts the original call
+        hedge: Starts the duplicate call
+        delay: Seconds to wait before hedging (None disables hedging)
+
+    Returns:
+        The first successful result; raises only if every attempt failed
+    """
+    budget = _hedge_budget.get()
+    if delay is None or budget is None:
+        return await primary()
+
+    first = asyncio.ensure_future(primary())
+    try:
+        done, _ = await asyncio.wait({first}, timeout=delay)
+        if done:
+            return first.result()
+        if not budget.try_acquire():
+            metrics.increment("hedges_skipped", reason="budget")
+            return await first
+
+        logger.info(f"Call still running after {delay:.2f}s, sending a hedge")
+        metrics.increment("hedges_issued")
+        second = asyncio.ensure_future(hedge())
+        pending = {first, second}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for attempt in done:
+                    if attempt.exception() is None:
+                        metrics.increment("hedges_won", winner="hedge" if attempt is second else "primary")
+                        return attempt.result()
+            # Both failed - surface the original call's error
+            return first.result()
+        finally:
+            second.cancel()
+    finally:
+        first.cancel()
@@ -0,0 +1,168 @@
+"""
+Incremental re-summarization support.
+
+When a source is edited, chunking from scratch shifts every chunk boundary
+after the edit, so every later chunk looks new. Instead the new text is
+aligned against the chunk layout stored from the previous run: chunks whose
+paragraphs still appear intact are reused verbatim and only the changed
+regions are re-chunked. Reused chunks then hit the summary cache. Text
+without paragraph breaks, such as scraped website text, is aligned by
+sentence instead, since the whole source would otherwise be one paragraph.
+
+The reduce tree is planned the same way, level by level, so only the
+branches above changed chunks get new combine inputs.
+"""
+
+import re
+from collections import defaultdict
+from typing import Callable, Dict, List, Tuple
+
+from utils.summary_cache import text_hash, combined_hash
+
+# (reused, indices) - a run of consecutive item indices and whether it matched a stored run
+Segment = Tuple[bool, List[int]]
+
+SENTENCE_BREAK = re.compile(r'(?<=[.!?])\s+')
+
+
+def split_paragraphs(text: str) -> List[str]:
+    """Split text into the same stripped paragraphs the chunker works with."""
+    return [p.strip() for p in text.split('\n\n') if p.strip()]
+
+
+def split_units(text: str) -> Tuple[List[str], str]:
+    """
+    Split text into the units chunks are aligned on.
+
+    Returns:
+        (units, separator that joins a chunk's units back into its text):
+        paragraphs joined by blank lines, or sentences joined by spaces when
+        the text has no paragraph breaks
+    """
+    paragraphs = split_paragraphs(text)
+    if len(paragraphs) > 1:
+        return paragraphs, '\n\n'
+    return [s.strip() for s in SENTENCE_BREAK.split(text) if s.strip()], ' '
+
+
+def align_runs(keys: List[str], previous_runs: List[List[str]]) -> List[Segment]:
+    """
+    Split keys into segments, reusing previous runs that still appear intact.
+
+    Args:
+        keys: Hashes of the new items in order
+        previous_runs: Runs of hashes from the previous layout
+
+    Returns:
+        Ordered segments covering every key exactly once
+    """
+    runs_by_first: Dict[str, List[List[str]]] = defaultdict(list)
+    for run in previous_runs:
+        if run:
+            runs_by_first[run[0]].append(run)
+    # Prefer the longest intact run at each position
+    for candidates in runs_by_first.values():
+        candidates.sort(key=len, reverse=True)
+
+    segments: List[Segment] = []
+    gap: List[int] = []
+    i = 0
+    while i < len(keys):
+        match = next(
+            (run for run in runs_by_first.get(keys[i], []) if keys[i:i + len(run)] == run),
+            None
+        )
+        if match:
+            if gap:
+                segments.append((False, gap))
+                gap = []
+            segments.append((True, list(range(i, i + len(match)))))
+            i += len(match)
+        else:
+            gap.append(i)
+            i += 1
+    if gap:
+        segments.append((False, gap))
+    return segments
+
+
+def align_chunks(
+    text: str,
+    previous_chunks: List[List[str]],
+    split_fn: Callable[[str], List[str]]
+) -> Tuple[List[str], List[List[str]], int]:
+    """
+    Chunk text so that unchanged chunks from the previous run come out identical.
+
+    Args:
+        text: New source text
+        previous_chunks: Unit (paragraph or sentence) hashes of each chunk from
+            the previous run; empty to chunk from scratch
+        split_fn: Chunker used for the changed regions
+
+    Returns:
+        (chunks, unit hashes per chunk to store, number of reused chunks)
+    """
+    units, separator = split_units(text)
+    keys = [text_hash(unit) for unit in units]
+
+    chunks: List[str] = []
+    layout: List[List[str]] = []
+    reused_chunks = 0
+    for reused, indices in align_runs(keys, previous_chunks):
+        if reused:
+            chunks.append(separator.join(units[i] for i in indices))
+            layout.append([keys[i] for i in indices])
+            reused_chunks += 1
+            continue
+        # The chunker packs units given as paragraphs, so each chunk's units are known exactly
+        for chunk in split_fn('\n\n'.join(units[i] for i in indices)):
+            chunk_units = chunk.split('\n\n')
+            chunks.append(separator.join(chunk_units))
+            layout.append([text_hash(unit) for unit in chunk_units])
+    return chunks, layout, reused_chunks
+
+
+def plan_reduce_levels(
+    leaf_keys: List[str],
+    fan_in: int,
+    previous_levels: List[List[List[str]]] = None
+) -> Tuple[List[List[int]], List[List[List[str]]]]:
+    """
+    Plan the reduce tree, keeping groups from the previous run where possible.
+
+    Args:
+        leaf_keys: Hash of each chunk in order
+        fan_in: Maximum inputs per combine
+        previous_levels: Stored group layout per level (child keys per group)
+
+    Returns:
+        (group sizes per level for tree_reduce, group layout per level to store)
+    """
+    fan_in = max(2, fan_in)
+    previous_levels = previous_levels or []
+    sizes: List[List[int]] = []
+    levels: List[List[List[str]]] = []
+
+    keys = leaf_keys
+    depth = 0
+    while len(keys) > 1:
+        previous = previous_levels[depth] if depth < len(previous_levels) else []
+        groups: List[List[str]] = []
+        for reused, indices in align_runs(keys, previous):
+            run = [keys[i] for i in indices]
+            if reused:
+                groups.append(run)
+            else:
+                groups.extend(run[j:j + fan_in] for j in range(0, len(run), fan_in))
+
+        if len(groups) == len(keys):
+            # Reuse made no progress at this level - fall back to fixed groups
+            groups = [keys[j:j + fan_in] for j in range(0, len(keys), fan_in)]
+
+        sizes.append([len(group) for group in groups])
+        levels.append(groups)
+        keys = [combined_hash(group) for group in groups]
+        depth += 1
+
+    return sizes, levels
@@ -0,0 +1,170 @@
+"""
+Per-job processing state and background execution.
+
+Every summarization request gets its own job id and ProcessingProgress.
+Progress snapshots are written to Redis when REDIS_URL is set, so any
+uvicorn worker or replica can answer a status poll. Without Redis they are
+kept in process memory.
+"""
+
+import os
+import json
+import time
+import uuid
+import asyncio
+import logging
+from typing import Any, Awaitable, Dict, Optional
+
+from utils.redis_client import get_redis_client
+
+# How long finished jobs stay pollable
+JOB_TTL_SECONDS = int(os.getenv("JOB_TTL_SECONDS", 24 * 60 * 60))
+JOB_KEY_PREFIX = "openbooklm:job:"
+
+logger = logging.getLogger(__name__)
+
+# Define status tracking classes
+class ProcessingStatus:
+    PENDING = "pending"
+    PROCESSING = "processing"
+    COMPLETED = "completed"
+    ERROR = "error"
+    CANCELLED = "cancelled"
+
+class ProcessingProgress:
+    def __init__(self, job_id: Optional[str] = None):
+        self.job_id = job_id
+        self.status = ProcessingStatus.PENDING
+        self.progress = 0
+        self.total_chunks = 0
+        self.processed_chunks = 0
+        self.current_chunk = 0
+        self.error = None
+        self.result = None
+        self.updated_at = time.time()
+
+    def update(self, chunk_num: int, total_chunks: int):
+        self.current_chunk = chunk_num
+        self.total_chunks = total_chunks
+        self.processed_chunks = chunk_num
+        self.progress = int((chunk_num / total_chunks) * 100)
+        self.status = ProcessingStatus.PROCESSING
+        self.updated_at = time.time()
+
+    def advance(self, total_chunks: int):
+        """Record one more finished chunk; chunks may finish out of order."""
+        self.total_chunks = total_chunks
+        self.processed_chunks += 1
+        self.current_chunk = self.processed_chunks
+        self.progress = int((self.processed_chunks / total_chunks) * 100)
+        self.status = ProcessingStatus.PROCESSING
+        self.updated_at = time.time()
+
+    def complete(self, result: Optional[Dict[str, Any]] = None):
+        self.status = ProcessingStatus.COMPLETED
+        self.progress = 100
+        self.result = result
+        self.updated_at = time.time()
+
+    def set_error(self, error: str):
+        self.status = ProcessingStatus.ERROR
+        self.error = error
+        self.updated_at = time.time()
+
+    def cancel(self):
+        self.status = ProcessingStatus.CANCELLED
+        self.updated_at = time.time()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "progress": self.progress,
+            "total_chunks": self.total_chunks,
+            "processed_chunks": self.processed_chunks,
+            "current_chunk": self.current_chunk,
+            "error": self.error,
+            "result": self.result,
+            "updated_at": self.updated_at,
+        }
+
+class JobRegistry:
+    """Creates jobs, stores their progress and runs them in the background."""
+
+    def __init__(self, ttl: int = JOB_TTL_SECONDS):
+        self.ttl = ttl
+        self._local: Dict[str, Dict[str, Any]] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    def create(self, job_id: Optional[str] = None) -> ProcessingProgress:
+        """Create progress tracking for a new job."""
+        return ProcessingProgress(job_id or uuid.uuid4().hex)
+
+    async def save(self, progress: ProcessingProgress) -> None:
+        """Publish the current progress snapshot for a job."""
+        if not progress.job_id:
+            return
+
+        snapshot = progress.to_dict()
+        redis = get_redis_client()
+        if redis is not None:
+            try:
+                await redis.set(JOB_KEY_PREFIX + progress.job_id, json.dumps(snapshot), ex=self.ttl)
+                return
+            except Exception as e:
+                logger.warning(f"Failed to save job {progress.job_id} to Redis: {str(e)}")
+
+        self._prune_local()
+        self._local[progress.job_id] = snapshot
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Get the latest progress snapshot for a job, or None if unknown."""
+        redis = get_redis_client()
+        if redis is not None:
+            try:
+                data = await redis.get(JOB_KEY_PREFIX + job_id)
+                if data:
+                    return json.loads(data)
+            except Exception as e:
+                logger.warning(f"Failed to read job {job_id} from Redis: {str(e)}")
+        return self._local.get(job_id)
+
+    def run_in_background(
+        self,
+        progress: ProcessingProgress,
+        job: Awaitable[Dict[str, Any]]
+    ) -> asyncio.Task:
+        """Run a job coroutine detached from the request that started it.
+
+        The job's return value is stored as the job result when it succeeds.
+        """
+        async def runner():
+            await self.save(progress)
+            try:
+                result = await job
+                if progress.status not in (ProcessingStatus.COMPLETED, ProcessingStatus.ERROR):
+                    progress.complete(result)
+            except asyncio.CancelledError:
+                logger.info(f"Job {progress.job_id} cancelled")
+                progress.cancel()
+                await self.save(progress)
+                raise
+            except Exception as e:
+                logger.error(f"Job {progress.job_id} failed: {str(e)}")
+                progress.set_error(str(e))
+            await self.save(progress)
+
+        task = asyncio.create_task(runner())
+        # Keep a reference so the task isn't garbage collected mid-run
+        self._tasks[progress.job_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(progress.job_id, None))
+        return task
+
+    def _prune_local(self) -> None:
+        """Drop in-memory snapshots older than the TTL."""
+        cutoff = time.time() - self.ttl
+        for job_id in [k for k, v in self._local.items() if v["updated_at"] < cutoff]:
+            del self._local[job_id]
+
+# Shared registry for the process
+job_registry = JobRegistry()
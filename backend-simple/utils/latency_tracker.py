@@ -0,0 +1,82 @@
+"""
+Rolling latency samples per provider, model and request size.
+
+Keeps the most recent call latencies for each (provider, model, size
+bucket) so callers can ask for an observed percentile: the p95 a hedged
+request waits for, or the p99 a call's timeout is derived from. Samples
+recorded for a provider also count towards the model as a whole
+(provider=None). Samples are per worker process.
+
+Timeouts are TIMEOUT_FACTOR times the observed TIMEOUT_PERCENTILE, so a
+fast provider gets a tight timeout and a slow one a generous one. Until a
+key has LATENCY_MIN_SAMPLES samples the old linear estimate is used. A
+call that times out is recorded at its timeout, so a provider that slows
+down pushes its own timeout up instead of timing out forever.
+"""
+
+import os
+import math
+from collections import defaultdict, deque
+from typing import Deque, Dict, Optional, Tuple
+
+from utils.metrics import metrics
+
+LATENCY_WINDOW = 200  # Samples kept per key
+LATENCY_MIN_SAMPLES = 20  # Below this a percentile is not trusted
+TIMEOUT_PERCENTILE = float(os.getenv("TIMEOUT_PERCENTILE", 99))
+TIMEOUT_FACTOR = float(os.getenv("TIMEOUT_FACTOR", 2.0))
+TIMEOUT_MIN_SECONDS = float(os.getenv("TIMEOUT_MIN_SECONDS", 5))
+TIMEOUT_MAX_SECONDS = float(os.getenv("TIMEOUT_MAX_SECONDS", 120))
+# Cold-start estimate, used until a key has enough samples
+COLD_START_TIMEOUT = 30  # Seconds
+COLD_START_TIMEOUT_PER_1K_TOKENS = 3
+
+def size_bucket(input_tokens: int) -> int:
+    """Round a request size up to a power-of-two number of 1K tokens (1, 2, 4, ...)."""
+    kilo_tokens = max(1, math.ceil(input_tokens / 1000))
+    return 1 << (kilo_tokens - 1).bit_length()
+
+class LatencyTracker:
+    def __init__(self, window: int = LATENCY_WINDOW, min_samples: int = LATENCY_MIN_SAMPLES):
+        self.window = window
+        self.min_samples = min_samples
+        self._samples: Dict[Tuple[Optional[str], str, int], Deque[float]] = defaultdict(
+            lambda: deque(maxlen=self.window)
+        )
+
+    def record(self, model_name: str, input_tokens: int, seconds: float, provider: Optional[str] = None) -> None:
+        """Record the latency of a call, for the provider (if given) and the model as a whole."""
+        bucket = size_bucket(input_tokens)
+        self._samples[(None, model_name, bucket)].append(seconds)
+        if provider is not None:
+            self._samples[(provider, model_name, bucket)].append(seconds)
+
+    def percentile(
+        self,
+        model_name: str,
+        input_tokens: int,
+        pct: float,
+        provider: Optional[str] = None
+    ) -> Optional[float]:
+        """Observed latency percentile for calls of this size, or None with too few samples."""
+        samples = self._samples.get((provider, model_name, size_bucket(input_tokens)))
+        if not samples or len(samples) < self.min_samples:
+            return None
+        ordered = sorted(samples)
+        index = min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1)
+        return ordered[max(0, index)]
+
+    def timeout(self, model_name: str, input_tokens: int, provider: Optional[str] = None) -> float:
+        """Seconds to allow a call: the observed p99 times TIMEOUT_FACTOR, within the min/max bounds."""
+        observed = self.percentile(model_name, input_tokens, TIMEOUT_PERCENTILE, provider)
+        if observed is None:
+            return COLD_START_TIMEOUT + (input_tokens / 1000) * COLD_START_TIMEOUT_PER_1K_TOKENS
+        seconds = min(TIMEOUT_MAX_SECONDS, max(TIMEOUT_MIN_SECONDS, observed * TIMEOUT_FACTOR))
+        metrics.set_gauge(
+            "call_timeout_seconds", round(seconds, 2),
+            provider=provider or "any", model=model_name, bucket=size_bucket(input_tokens)
+        )
+        return seconds
+
+# Shared tracker for the process
+latency_tracker = LatencyTracker()
@@ -0,0 +1,41 @@
+"""
+In-process counters and gauges for operational metrics.
+
+Values are per worker process; they are exposed as JSON at /metrics.
+"""
+
+from collections import defaultdict
+from typing import Any, Dict
+
+def _metric_key(name: str, labels: Dict[str, Any]) -> str:
+    """Render a metric name with its labels, e.g. cache_hits{tier=redis}."""
+    if not labels:
+        return name
+    rendered = ",".join(f"{k}={v}" for k, v in sorted(labels.items()))
+    return f"{name}{{{rendered}}}"
+
+class Metrics:
+    def __init__(self):
+        self._counters: Dict[str, float] = defaultdict(float)
+        self._gauges: Dict[str, float] = {}
+
+    def increment(self, name: str, value: float = 1, **labels) -> None:
+        """Add to a counter."""
+        self._counters[_metric_key(name, labels)] += value
+
+    def set_gauge(self, name: str, value: float, **labels) -> None:
+        """Set a gauge to its current value."""
+        self._gauges[_metric_key(name, labels)] = value
+
+    def get(self, name: str, **labels) -> float:
+        """Read a counter (0 if never incremented)."""
+        return self._counters.get(_metric_key(name, labels), 0)
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        return {
+            "counters": dict(self._counters),
+            "gauges": dict(self._gauges),
+        }
+
+# Shared metrics for the process
+metrics = Metrics()
@@ -0,0 +1,208 @@
+"""
+Micro-batching of small chunk summaries.
+
+Under tight RPM limits a short chunk (the tail of a document, a short
+website source) costs a whole request. With MICRO_BATCH_ENABLED, chunks of
+up to MICRO_BATCH_CHUNK_TOKENS wait up to MICRO_BATCH_WINDOW_MS for other
+small chunks for the same model and summary length - from the same job or
+from concurrent ones - and up to MICRO_BATCH_MAX_PARTS of them go out as
+one request that asks for a JSON array of per-part summaries. If the reply
+can't be parsed into exactly one summary per part, or the call fails, every
+part falls back to its own request. Batches are per worker process.
+
+A batch serves several jobs, so it is sent outside any job's context: it
+draws retries from a budget of its own, which are then charged to the jobs
+of its parts in equal shares, and it is never hedged. Each part's tokens and
+cost are recorded by its own job once its summary comes back.
+"""
+
+import os
+import json
+import asyncio
+import logging
+import contextvars
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from utils.model_constants import get_model_config
+from utils.metrics import metrics
+from utils.retry_budget import RetryBudget, current_retry_budget, start_retry_budget
+from prompts.batch_summary_prompt import BATCH_SUMMARY_PROMPT
+from prompts.system_prompts import BATCH_SUMMARY_SYSTEM_PROMPT
+
+MICRO_BATCH_ENABLED = os.getenv("MICRO_BATCH_ENABLED", "false").lower() == "true"
+MICRO_BATCH_MAX_PARTS = int(os.getenv("MICRO_BATCH_MAX_PARTS", 4))
+MICRO_BATCH_CHUNK_TOKENS = int(os.getenv("MICRO_BATCH_CHUNK_TOKENS", 1000))  # Larger chunks get their own request
+MICRO_BATCH_WINDOW_MS = int(os.getenv("MICRO_BATCH_WINDOW_MS", 200))  # How long a batch waits to fill up
+
+logger = logging.getLogger(__name__)
+
+# Sends batch messages with a max_tokens and returns the reply text; must not depend on the submitting job
+BatchCall = Callable[[List[Dict[str, str]], int], Awaitable[str]]
+
+def part_output_tokens(target_tokens: int) -> int:
+    """Completion tokens allowed per part: the target plus slack for overshoot and JSON quoting."""
+    return target_tokens + target_tokens // 4 + 20
+
+def build_batch_messages(parts: List[str], target_tokens: int) -> List[Dict[str, str]]:
+    """Messages asking for one summary per part, as a JSON array in part order."""
+    parts_text = "\n\n".join(
+        f'<part id="{number}">\n{part}\n</part>' for number, part in enumerate(parts, 1)
+    )
+    # Texts go in last, so placeholders inside them are left alone
+    prompt = (
+        BATCH_SUMMARY_PROMPT
+        .replace("NUM_PARTS", str(len(parts)))
+        .replace("TARGET_TOKENS", str(target_tokens))
+        .replace("PARTS_TEXT", parts_text)
+    )
+    return [
+        {"role": "system", "content": BATCH_SUMMARY_SYSTEM_PROMPT},
+        {"role": "user", "content": prompt}
+    ]
+
+def parse_batch_response(reply: str, expected: int) -> Optional[List[str]]:
+    """The per-part summaries in a batch reply, or None unless there is exactly one non-empty summary per part."""
+    start, end = reply.find("["), reply.rfind("]")
+    if start == -1 or end <= start:
+        return None
+    try:
+        items = json.loads(reply[start:end + 1])
+    except ValueError:
+        return None
+    if not isinstance(items, list) or len(items) != expected:
+        return None
+    summaries = []
+    for item in items:
+        if isinstance(item, dict):
+            item = item.get("summary")
+        if not isinstance(item, str) or not item.strip():
+            return None
+        summaries.append(item.strip())
+    return summaries
+
+class PendingBatch:
+    """Small chunks waiting to be sent together."""
+
+    def __init__(self, model_name: str, target_tokens: int, call: BatchCall):
+        self.model_name = model_name
+        self.target_tokens = target_tokens
+        self.call = call
+        self.parts: List[str] = []
+        self.futures: List[asyncio.Future] = []
+        self.retry_budgets: List[Optional[RetryBudget]] = []
+        self.input_tokens = 0
+
+class MicroBatcher:
+    def __init__(self, max_parts: int = MICRO_BATCH_MAX_PARTS, window_ms: int = MICRO_BATCH_WINDOW_MS):
+        self.max_parts = max_parts
+        self.window = window_ms / 1000
+        self._open: Dict[Tuple[str, int], PendingBatch] = {}
+        self._tasks: Set[asyncio.Task] = set()
+
+    def accepts(self, chunk_tokens: int) -> bool:
+        """Whether a chunk of this size is worth batching."""
+        return MICRO_BATCH_ENABLED and self.max_parts > 1 and chunk_tokens <= MICRO_BATCH_CHUNK_TOKENS
+
+    async def submit(
+        self,
+        chunk: str,
+        chunk_tokens: int,
+        model_name: str,
+        target_tokens: int,
+        call: BatchCall
+    ) -> Optional[str]:
+        """
+        Summarize a small chunk as part of a batched request.
+
+        Args:
+            chunk: Chunk text
+            chunk_tokens: Its token count
+            model_name: Model to summarize with
+            target_tokens: Summary length; only chunks with the same target share a request
+            call: Sends the batch request, if this chunk's batch is the one that goes out
+
+        Returns:
+            The chunk's summary, or None if the caller should make its own request
+        """
+        model_config = get_model_config(model_name)
+        max_input_tokens = model_config["max_tokens_per_chunk"] - model_config["overhead_tokens"]
+        max_parts = min(self.max_parts, model_config["max_output_tokens"] // part_output_tokens(target_tokens))
+        if max_parts < 2:
+            return None
+
+        key = (model_name, target_tokens)
+        batch = self._open.get(key)
+        if batch is not None and batch.input_tokens + chunk_tokens > max_input_tokens:
+            self._flush(key)
+            batch = None
+        if batch is None:
+            batch = self._open[key] = PendingBatch(model_name, target_tokens, call)
+            self._spawn(self._flush_after_window(key, batch))
+
+        future = asyncio.get_running_loop().create_future()
+        batch.parts.append(chunk)
+        batch.futures.append(future)
+        batch.retry_budgets.append(current_retry_budget())
+        batch.input_tokens += chunk_tokens
+        if len(batch.parts) >= max_parts:
+            self._flush(key)
+        return await future
+
+    def _spawn(self, coro: Awaitable[None]) -> None:
+        # Started in an empty context, so no job's budgets leak into the batch
+        task = contextvars.Context().run(asyncio.ensure_future, coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def _flush(self, key: Tuple[str, int]) -> None:
+        self._spawn(self._send(self._open.pop(key)))
+
+    async def _flush_after_window(self, key: Tuple[str, int], batch: PendingBatch) -> None:
+        await asyncio.sleep(self.window)
+        # The batch may have filled up and gone out already
+        if self._open.get(key) is batch:
+            del self._open[key]
+            await self._send(batch)
+
+    async def _send(self, batch: PendingBatch) -> None:
+        # Chunks whose job was cancelled while waiting are left out
+        live = [index for index, future in enumerate(batch.futures) if not future.done()]
+        summaries = None
+        try:
+            if len(live) < 2:
+                return
+            parts = [batch.parts[index] for index in live]
+            metrics.increment("micro_batches", model=batch.model_name)
+            batch_budget = start_retry_budget(len(parts))
+            try:
+                reply = await batch.call(
+                    build_batch_messages(parts, batch.target_tokens),
+                    len(parts) * part_output_tokens(batch.target_tokens)
+                )
+                summaries = parse_batch_response(reply, len(parts))
+                if summaries is None:
+                    logger.warning(f"Batched reply for {len(parts)} chunks did not parse, summarizing them one by one")
+            except Exception as e:
+                logger.warning(f"Batched call for {len(parts)} chunks failed, summarizing them one by one: {str(e)}")
+            self._charge_retries(batch_budget.used, [batch.retry_budgets[index] for index in live])
+            if summaries is None:
+                metrics.increment("micro_batch_fallbacks", model=batch.model_name)
+            else:
+                metrics.increment("micro_batch_requests_saved", len(parts) - 1, model=batch.model_name)
+        finally:
+            # Anything not answered here gets its own request
+            for position, index in enumerate(live):
+                future = batch.futures[index]
+                if not future.done():
+                    future.set_result(summaries[position] if summaries else None)
+
+    @staticmethod
+    def _charge_retries(retries: int, budgets: List[Optional[RetryBudget]]) -> None:
+        """Split a batch's retries evenly over the jobs of its parts."""
+        for position, budget in enumerate(budgets):
+            share = retries // len(budgets) + (1 if position < retries % len(budgets) else 0)
+            if budget is not None and share:
+                budget.charge(share)
+
+# Shared micro-batcher for the process
+micro_batcher = MicroBatcher()
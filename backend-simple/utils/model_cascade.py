@@ -0,0 +1,106 @@
+"""
+Model cascade: which model each stage of a summary runs on, and what each stage cost.
+
+Chunk summaries (map) are most of a job's calls; the final combine is one
+call whose quality the user sees. Each stage's model can be set on its own,
+and defaults to the model the request asked for:
+
+    MAP_MODEL     chunk summaries, and the whole summary of a one-chunk document
+    REDUCE_MODEL  intermediate combines of large documents
+    FINAL_MODEL   the combine that produces the summary
+
+Every call is recorded under its stage - calls, tokens, seconds and
+estimated cost under its model's prices - in the metrics and in the job's
+StageReport, which the result returns as "stages". Like the retry budget,
+the report lives in a context variable, so every task the job creates
+records into it.
+"""
+
+import os
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+
+from utils.model_constants import get_model_config
+from utils.metrics import metrics
+
+STAGE_MODELS = {
+    "map": os.getenv("MAP_MODEL"),
+    "reduce": os.getenv("REDUCE_MODEL"),
+    "final": os.getenv("FINAL_MODEL"),
+}
+
+def stage_models(model_name: str) -> Dict[str, str]:
+    """Model per stage (map, reduce, final) for a request for model_name."""
+    return {stage: model or model_name for stage, model in STAGE_MODELS.items()}
+
+class StageStats:
+    """Calls, tokens, time and cost of one stage of a job."""
+
+    def __init__(self, model: str):
+        self.model = model
+        self.calls = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.call_seconds = 0.0
+        self.cost = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "model": self.model,
+            "calls": self.calls,
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+            "call_seconds": round(self.call_seconds, 2),
+            "cost_usd": round(self.cost, 6),
+        }
+
+class StageReport:
+    """Per-stage stats of one job."""
+
+    def __init__(self):
+        self.stages: Dict[str, StageStats] = {}
+
+    def record(self, stage: str, model: str, input_tokens: int, output_tokens: int, seconds: float, cost: float) -> None:
+        stats = self.stages.setdefault(stage, StageStats(model))
+        stats.calls += 1
+        stats.input_tokens += input_tokens
+        stats.output_tokens += output_tokens
+        stats.call_seconds += seconds
+        stats.cost += cost
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {stage: stats.to_dict() for stage, stats in self.stages.items()}
+
+_stage_report: ContextVar[Optional[StageReport]] = ContextVar("stage_report", default=None)
+
+def start_stage_report() -> StageReport:
+    """Give the current job an empty report."""
+    report = StageReport()
+    _stage_report.set(report)
+    return report
+
+def record_stage_call(stage: str, model: str, input_tokens: int, output_tokens: int, started_at: float) -> None:
+    """
+    Record a finished call of a stage.
+
+    Args:
+        stage: map, reduce or final
+        model: Model the call ran on
+        input_tokens: Prompt tokens
+        output_tokens: Completion tokens
+        started_at: time.monotonic() when the call started, retries included
+    """
+    model_config = get_model_config(model)
+    cost = (
+        input_tokens * model_config["input_cost_per_1k"]
+        + output_tokens * model_config["output_cost_per_1k"]
+    ) / 1000
+    seconds = time.monotonic() - started_at
+    metrics.increment("stage_calls", stage=stage, model=model)
+    metrics.increment("stage_tokens", input_tokens + output_tokens, stage=stage, model=model)
+    metrics.increment("stage_seconds", round(seconds, 3), stage=stage, model=model)
+    metrics.increment("stage_cost_usd", cost, stage=stage, model=model)
+    report = _stage_report.get()
+    if report is not None:
+        report.record(stage, model, input_tokens, output_tokens, seconds, cost)
@@ -3,6 +3,11 @@ Constants for token management across different LLM models.
 This file centralizes token limits and other model-specific parameters.
 """
 
+import os
+
+# Upper bound on parallel chunk requests; lower it if the API key has tight RPM limits
+MAX_CONCURRENT_REQUESTS = int(os.getenv("MAX_CONCURRENT_REQUESTS", 4))
+
 # Dictionary of model configurations
 MODEL_CONFIGS = {
     # GPT-3.5 Turbo (4K) configuration
@@ -12,6 +17,14 @@ MODEL_CONFIGS = {
         "chunk_overlap": 100,  # Overlap between chunks
         "target_summary_tokens": 800,  # Target length for summaries
         "overhead_tokens": 100,  # System prompt, formatting, etc.
+        "max_concurrent_requests": MAX_CONCURRENT_REQUESTS,  # Chunk calls in flight at once
+        "max_output_tokens": 4096,  # Longest completion the model can return
+        "requests_per_minute": 3500,  # Account rate limit used for planning
+        "tokens_per_minute": 200000,  # Account token rate limit used for planning
+        "output_tokens_per_second": 80,  # Typical generation speed used for planning
+        "input_cost_per_1k": 0.0005,  # USD per 1K prompt tokens
+        "output_cost_per_1k": 0.0015,  # USD per 1K completion tokens
+        "providers": {"openai": {"model": "gpt-3.5-turbo"}},  # Provider -> its model id and limits
         "name": "gpt-3.5-turbo",
     },
     
@@ -22,6 +35,14 @@ MODEL_CONFIGS = {
         "chunk_overlap": 200,  # Overlap between chunks
         "target_summary_tokens": 1000,  # Target length for summaries
         "overhead_tokens": 100,  # System prompt, formatting, etc.
+        "max_concurrent_requests": MAX_CONCURRENT_REQUESTS,  # Chunk calls in flight at once
+        "max_output_tokens": 4096,  # Longest completion the model can return
+        "requests_per_minute": 3500,  # Account rate limit used for planning
+        "tokens_per_minute": 200000,  # Account token rate limit used for planning
+        "output_tokens_per_second": 80,  # Typical generation speed used for planning
+        "input_cost_per_1k": 0.003,  # USD per 1K prompt tokens
+        "output_cost_per_1k": 0.004,  # USD per 1K completion tokens
+        "providers": {"openai": {"model": "gpt-3.5-turbo-16k"}},  # Provider -> its model id and limits
         "name": "gpt-3.5-turbo-16k",
     },
     
@@ -32,6 +53,14 @@ MODEL_CONFIGS = {
         "chunk_overlap": 200,  # Overlap between chunks
         "target_summary_tokens": 1200,  # Target length for summaries
         "overhead_tokens": 100,  # System prompt, formatting, etc.
+        "max_concurrent_requests": MAX_CONCURRENT_REQUESTS,  # Chunk calls in flight at once
+        "max_output_tokens": 4096,  # Longest completion the model can return
+        "requests_per_minute": 500,  # Account rate limit used for planning
+        "tokens_per_minute": 300000,  # Account token rate limit used for planning
+        "output_tokens_per_second": 35,  # Typical generation speed used for planning
+        "input_cost_per_1k": 0.01,  # USD per 1K prompt tokens
+        "output_cost_per_1k": 0.03,  # USD per 1K completion tokens
+        "providers": {"openai": {"model": "gpt-4-turbo"}},  # Provider -> its model id and limits
         "name": "gpt-4-turbo",
     },
     
@@ -42,8 +71,38 @@ MODEL_CONFIGS = {
         "chunk_overlap": 200,  # Overlap between chunks
         "target_summary_tokens": 1000,  # Target length for summaries
         "overhead_tokens": 100,  # System prompt, formatting, etc.
+        "max_concurrent_requests": MAX_CONCURRENT_REQUESTS,  # Chunk calls in flight at once
+        "max_output_tokens": 4096,  # Longest completion the model can return
+        "requests_per_minute": 500,  # Account rate limit used for planning
+        "tokens_per_minute": 40000,  # Account token rate limit used for planning
+        "output_tokens_per_second": 25,  # Typical generation speed used for planning
+        "input_cost_per_1k": 0.03,  # USD per 1K prompt tokens
+        "output_cost_per_1k": 0.06,  # USD per 1K completion tokens
+        "providers": {"openai": {"model": "gpt-4"}},  # Provider -> its model id and limits
         "name": "gpt-4",
     },
+
+    # Llama 3.1 8B, served by several providers; the router spreads calls across them
+    "llama-3.1-8b": {
+        "max_tokens_per_chunk": 4000,  # Max tokens per API request
+        "context_window": 8000,  # Total context window size
+        "chunk_overlap": 100,  # Overlap between chunks
+        "target_summary_tokens": 800,  # Target length for summaries
+        "overhead_tokens": 100,  # System prompt, formatting, etc.
+        "max_concurrent_requests": MAX_CONCURRENT_REQUESTS,  # Chunk calls in flight at once
+        "max_output_tokens": 8000,  # Longest completion the model can return
+        "requests_per_minute": 90,  # Sum of the providers' limits below, used for planning
+        "tokens_per_minute": 126000,  # Sum of the providers' limits below, used for planning
+        "output_tokens_per_second": 500,  # Typical generation speed used for planning
+        "input_cost_per_1k": 0.0001,  # USD per 1K prompt tokens
+        "output_cost_per_1k": 0.0001,  # USD per 1K completion tokens
+        "providers": {
+            "groq": {"model": "llama-3.1-8b-instant", "requests_per_minute": 30, "tokens_per_minute": 6000},
+            "cerebras": {"model": "llama3.1-8b", "requests_per_minute": 30, "tokens_per_minute": 60000},
+            "llamaapi": {"model": "llama3.1-8b", "requests_per_minute": 30, "tokens_per_minute": 60000},
+        },
+        "name": "llama-3.1-8b",
+    },
 }
 
 # Default model to use
@@ -0,0 +1,270 @@
+"""
+Client-side requests-per-minute and tokens-per-minute limiting.
+
+Each (provider, model, API key) has two token buckets that refill
+continuously at the account's RPM and TPM. A call is admitted only when
+both buckets can cover it, so calls are paced before the provider has to
+answer with a 429. With REDIS_URL set the buckets live in Redis and are
+updated by one Lua script per check, so every worker and replica draws
+from the same budget; otherwise they are kept in process memory.
+
+Provider responses carry the authoritative view (x-ratelimit-remaining-*,
+x-ratelimit-reset-*, retry-after). Feeding them to observe() lowers the
+buckets to what the provider says is left - which also covers other
+clients sharing the key - and holds the key until a reset or retry-after
+when it is exhausted.
+"""
+
+import os
+import re
+import time
+import logging
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+from utils.redis_client import get_redis_client
+
+RATE_LIMIT_REQUESTS = os.getenv("RATE_LIMIT_REQUESTS", "true").lower() == "true"
+RATE_LIMIT_KEY_PREFIX = "openbooklm:ratelimit:"
+# Idle buckets are full again after a minute, so their state can expire
+BUCKET_TTL_SECONDS = 120
+DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+
+logger = logging.getLogger(__name__)
+
+# Refill both buckets, then take one request and `cost` tokens if both suffice.
+# Returns the seconds to wait before the call would fit (0 = admitted) and
+# the fraction of the limits left afterwards.
+# Uses the Redis clock so replicas with skewed clocks agree.
+RESERVE_SCRIPT = """
+local now = redis.call('TIME')
+now = tonumber(now[1]) + tonumber(now[2]) / 1000000
+local rpm = tonumber(ARGV[1])
+local tpm = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local state = redis.call('HMGET', KEYS[1], 'requests', 'tokens', 'updated_at', 'blocked_until')
+local requests = tonumber(state[1]) or rpm
+local tokens = tonumber(state[2]) or tpm
+local elapsed = math.max(0, now - (tonumber(state[3]) or now))
+local blocked_until = tonumber(state[4]) or 0
+requests = math.min(rpm, requests + elapsed * rpm / 60)
+tokens = math.min(tpm, tokens + elapsed * tpm / 60)
+local wait = math.max(0, blocked_until - now)
+if requests < 1 then
+    wait = math.max(wait, (1 - requests) * 60 / rpm)
+end
+if tokens < cost then
+    wait = math.max(wait, (cost - tokens) * 60 / tpm)
+end
+if wait == 0 then
+    requests = requests - 1
+    tokens = tokens - cost
+end
+redis.call('HSET', KEYS[1], 'requests', requests, 'tokens', tokens, 'updated_at', now)
+redis.call('EXPIRE', KEYS[1], ARGV[4])
+return {tostring(wait), tostring(math.min(requests / rpm, tokens / tpm))}
+"""
+
+# Refill, then clamp the buckets to what the provider reports as remaining
+# and hold the key for `hold` seconds (0 = no hold). Empty strings mean unknown.
+OBSERVE_SCRIPT = """
+local now = redis.call('TIME')
+now = tonumber(now[1]) + tonumber(now[2]) / 1000000
+local rpm = tonumber(ARGV[1])
+local tpm = tonumber(ARGV[2])
+local state = redis.call('HMGET', KEYS[1], 'requests', 'tokens', 'updated_at', 'blocked_until')
+local requests = tonumber(state[1]) or rpm
+local tokens = tonumber(state[2]) or tpm
+local elapsed = math.max(0, now - (tonumber(state[3]) or now))
+local blocked_until = tonumber(state[4]) or 0
+requests = math.min(rpm, requests + elapsed * rpm / 60)
+tokens = math.min(tpm, tokens + elapsed * tpm / 60)
+if ARGV[3] ~= '' then
+    requests = math.min(requests, tonumber(ARGV[3]))
+end
+if ARGV[4] ~= '' then
+    tokens = math.min(tokens, tonumber(ARGV[4]))
+end
+blocked_until = math.max(blocked_until, now + tonumber(ARGV[5]))
+redis.call('HSET', KEYS[1], 'requests', requests, 'tokens', tokens, 'updated_at', now, 'blocked_until', blocked_until)
+redis.call('EXPIRE', KEYS[1], ARGV[6])
+return tostring(math.min(requests / rpm, tokens / tpm))
+"""
+
+def parse_duration(value: Optional[str]) -> Optional[float]:
+    """Seconds in a rate-limit duration such as "1s", "6m0s", "20ms" or "0.5"."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    units = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+    parts = DURATION_PART.findall(value)
+    if not parts:
+        return None
+    return sum(float(amount) * units[unit] for amount, unit in parts)
+
+def _int_header(headers: Mapping[str, str], name: str) -> Optional[int]:
+    try:
+        return int(float(headers[name]))
+    except (KeyError, TypeError, ValueError):
+        return None
+
+def parse_rate_limit_headers(headers: Mapping[str, str]) -> Dict[str, Any]:
+    """
+    Read the OpenAI-style rate-limit headers of a response.
+
+    Returns:
+        remaining_requests/remaining_tokens (None if absent), reset_requests/
+        reset_tokens and retry_after in seconds (None if absent)
+    """
+    return {
+        "remaining_requests": _int_header(headers, "x-ratelimit-remaining-requests"),
+        "remaining_tokens": _int_header(headers, "x-ratelimit-remaining-tokens"),
+        "reset_requests": parse_duration(headers.get("x-ratelimit-reset-requests")),
+        "reset_tokens": parse_duration(headers.get("x-ratelimit-reset-tokens")),
+        "retry_after": parse_duration(headers.get("retry-after")),
+    }
+
+def hold_seconds(limits: Dict[str, Any]) -> float:
+    """How long a key must rest: the retry-after, or the reset of an exhausted limit."""
+    hold = limits.get("retry_after") or 0.0
+    if limits.get("remaining_requests") == 0 and limits.get("reset_requests"):
+        hold = max(hold, limits["reset_requests"])
+    if limits.get("remaining_tokens") == 0 and limits.get("reset_tokens"):
+        hold = max(hold, limits["reset_tokens"])
+    return hold
+
+class RateLimiter:
+    def __init__(self):
+        # key -> (requests left, tokens left, updated at, blocked until)
+        self._local: Dict[str, Tuple[float, float, float, float]] = {}
+        # key -> fraction of its limits left as of the last check, for picking keys
+        self._headroom: Dict[str, float] = {}
+        self._reserve_script = None
+        self._observe_script = None
+
+    def headroom(self, key: str) -> float:
+        """Fraction of a key's limits free at its last check (1.0 if never seen)."""
+        return self._headroom.get(key, 1.0)
+
+    def _refill_local(self, key: str, rpm: float, tpm: float) -> Tuple[float, float, float, float]:
+        now = time.monotonic()
+        requests, tokens, updated_at, blocked_until = self._local.get(key, (rpm, tpm, now, 0.0))
+        elapsed = max(0.0, now - updated_at)
+        requests = min(rpm, requests + elapsed * rpm / 60)
+        tokens = min(tpm, tokens + elapsed * tpm / 60)
+        return requests, tokens, now, blocked_until
+
+    def _reserve_local(self, key: str, rpm: float, tpm: float, cost: float) -> float:
+        requests, tokens, now, blocked_until = self._refill_local(key, rpm, tpm)
+        wait = max(0.0, blocked_until - now)
+        if requests < 1:
+            wait = max(wait, (1 - requests) * 60 / rpm)
+        if tokens < cost:
+            wait = max(wait, (cost - tokens) * 60 / tpm)
+        if wait == 0:
+            requests -= 1
+            tokens -= cost
+        self._local[key] = (requests, tokens, now, blocked_until)
+        self._headroom[key] = min(requests / rpm, tokens / tpm)
+        return wait
+
+    def _observe_local(
+        self,
+        key: str,
+        rpm: float,
+        tpm: float,
+        remaining_requests: Optional[int],
+        remaining_tokens: Optional[int],
+        hold: float
+    ) -> None:
+        requests, tokens, now, blocked_until = self._refill_local(key, rpm, tpm)
+        if remaining_requests is not None:
+            requests = min(requests, remaining_requests)
+        if remaining_tokens is not None:
+            tokens = min(tokens, remaining_tokens)
+        self._local[key] = (requests, tokens, now, max(blocked_until, now + hold))
+        self._headroom[key] = min(requests / rpm, tokens / tpm)
+
+    async def reserve(self, key: str, requests_per_minute: int, tokens_per_minute: int, tokens: int) -> float:
+        """
+        Try to take capacity for one call.
+
+        Args:
+            key: Bucket identity, e.g. "provider:model:key id"
+            requests_per_minute: Request limit for the key
+            tokens_per_minute: Token limit for the key
+            tokens: Tokens the call may use (prompt plus max completion)
+
+        Returns:
+            0 if the call was admitted, else the seconds until it would fit
+            (nothing is taken in that case)
+        """
+        if not RATE_LIMIT_REQUESTS:
+            return 0.0
+        # A call larger than the whole bucket could never fit; let it wait for a full one
+        cost = min(tokens, tokens_per_minute)
+        redis = get_redis_client()
+        if redis is not None:
+            try:
+                if self._reserve_script is None:
+                    self._reserve_script = redis.register_script(RESERVE_SCRIPT)
+                wait, headroom = await self._reserve_script(
+                    keys=[RATE_LIMIT_KEY_PREFIX + key],
+                    args=[requests_per_minute, tokens_per_minute, cost, BUCKET_TTL_SECONDS]
+                )
+                self._headroom[key] = float(headroom)
+                return float(wait)
+            except Exception as e:
+                logger.warning(f"Rate limit check for {key} failed in Redis: {str(e)}")
+        return self._reserve_local(key, requests_per_minute, tokens_per_minute, cost)
+
+    async def observe(
+        self,
+        key: str,
+        requests_per_minute: int,
+        tokens_per_minute: int,
+        limits: Dict[str, Any]
+    ) -> None:
+        """
+        Apply what a provider response said about the key's limits.
+
+        Args:
+            key: Bucket identity, as passed to reserve
+            requests_per_minute: Request limit for the key
+            tokens_per_minute: Token limit for the key
+            limits: Output of parse_rate_limit_headers
+        """
+        if not RATE_LIMIT_REQUESTS:
+            return
+        remaining_requests = limits.get("remaining_requests")
+        remaining_tokens = limits.get("remaining_tokens")
+        hold = hold_seconds(limits)
+        if remaining_requests is None and remaining_tokens is None and not hold:
+            return
+        redis = get_redis_client()
+        if redis is not None:
+            try:
+                if self._observe_script is None:
+                    self._observe_script = redis.register_script(OBSERVE_SCRIPT)
+                headroom = await self._observe_script(
+                    keys=[RATE_LIMIT_KEY_PREFIX + key],
+                    args=[
+                        requests_per_minute,
+                        tokens_per_minute,
+                        "" if remaining_requests is None else remaining_requests,
+                        "" if remaining_tokens is None else remaining_tokens,
+                        hold,
+                        BUCKET_TTL_SECONDS
+                    ]
+                )
+                self._headroom[key] = float(headroom)
+                return
+            except Exception as e:
+                logger.warning(f"Rate limit update for {key} failed in Redis: {str(e)}")
+        self._observe_local(key, requests_per_minute, tokens_per_minute, remaining_requests, remaining_tokens, hold)
+
+# Shared limiter for the process
+rate_limiter = RateLimiter()
@@ -0,0 +1,31 @@
+"""
+Lazily created Redis client shared by modules that keep cross-worker state.
+
+Returns None when REDIS_URL is not set (or the redis package is missing) so
+callers can fall back to in-process state for local development.
+"""
+
+import os
+import logging
+
+logger = logging.getLogger(__name__)
+
+_redis = None
+
+def get_redis_client():
+    """Get the shared async Redis client, or None if Redis is not configured."""
+    global _redis
+
+    redis_url = os.getenv("REDIS_URL")
+    if not redis_url:
+        return None
+
+    if _redis is None:
+        try:
+            import redis.asyncio as aioredis
+        except ImportError:
+            logger.warning("REDIS_URL is set but the redis package is not installed")
+            return None
+        _redis = aioredis.from_url(redis_url, decode_responses=True)
+
+    return _redis
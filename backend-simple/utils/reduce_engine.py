@@ -0,0 +1,110 @@
+"""
+Tree reduction for combining summaries.
+
+The whole reduce tree is scheduled up front over futures, so each group is
+combined as soon as its own inputs are ready. Sibling groups run
+concurrently and reduction overlaps with any map calls still in flight.
+"""
+
+import asyncio
+from typing import Awaitable, Callable, List, Optional, Tuple, Union
+
+Leaf = Union[str, Awaitable[str]]
+CombineFn = Callable[[List[str]], Awaitable[str]]
+
+
+def _as_future(leaf: Leaf) -> asyncio.Future:
+    """Wrap a finished value or an awaitable in a future."""
+    if isinstance(leaf, str):
+        future = asyncio.get_running_loop().create_future()
+        future.set_result(leaf)
+        return future
+    return asyncio.ensure_future(leaf)
+
+
+async def _combine_group(group: List[asyncio.Future], combine_fn: CombineFn) -> str:
+    """Wait for one group's inputs, then combine them in order."""
+    parts = [part for part in await asyncio.gather(*group) if part]
+    if not parts:
+        return ""
+    if len(parts) == 1:
+        return parts[0]
+    return await combine_fn(parts)
+
+
+def _group_sizes(count: int, fan_in: int, plan: Optional[List[List[int]]], depth: int) -> List[int]:
+    """Group sizes for one level: the planned ones if they fit, else fixed fan_in groups."""
+    if plan and depth < len(plan) and sum(plan[depth]) == count and len(plan[depth]) < count:
+        return plan[depth]
+    return [min(fan_in, count - i) for i in range(0, count, fan_in)]
+
+
+async def tree_reduce_levels(
+    leaves: List[Leaf],
+    combine_fn: CombineFn,
+    fan_in: int = 2,
+    plan: Optional[List[List[int]]] = None,
+    final_fn: Optional[CombineFn] = None
+) -> Tuple[List[List[str]], List[List[int]]]:
+    """
+    Reduce leaves like tree_reduce, keeping every intermediate result.
+
+    final_fn, if given, combines the root group instead of combine_fn.
+
+    Returns:
+        (outputs per level, leaves first and the final result last;
+         group sizes per level above the leaves)
+    """
+    fan_in = max(2, fan_in)
+    level = [_as_future(leaf) for leaf in leaves]
+    levels: List[List[asyncio.Future]] = [level]
+    sizes: List[List[int]] = []
+    depth = 0
+    try:
+        while len(level) > 1:
+            groups, start = [], 0
+            level_sizes = _group_sizes(len(level), fan_in, plan, depth)
+            for size in level_sizes:
+                groups.append(level[start:start + size])
+                start += size
+            level_fn = final_fn if final_fn is not None and len(groups) == 1 else combine_fn
+            level = [
+                asyncio.ensure_future(_combine_group(group, level_fn))
+                for group in groups
+            ]
+            levels.append(level)
+            sizes.append(level_sizes)
+            depth += 1
+        if level:
+            await level[0]
+        # Every future feeds the root, so all are done once it is
+        return [[future.result() for future in futures] for futures in levels], sizes
+    except BaseException:
+        # A failed or cancelled branch makes the rest of the tree useless
+        for futures in levels:
+            for future in futures:
+                future.cancel()
+        raise
+
+
+async def tree_reduce(
+    leaves: List[Leaf],
+    combine_fn: CombineFn,
+    fan_in: int = 2,
+    plan: Optional[List[List[int]]] = None
+) -> str:
+    """
+    Reduce leaves to a single result, combining at most fan_in inputs per call.
+
+    Args:
+        leaves: Summaries, or awaitables that will produce them, in document order
+        combine_fn: Coroutine that merges an ordered list of summaries into one
+        fan_in: Maximum number of inputs per combine call
+        plan: Optional group sizes per level, used to keep the tree shape stable
+            across runs; levels that don't match fall back to fan_in groups
+
+    Returns:
+        The combined summary ("" when there is nothing to combine)
+    """
+    outputs, _ = await tree_reduce_levels(leaves, combine_fn, fan_in, plan)
+    return outputs[-1][0] if outputs[-1] else ""
@@ -0,0 +1,240 @@
+"""
+Up-front planning of how a document is summarized.
+
+Given the document size and the model's context, output and rate limits,
+the planner estimates three strategies and picks the one with the lowest
+estimated latency (then fewest calls):
+
+- single_shot: the whole document in one request
+- map_reduce: one map round sized so all chunk summaries fit one combine
+- multi_round: one map round and as many combine rounds as needed
+
+Estimates use a simple per-call latency model (fixed overhead + prefill +
+generation) and are bounded below by the model's RPM/TPM limits.
+"""
+
+import math
+from typing import Any, Dict, List, Optional
+
+from utils.model_constants import get_model_config
+
+# Latency model shared by all models; generation speed is per model
+BASE_CALL_SECONDS = 0.5  # Connection, queueing and time to first token
+PREFILL_TOKENS_PER_SECOND = 5000  # Prompt processing speed
+
+# Chunk summaries shorter than this lose too much to be worth a single reduce
+MIN_MAP_TARGET_TOKENS = 200
+
+# Greedy paragraph packing overshoots an even split; leave it some room
+CHUNK_SLACK = 1.1
+
+class ReductionPlan:
+    SINGLE_SHOT = "single_shot"
+    MAP_REDUCE = "map_reduce"
+    MULTI_ROUND = "multi_round"
+
+    def __init__(
+        self,
+        strategy: str,
+        model_name: str,
+        document_tokens: int,
+        chunk_tokens: int,
+        num_chunks: int,
+        map_target_tokens: int,
+        final_target_tokens: int,
+        fan_in: int,
+        reduce_rounds: int,
+        calls: int,
+        total_tokens: int,
+        estimated_seconds: float,
+        reduce_tokens: int = 0,
+        reduce_seconds: float = 0.0
+    ):
+        self.strategy = strategy
+        self.model_name = model_name
+        self.document_tokens = document_tokens
+        self.chunk_tokens = chunk_tokens
+        self.num_chunks = num_chunks
+        self.map_target_tokens = map_target_tokens
+        self.final_target_tokens = final_target_tokens
+        self.fan_in = fan_in
+        self.reduce_rounds = reduce_rounds
+        self.calls = calls
+        self.total_tokens = total_tokens
+        self.estimated_seconds = estimated_seconds
+        # Share of the estimates spent after the map round
+        self.reduce_tokens = reduce_tokens
+        self.reduce_seconds = reduce_seconds
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "strategy": self.strategy,
+            "model_name": self.model_name,
+            "document_tokens": self.document_tokens,
+            "chunk_tokens": self.chunk_tokens,
+            "num_chunks": self.num_chunks,
+            "map_target_tokens": self.map_target_tokens,
+            "final_target_tokens": self.final_target_tokens,
+            "fan_in": self.fan_in,
+            "reduce_rounds": self.reduce_rounds,
+            "calls": self.calls,
+            "total_tokens": self.total_tokens,
+            "estimated_seconds": round(self.estimated_seconds, 1),
+            "reduce_tokens": self.reduce_tokens,
+            "reduce_seconds": round(self.reduce_seconds, 1),
+        }
+
+def estimate_call_seconds(model_config: Dict[str, Any], input_tokens: int, output_tokens: int) -> float:
+    """Estimated latency of one request."""
+    return (
+        BASE_CALL_SECONDS
+        + input_tokens / PREFILL_TOKENS_PER_SECOND
+        + output_tokens / model_config["output_tokens_per_second"]
+    )
+
+def _waves(calls: int, concurrency: int) -> int:
+    """Number of back-to-back batches needed to run calls with bounded concurrency."""
+    return math.ceil(calls / max(1, concurrency))
+
+def _rate_limit_floor(model_config: Dict[str, Any], calls: int, total_tokens: int) -> float:
+    """Minimum seconds the account's RPM and TPM limits allow for this much work."""
+    return max(
+        60 * calls / model_config["requests_per_minute"],
+        60 * total_tokens / model_config["tokens_per_minute"]
+    )
+
+def _single_shot(document_tokens: int, model_name: str, config: Dict[str, Any]) -> Optional[ReductionPlan]:
+    target = config["target_summary_tokens"]
+    overhead = config["overhead_tokens"]
+    input_limit = config["context_window"] - target - overhead
+    total_tokens = document_tokens + overhead + target
+    if document_tokens > input_limit or total_tokens > config["tokens_per_minute"]:
+        return None
+
+    seconds = estimate_call_seconds(config, document_tokens + overhead, target)
+    return ReductionPlan(
+        ReductionPlan.SINGLE_SHOT, model_name, document_tokens,
+        chunk_tokens=input_limit,
+        num_chunks=1,
+        map_target_tokens=target,
+        final_target_tokens=target,
+        fan_in=2,
+        reduce_rounds=0,
+        calls=1,
+        total_tokens=total_tokens,
+        estimated_seconds=max(seconds, _rate_limit_floor(config, 1, total_tokens))
+    )
+
+def _map_phase(document_tokens: int, config: Dict[str, Any]):
+    """Chunk count and an evenly balanced chunk size for the map round."""
+    map_limit = config["max_tokens_per_chunk"] - config["overhead_tokens"]
+    num_chunks = max(1, math.ceil(document_tokens / map_limit))
+    chunk_tokens = min(map_limit, math.ceil(document_tokens / num_chunks * CHUNK_SLACK))
+    return num_chunks, chunk_tokens
+
+def _map_reduce(document_tokens: int, model_name: str, config: Dict[str, Any]) -> Optional[ReductionPlan]:
+    target = config["target_summary_tokens"]
+    overhead = config["overhead_tokens"]
+    reduce_budget = config["max_tokens_per_chunk"] - overhead
+    num_chunks, chunk_tokens = _map_phase(document_tokens, config)
+    if num_chunks < 2:
+        return None
+
+    # Shrink chunk summaries until they all fit a single combine request. Halving
+    # in steps keeps the target (part of the chunk cache key) the same when an
+    # edit adds or removes a chunk, so unchanged chunks stay cached
+    map_target = target
+    while map_target > reduce_budget // num_chunks:
+        map_target //= 2
+    if map_target < MIN_MAP_TARGET_TOKENS:
+        return None
+
+    map_seconds = _waves(num_chunks, config["max_concurrent_requests"]) * estimate_call_seconds(
+        config, chunk_tokens + overhead, map_target
+    )
+    reduce_seconds = estimate_call_seconds(config, num_chunks * map_target + overhead, target)
+    calls = num_chunks + 1
+    total_tokens = (
+        document_tokens + num_chunks * (overhead + map_target)
+        + num_chunks * map_target + overhead + target
+    )
+    return ReductionPlan(
+        ReductionPlan.MAP_REDUCE, model_name, document_tokens,
+        chunk_tokens=chunk_tokens,
+        num_chunks=num_chunks,
+        map_target_tokens=map_target,
+        final_target_tokens=target,
+        fan_in=max(2, reduce_budget // map_target),
+        reduce_rounds=1,
+        calls=calls,
+        total_tokens=total_tokens,
+        estimated_seconds=max(map_seconds + reduce_seconds, _rate_limit_floor(config, calls, total_tokens)),
+        reduce_tokens=num_chunks * map_target + overhead + target,
+        reduce_seconds=reduce_seconds
+    )
+
+def _multi_round(document_tokens: int, model_name: str, config: Dict[str, Any]) -> ReductionPlan:
+    target = config["target_summary_tokens"]
+    overhead = config["overhead_tokens"]
+    concurrency = config["max_concurrent_requests"]
+    fan_in = max(2, (config["max_tokens_per_chunk"] - overhead) // target)
+    num_chunks, chunk_tokens = _map_phase(document_tokens, config)
+
+    map_seconds = _waves(num_chunks, concurrency) * estimate_call_seconds(config, chunk_tokens + overhead, target)
+    calls = num_chunks
+    map_tokens = document_tokens + num_chunks * (overhead + target)
+    reduce_seconds = 0.0
+    reduce_tokens = 0
+    rounds = 0
+    remaining = num_chunks
+    while remaining > 1:
+        groups = math.ceil(remaining / fan_in)
+        reduce_seconds += _waves(groups, concurrency) * estimate_call_seconds(config, fan_in * target + overhead, target)
+        calls += groups
+        reduce_tokens += remaining * target + groups * (overhead + target)
+        remaining = groups
+        rounds += 1
+    total_tokens = map_tokens + reduce_tokens
+
+    return ReductionPlan(
+        ReductionPlan.MULTI_ROUND, model_name, document_tokens,
+        chunk_tokens=chunk_tokens,
+        num_chunks=num_chunks,
+        map_target_tokens=target,
+        final_target_tokens=target,
+        fan_in=fan_in,
+        reduce_rounds=rounds,
+        calls=calls,
+        total_tokens=total_tokens,
+        estimated_seconds=max(map_seconds + reduce_seconds, _rate_limit_floor(config, calls, total_tokens)),
+        reduce_tokens=reduce_tokens,
+        reduce_seconds=reduce_seconds
+    )
+
+def plan_candidates(document_tokens: int, model_name: str = None) -> List[ReductionPlan]:
+    """All feasible plans for a document, best first."""
+    config = get_model_config(model_name)
+    model_name = config["name"]
+    candidates = [
+        plan for plan in (
+            _single_shot(document_tokens, model_name, config),
+            _map_reduce(document_tokens, model_name, config),
+            _multi_round(document_tokens, model_name, config),
+        )
+        if plan is not None
+    ]
+    return sorted(candidates, key=lambda plan: (plan.estimated_seconds, plan.calls))
+
+def plan_reduction(document_tokens: int, model_name: str = None) -> ReductionPlan:
+    """
+    Choose how to summarize a document of the given size.
+
+    Args:
+        document_tokens: Token count of the whole document
+        model_name: Model the summary will be generated with
+
+    Returns:
+        The plan with the lowest estimated latency, then fewest calls
+    """
+    # Multi-round is always feasible, so there is at least one candidate
+    return plan_candidates(document_tokens, model_name)[0]
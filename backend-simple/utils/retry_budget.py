@@ -0,0 +1,102 @@
+"""
+Per-job retry budget for LLM calls.
+
+Retries happen in one place only, the provider router: a failed call fails
+over to another target or key, or goes round again after a backoff. Each
+of those extra attempts takes one retry from the job's budget, so a flaky
+provider costs a job a bounded number of extra requests instead of the
+product of nested retry loops; once the budget is spent the next failure
+fails the job. Like the hedge budget, it lives in a context variable so
+every task the job creates draws from the same budget.
+"""
+
+import os
+import math
+import random
+import logging
+from contextvars import ContextVar
+from typing import Optional
+
+from utils.metrics import metrics
+
+RETRY_BUDGET_FRACTION = float(os.getenv("RETRY_BUDGET_FRACTION", 0.2))  # Retries per planned call
+RETRY_BUDGET_MIN = int(os.getenv("RETRY_BUDGET_MIN", 3))
+MAX_ATTEMPTS_PER_CALL = int(os.getenv("MAX_ATTEMPTS_PER_CALL", 4))
+RETRY_BASE_DELAY = 1.0  # Seconds before the second round over a model's targets
+RETRY_MAX_DELAY = 30.0
+
+logger = logging.getLogger(__name__)
+
+class RetryBudget:
+    """Caps how many retries one job may make across all of its calls."""
+
+    def __init__(self, max_retries: int):
+        self.max_retries = max_retries
+        self.used = 0
+        self.exhausted = False
+
+    def try_acquire(self) -> bool:
+        if self.used >= self.max_retries:
+            self.exhausted = True
+            return False
+        self.used += 1
+        return True
+
+    def charge(self, retries: int) -> None:
+        """Count retries made on this job's behalf by a call it shared (see utils/micro_batch.py)."""
+        self.used += retries
+
+_retry_budget: ContextVar[Optional[RetryBudget]] = ContextVar("retry_budget", default=None)
+
+def start_retry_budget(num_calls: int) -> RetryBudget:
+    """Give the current job a budget proportional to its planned call count."""
+    budget = RetryBudget(max(RETRY_BUDGET_MIN, math.ceil(num_calls * RETRY_BUDGET_FRACTION)))
+    _retry_budget.set(budget)
+    return budget
+
+def current_retry_budget() -> Optional[RetryBudget]:
+    """The current job's budget, or None outside a job."""
+    return _retry_budget.get()
+
+def take_retry(attempt: int, model_name: str) -> bool:
+    """
+    Whether a call that just failed may make another attempt.
+
+    Args:
+        attempt: Attempts the call has made so far
+        model_name: Model, for the metrics
+
+    Calls outside a job (no budget) are only bounded by MAX_ATTEMPTS_PER_CALL.
+    """
+    if attempt >= MAX_ATTEMPTS_PER_CALL:
+        metrics.increment("retries_refused", model=model_name, reason="call")
+        return False
+    budget = _retry_budget.get()
+    if budget is not None and not budget.try_acquire():
+        metrics.increment("retries_refused", model=model_name, reason="budget")
+        logger.warning(f"Retry budget of {budget.max_retries} spent, failing the call")
+        return False
+    metrics.increment("llm_retries", model=model_name)
+    return True
+
+def backoff_delay(round_num: int) -> float:
+    """Seconds to wait before going round a model's targets again, with jitter."""
+    delay = min(RETRY_BASE_DELAY * (2 ** round_num), RETRY_MAX_DELAY)
+    return delay + random.uniform(0, 0.1 * delay)
+
+def record_job_retries(budget: Optional[RetryBudget]) -> None:
+    """Add a finished job's retry count to the metrics."""
+    if budget is None:
+        return
+    if budget.used == 0:
+        bucket = "0"
+    elif budget.used <= 2:
+        bucket = "1-2"
+    elif budget.used <= 5:
+        bucket = "3-5"
+    else:
+        bucket = "6+"
+    metrics.increment("jobs_by_retries", retries=bucket)
+    metrics.increment("job_retries", budget.used)
+    if budget.exhausted:
+        metrics.increment("jobs_retry_budget_exhausted")
@@ -0,0 +1,130 @@
+"""
+Single-flight deduplication of summary jobs.
+
+Identical requests (same text, model and pipeline options) that arrive
+while a job for them is still running attach to that job instead of
+starting their own: they get its job id, so they poll the same progress and
+receive the same result. The in-flight marker lives in Redis when REDIS_URL
+is set, so requests landing on different workers or replicas coalesce too;
+otherwise it is kept in process memory.
+
+Requests that attach with their own source id are recorded on the marker,
+so the running job can store its chunk layout and summary tree under every
+attached source too, not only its own. The marker is removed when the job
+ends, and expires after SINGLE_FLIGHT_TTL_SECONDS in case the replica
+running the job dies.
+"""
+
+import os
+import json
+import logging
+from typing import Any, Dict, List, Optional, Set
+
+from utils.redis_client import get_redis_client
+from utils.summary_cache import text_hash
+
+SINGLE_FLIGHT_ENABLED = os.getenv("SINGLE_FLIGHT_ENABLED", "true").lower() == "true"
+SINGLE_FLIGHT_TTL_SECONDS = int(os.getenv("SINGLE_FLIGHT_TTL_SECONDS", 30 * 60))
+SINGLE_FLIGHT_KEY_PREFIX = "openbooklm:inflight:"
+
+logger = logging.getLogger(__name__)
+
+# Take the marker, or attach the source id (if any) to the job holding it, in one step
+CLAIM_SCRIPT = """
+if redis.call('SET', KEYS[1], ARGV[1], 'NX', 'EX', ARGV[2]) then
+    return false
+end
+if ARGV[3] ~= '' then
+    redis.call('SADD', KEYS[2], ARGV[3])
+    redis.call('EXPIRE', KEYS[2], ARGV[2])
+end
+return redis.call('GET', KEYS[1])
+"""
+
+# Delete the marker only if it still names this job, returning the attached source ids
+RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    local sources = redis.call('SMEMBERS', KEYS[2])
+    redis.call('DEL', KEYS[1], KEYS[2])
+    return sources
+end
+return {}
+"""
+
+def job_key(text: str, model_name: str, options: Dict[str, Any]) -> str:
+    """Identity of a summary job: content hash, model and the options that shape the result."""
+    params = json.dumps({"model": model_name, **options}, sort_keys=True)
+    return f"{text_hash(text)}:{text_hash(params)[:16]}"
+
+class SingleFlight:
+    def __init__(self, ttl: int = SINGLE_FLIGHT_TTL_SECONDS):
+        self.ttl = ttl
+        self._local: Dict[str, str] = {}
+        self._attached: Dict[str, Set[str]] = {}
+        self._claim_script = None
+        self._release_script = None
+
+    @staticmethod
+    def _redis_keys(key: str) -> List[str]:
+        return [SINGLE_FLIGHT_KEY_PREFIX + key, SINGLE_FLIGHT_KEY_PREFIX + key + ":sources"]
+
+    async def claim(self, key: str, job_id: str, source_id: Optional[str] = None) -> Optional[str]:
+        """
+        Register job_id as the job for key unless one is already running.
+
+        Args:
+            key: Job identity from job_key
+            job_id: Id the new job will run under
+            source_id: The request's source id, recorded on the running job if it attaches
+
+        Returns:
+            None if job_id now owns the key and should run, else the id of
+            the in-flight job to attach to
+        """
+        if not SINGLE_FLIGHT_ENABLED:
+            return None
+        redis = get_redis_client()
+        if redis is not None:
+            try:
+                if self._claim_script is None:
+                    self._claim_script = redis.register_script(CLAIM_SCRIPT)
+                return await self._claim_script(
+                    keys=self._redis_keys(key), args=[job_id, self.ttl, source_id or ""]
+                )
+            except Exception as e:
+                logger.warning(f"Single-flight claim for {key} failed in Redis: {str(e)}")
+
+        current = self._local.get(key)
+        if current:
+            if source_id:
+                self._attached.setdefault(key, set()).add(source_id)
+            return current
+        self._local[key] = job_id
+        return None
+
+    async def release(self, key: str, job_id: str) -> List[str]:
+        """
+        Remove the in-flight marker if job_id still holds it.
+
+        Returns:
+            Source ids of the requests that attached to the job; empty if
+            job_id no longer held the marker (e.g. it was already released)
+        """
+        if not SINGLE_FLIGHT_ENABLED:
+            return []
+        redis = get_redis_client()
+        if redis is not None:
+            try:
+                if self._release_script is None:
+                    self._release_script = redis.register_script(RELEASE_SCRIPT)
+                return sorted(await self._release_script(keys=self._redis_keys(key), args=[job_id]))
+            except Exception as e:
+                logger.warning(f"Single-flight release for {key} failed in Redis: {str(e)}")
+
+        if self._local.get(key) != job_id:
+            return []
+        del self._local[key]
+        return sorted(self._attached.pop(key, set()))
+
+# Shared single-flight registry for the process
+single_flight = SingleFlight()
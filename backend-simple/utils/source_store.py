@@ -0,0 +1,66 @@
+"""
+Persisted per-source summarization state.
+
+Stores what the last run of a source produced (chunk layout, reduce tree
+layout and final summary) so an edited source can be re-summarized
+incrementally. Kept in Redis when REDIS_URL is set, otherwise in memory.
+"""
+
+import os
+import json
+import time
+import logging
+from typing import Any, Dict, List, Optional
+
+from utils.redis_client import get_redis_client
+
+SOURCE_STATE_TTL_SECONDS = int(os.getenv("SOURCE_STATE_TTL_SECONDS", 30 * 24 * 60 * 60))
+SOURCE_KEY_PREFIX = "openbooklm:source:"
+
+logger = logging.getLogger(__name__)
+
+class SourceStore:
+    def __init__(self, ttl: int = SOURCE_STATE_TTL_SECONDS):
+        self.ttl = ttl
+        self._local: Dict[str, Dict[str, Any]] = {}
+
+    async def get(self, source_id: str) -> Optional[Dict[str, Any]]:
+        """Get the stored state for a source, or None if it was never summarized."""
+        redis = get_redis_client()
+        if redis is not None:
+            try:
+                data = await redis.get(SOURCE_KEY_PREFIX + source_id)
+                if data:
+                    return json.loads(data)
+            except Exception as e:
+                logger.warning(f"Failed to read source {source_id} from Redis: {str(e)}")
+        return self._local.get(source_id)
+
+    async def get_many(self, source_ids: List[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+        """Get stored state for several sources in one round trip."""
+        redis = get_redis_client()
+        if redis is not None and source_ids:
+            try:
+                values = await redis.mget([SOURCE_KEY_PREFIX + source_id for source_id in source_ids])
+                return {
+                    source_id: json.loads(data) if data else self._local.get(source_id)
+                    for source_id, data in zip(source_ids, values)
+                }
+            except Exception as e:
+                logger.warning(f"Failed to read sources from Redis: {str(e)}")
+        return {source_id: self._local.get(source_id) for source_id in source_ids}
+
+    async def save(self, source_id: str, state: Dict[str, Any]) -> None:
+        """Replace the stored state for a source."""
+        state = {**state, "source_id": source_id, "updated_at": time.time()}
+        redis = get_redis_client()
+        if redis is not None:
+            try:
+                await redis.set(SOURCE_KEY_PREFIX + source_id, json.dumps(state), ex=self.ttl)
+                return
+            except Exception as e:
+                logger.warning(f"Failed to save source {source_id} to Redis: {str(e)}")
+        self._local[source_id] = state
+
+# Shared store for the process
+source_store = SourceStore()
@@ -0,0 +1,152 @@
+"""
+Deadline and token/cost limits for a summarization job.
+
+A SummaryBudget gates every map call: once starting another chunk would
+eat into the time or tokens reserved for the reduce phase, the chunk is
+skipped and the job finishes with the summaries it has, flagged as partial.
+Chunks are scheduled by priority (intro, conclusion, section starts) so the
+most informative ones are summarized before a limit is hit.
+"""
+
+import re
+import time
+from typing import Any, Dict, List, Optional
+
+from utils.metrics import metrics
+
+# Lines that look like section headings: markdown, numbered, chapter/section or short all-caps
+HEADING_PATTERN = re.compile(
+    r"^(#{1,6}\s+\S|(\d+(\.\d+)*\.?|[IVXLC]+\.)\s+[A-Z]|(chapter|section|part)\s+\w+)",
+    re.IGNORECASE
+)
+MAX_HEADING_CHARS = 80
+
+def is_heading(paragraph: str) -> bool:
+    """Whether a paragraph starts with a section heading line."""
+    line = paragraph.strip().split('\n', 1)[0].strip()
+    if not line or len(line) > MAX_HEADING_CHARS:
+        return False
+    if HEADING_PATTERN.match(line):
+        return True
+    return line.isupper() and not line.endswith(('.', '!', '?'))
+
+def prioritize_chunks(chunks: List[str]) -> List[int]:
+    """
+    Order chunk indices by how much they are likely to matter to the summary.
+
+    Intro first, then the conclusion, then chunks that open a section, then
+    chunks containing a section heading, then the rest; document order within
+    each tier.
+    """
+    def tier(index: int) -> int:
+        if index == 0:
+            return 0
+        if index == len(chunks) - 1:
+            return 1
+        paragraphs = chunks[index].split('\n\n')
+        if is_heading(paragraphs[0]):
+            return 2
+        if any(is_heading(p) for p in paragraphs[1:]):
+            return 3
+        return 4
+
+    return sorted(range(len(chunks)), key=lambda index: (tier(index), index))
+
+class SummaryBudget:
+    """Tracks a job's deadline and token/cost spend."""
+
+    def __init__(
+        self,
+        model_config: Dict[str, Any],
+        deadline_seconds: Optional[float] = None,
+        token_budget: Optional[int] = None,
+        cost_budget: Optional[float] = None,
+        reserve_seconds: float = 0.0,
+        reserve_tokens: int = 0
+    ):
+        self.model_config = model_config
+        self.started_at = time.monotonic()
+        self.deadline = self.started_at + deadline_seconds if deadline_seconds else None
+        self.token_budget = token_budget
+        self.cost_budget = cost_budget
+        # Kept back from the map phase so the partial summaries can still be combined
+        self.reserve_seconds = reserve_seconds
+        self.reserve_tokens = reserve_tokens
+        self.tokens_used = 0
+        self.cost = 0.0
+        self.skipped_chunks = 0
+        self.combine_timeouts = 0
+        self.limit_hit: Optional[str] = None
+
+    def call_cost(self, input_tokens: int, output_tokens: int) -> float:
+        """USD cost of a call under the model's prices."""
+        return (
+            input_tokens * self.model_config["input_cost_per_1k"]
+            + output_tokens * self.model_config["output_cost_per_1k"]
+        ) / 1000
+
+    def map_time_left(self) -> Optional[float]:
+        """Seconds a map call may still run, or None without a deadline."""
+        if self.deadline is None:
+            return None
+        return self.deadline - self.reserve_seconds - time.monotonic()
+
+    def time_left(self) -> Optional[float]:
+        """Seconds until the deadline, or None without one."""
+        if self.deadline is None:
+            return None
+        return self.deadline - time.monotonic()
+
+    def reserve_map_call(self, input_tokens: int, output_tokens: int) -> bool:
+        """Claim budget for one chunk call; False means skip the chunk."""
+        time_left = self.map_time_left()
+        if time_left is not None and time_left <= 0:
+            return self._skip("deadline")
+
+        tokens = input_tokens + output_tokens
+        if self.token_budget is not None and self.tokens_used + tokens + self.reserve_tokens > self.token_budget:
+            return self._skip("tokens")
+
+        cost = self.call_cost(input_tokens, output_tokens)
+        reserve_cost = self.call_cost(self.reserve_tokens, 0)
+        if self.cost_budget is not None and self.cost + cost + reserve_cost > self.cost_budget:
+            return self._skip("cost")
+
+        self.tokens_used += tokens
+        self.cost += cost
+        return True
+
+    def record_call(self, input_tokens: int, output_tokens: int) -> None:
+        """Account for a call that was not reserved up front (e.g. a combine)."""
+        self.tokens_used += input_tokens + output_tokens
+        self.cost += self.call_cost(input_tokens, output_tokens)
+
+    def record_timeout(self) -> None:
+        """A started map call was cut off by the deadline."""
+        self._skip("deadline")
+
+    def record_combine_timeout(self) -> None:
+        """A combine call was cut off by the deadline; its inputs were passed up as they are."""
+        self.combine_timeouts += 1
+        self.limit_hit = self.limit_hit or "deadline"
+        metrics.increment("combines_timed_out")
+
+    @property
+    def partial(self) -> bool:
+        return self.skipped_chunks > 0 or self.combine_timeouts > 0
+
+    def _skip(self, reason: str) -> bool:
+        self.skipped_chunks += 1
+        self.limit_hit = self.limit_hit or reason
+        metrics.increment("chunks_skipped", reason=reason)
+        return False
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "elapsed_seconds": round(time.monotonic() - self.started_at, 2),
+            "tokens_used": self.tokens_used,
+            "cost_usd": round(self.cost, 6),
+            "skipped_chunks": self.skipped_chunks,
+            "combine_timeouts": self.combine_timeouts,
+            "limit_hit": self.limit_hit,
+        }
@@ -0,0 +1,105 @@
+"""
+Chunk-level memoization of summaries.
+
+Keys combine the input text hash with the model, a hash of the prompt
+templates and the target summary length, so changing any of them misses
+the cache. Lookups go through an in-process LRU first and then Redis
+(when REDIS_URL is set). Both tiers expire entries after a TTL.
+"""
+
+import os
+import time
+import hashlib
+import logging
+from collections import OrderedDict
+from typing import Iterable, Optional
+
+from utils.redis_client import get_redis_client
+from utils.metrics import metrics
+
+SUMMARY_CACHE_MAX_ENTRIES = int(os.getenv("SUMMARY_CACHE_MAX_ENTRIES", 2048))
+SUMMARY_CACHE_TTL_SECONDS = int(os.getenv("SUMMARY_CACHE_TTL_SECONDS", 7 * 24 * 60 * 60))
+SUMMARY_CACHE_KEY_PREFIX = "openbooklm:summary:"
+
+logger = logging.getLogger(__name__)
+
+def text_hash(text: str) -> str:
+    """Stable hash of a piece of text."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def prompt_version(*templates: str) -> str:
+    """Short hash identifying a set of prompt templates."""
+    return text_hash("\x1f".join(templates))[:12]
+
+def combined_hash(hashes: Iterable[str]) -> str:
+    """Hash for a combine step, derived from its ordered children's hashes."""
+    return text_hash(":".join(hashes))
+
+class SummaryCache:
+    def __init__(
+        self,
+        max_entries: int = SUMMARY_CACHE_MAX_ENTRIES,
+        ttl: int = SUMMARY_CACHE_TTL_SECONDS
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lru: "OrderedDict[str, tuple[float, str]]" = OrderedDict()
+
+    @staticmethod
+    def make_key(
+        kind: str,
+        content_hash: str,
+        model_name: str,
+        prompt_hash: str,
+        target_tokens: int
+    ) -> str:
+        """Build a cache key; kind separates chunk summaries from combines."""
+        return f"{kind}:{model_name}:{prompt_hash}:{target_tokens}:{content_hash}"
+
+    async def get(self, key: str, kind: str = "chunk") -> Optional[str]:
+        """Look up a summary in memory, then Redis."""
+        entry = self._lru.get(key)
+        if entry is not None:
+            expires_at, summary = entry
+            if expires_at > time.time():
+                self._lru.move_to_end(key)
+                metrics.increment("summary_cache_hits", kind=kind, tier="memory")
+                return summary
+            del self._lru[key]
+
+        redis = get_redis_client()
+        if redis is not None:
+            try:
+                summary = await redis.get(SUMMARY_CACHE_KEY_PREFIX + key)
+                if summary:
+                    self._remember(key, summary)
+                    metrics.increment("summary_cache_hits", kind=kind, tier="redis")
+                    return summary
+            except Exception as e:
+                logger.warning(f"Summary cache read failed: {str(e)}")
+
+        metrics.increment("summary_cache_misses", kind=kind)
+        return None
+
+    async def set(self, key: str, summary: str) -> None:
+        """Store a summary in both tiers."""
+        if not summary:
+            return
+        self._remember(key, summary)
+
+        redis = get_redis_client()
+        if redis is not None:
+            try:
+                await redis.set(SUMMARY_CACHE_KEY_PREFIX + key, summary, ex=self.ttl)
+            except Exception as e:
+                logger.warning(f"Summary cache write failed: {str(e)}")
+
+    def _remember(self, key: str, summary: str) -> None:
+        self._lru[key] = (time.time() + self.ttl, summary)
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_entries:
+            self._lru.popitem(last=False)
+            metrics.increment("summary_cache_evictions")
+
+# Shared cache for the process
+summary_cache = SummaryCache()
@@ -0,0 +1,148 @@
+"""
+Persisted summary trees.
+
+A run's whole reduce tree is kept, not just the final summary: chunk
+summaries at the leaves, section summaries for each combine group and the
+document summary at the root. Every node records which span of the text it
+covers and its token counts, so "more detail on section 3" is served from
+stored nodes without another LLM call. Kept in Redis when REDIS_URL is set,
+otherwise in memory.
+"""
+
+import os
+import json
+import time
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from utils.token_counter import count_tokens
+from utils.redis_client import get_redis_client
+
+SUMMARY_TREE_TTL_SECONDS = int(os.getenv("SUMMARY_TREE_TTL_SECONDS", 30 * 24 * 60 * 60))
+TREE_KEY_PREFIX = "openbooklm:tree:"
+# Characters of a chunk's start/end used to locate it in the text
+ANCHOR_CHARS = 40
+
+logger = logging.getLogger(__name__)
+
+def node_id(level: int, index: int) -> str:
+    return f"{level}.{index}"
+
+def _locate_chunks(text: str, chunks: List[str]) -> List[Tuple[Optional[int], Optional[int]]]:
+    """Character span of each chunk in text, None where it can't be found.
+
+    Chunks are stripped paragraphs re-joined, so they are matched by their
+    first and last characters rather than as a whole.
+    """
+    spans = []
+    cursor = 0
+    for chunk in chunks:
+        head = chunk[:ANCHOR_CHARS]
+        tail = chunk[-ANCHOR_CHARS:]
+        start = text.find(head, cursor)
+        end = text.find(tail, start + max(0, len(chunk) - len(tail) - ANCHOR_CHARS)) if start >= 0 else -1
+        if start < 0 or end < 0:
+            spans.append((None, None))
+            continue
+        end += len(tail)
+        spans.append((start, end))
+        cursor = end
+    return spans
+
+def build_summary_tree(
+    text: str,
+    chunks: List[str],
+    outputs: List[List[str]],
+    sizes: List[List[int]]
+) -> Dict[str, Any]:
+    """
+    Build the stored tree from a reduce run.
+
+    Args:
+        text: The text that was chunked
+        chunks: Chunk texts in document order
+        outputs: Summaries per level, chunk summaries first, document summary last
+        sizes: Group sizes per level above the chunks
+
+    Returns:
+        Tree with a flat node map keyed by "level.index" and the root id
+    """
+    nodes: Dict[str, Dict[str, Any]] = {}
+    top = len(outputs) - 1
+    spans = _locate_chunks(text, chunks)
+    for index, (chunk, summary) in enumerate(zip(chunks, outputs[0])):
+        start, end = spans[index]
+        nodes[node_id(0, index)] = {
+            "id": node_id(0, index),
+            "kind": "document" if top == 0 else "chunk",
+            "level": 0,
+            "start": start,
+            "end": end,
+            "source_tokens": count_tokens(chunk),
+            "tokens": count_tokens(summary),
+            "summary": summary,
+            "children": [],
+        }
+
+    for level, level_sizes in enumerate(sizes, start=1):
+        first = 0
+        for index, size in enumerate(level_sizes):
+            children = [nodes[node_id(level - 1, first + i)] for i in range(size)]
+            first += size
+            starts = [child["start"] for child in children]
+            ends = [child["end"] for child in children]
+            summary = outputs[level][index]
+            nodes[node_id(level, index)] = {
+                "id": node_id(level, index),
+                "kind": "document" if level == top else "section",
+                "level": level,
+                "start": starts[0] if None not in starts else None,
+                "end": ends[-1] if None not in ends else None,
+                "source_tokens": sum(child["source_tokens"] for child in children),
+                "tokens": count_tokens(summary),
+                "summary": summary,
+                "children": [child["id"] for child in children],
+            }
+
+    return {
+        "root": node_id(top, 0) if outputs[top] else None,
+        "depth": top,
+        "text_chars": len(text),
+        "nodes": nodes,
+    }
+
+def node_outline(node: Dict[str, Any]) -> Dict[str, Any]:
+    """A node without its summary text."""
+    return {key: value for key, value in node.items() if key != "summary"}
+
+class SummaryTreeStore:
+    def __init__(self, ttl: int = SUMMARY_TREE_TTL_SECONDS):
+        self.ttl = ttl
+        self._local: Dict[str, Dict[str, Any]] = {}
+
+    async def get(self, tree_id: str) -> Optional[Dict[str, Any]]:
+        """Get a stored tree, or None if it doesn't exist or has expired."""
+        redis = get_redis_client()
+        if redis is not None:
+            try:
+                data = await redis.get(TREE_KEY_PREFIX + tree_id)
+                if data:
+                    return json.loads(data)
+            except Exception as e:
+                logger.warning(f"Failed to read summary tree {tree_id} from Redis: {str(e)}")
+        return self._local.get(tree_id)
+
+    async def save(self, tree_id: str, tree: Dict[str, Any]) -> None:
+        """Replace the stored tree."""
+        tree = {**tree, "tree_id": tree_id, "updated_at": time.time()}
+        redis = get_redis_client()
+        if redis is not None:
+            try:
+                await redis.set(TREE_KEY_PREFIX + tree_id, json.dumps(tree), ex=self.ttl)
+                return
+            except Exception as e:
+                logger.warning(f"Failed to save summary tree {tree_id} to Redis: {str(e)}")
+        self._local[tree_id] = tree
+
+# Shared store for the process
+summary_tree_store = SummaryTreeStore()
@@ -34,54 +34,20 @@ def get_cerebras_client() -> Cerebras:
         return client
 
 
-def is_model_rate_limited(
-    client: Cerebras,
-    model_name: str,
-    text: str = "Will I get a 429 error?"
-) -> bool:
-    """ Test the rate limit for this model
-    returns True if the model is rate limited, False otherwise """
-    from cerebras.cloud.sdk import (
-        APIConnectionError,
-        RateLimitError,
-        APIStatusError
-    )
-    try:
-        _ = client.chat.completions.create(
-            model=model_name,
-            messages=[{"role": "user", "content": text}],
-            stream=False
-        )
-    except RateLimitError as e:
-        return True
-        # raise RateLimitError(f"Rate limit exceeded: {e}")
-    except APIConnectionError as e:
-        raise APIConnectionError(f"Connection error: {e}")
-    except APIStatusError as e:
-        raise APIStatusError(f"API status error: {e}")
-    except Exception as e:
-        raise Exception(f"An error occurred: {e}")
-    finally:
-        return False
-
-
-def select_model(models_and_context_wins: dict) -> str:
+def select_model(models_and_context_wins: dict) -> str | None:
     """
-    Select a model that is not rate limited
-    do quick rate limit test to see if we should change models
+    Select the first model whose circuit breaker lets calls through.
+    Health comes from the outcomes of real calls, so no test request is sent;
+    returns None if every model's circuit is open.
     """
     import sys
+    from backend.utils.health_registry import health_registry
     if len(models_and_context_wins) == 0:
         sys.exit("No models found")
-    for model_name in models_and_context_wins.keys():
-        if not is_model_rate_limited(
-            client=get_cerebras_client(),
-            model_name=model_name
-        ):
-            print(f'Selected model: {model_name}')
-            return model_name
-
-    sys.exit("No model found that is not rate limited")
+    model_name = health_registry.select_model("cerebras", list(models_and_context_wins))
+    if model_name:
+        print(f'Selected model: {model_name}')
+    return model_name
 
 
 def digest_input(text_to_summ_fullpath: str) -> str:
@@ -150,7 +116,8 @@ def chunkify_text(
             chunk_text = tokenizer.decode(chunk_ids, skip_special_tokens=True)
         except Exception as e:
             raise Exception(f"A tokenizer.decode error occurred: {e}")
-        chunks.append((count_tokens(chunk_text), chunk_text))
+        # token count is already known from the ids - no need to re-encode
+        chunks.append((len(chunk_ids), chunk_text))
     return chunks
 
 
@@ -2,6 +2,7 @@
 
 import os
 import sys
+import time
 from transformers import AutoTokenizer
 from cerebras.cloud.sdk import Cerebras
 from cerebras.cloud.sdk import (
@@ -17,6 +18,9 @@ ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
 sys.path.append(ROOT)
 load_dotenv()
 
+from backend.utils.health_registry import health_registry
+from backend.cerebras.utils.cerebras_helpers import record_failure
+
 
 def get_cerebras_client() -> Cerebras | None:
     CEREBRAS_API_KEY = os.getenv('CEREBRAS_API_KEY', None)
@@ -28,35 +32,6 @@ def get_cerebras_client() -> Cerebras | None:
     return client
 
 
-def is_model_rate_limited(
-    client: Cerebras,
-    model_name: str,
-    text: str = "Will I get a 429 error?"
-) -> bool:
-    """ Test the rate limit for this model
-    returns True if the model is rate limited, False otherwise """
-    try:
-        _ = client.chat.completions.create(
-            model=model_name,
-            messages=[
-                {
-                    "role": "user", "content": text
-                }
-            ],
-            stream=False
-        )
-    except RateLimitError as e:
-        print(f"Rate limit exceeded: {e}")
-        return True
-    except APIConnectionError as e:
-        print(f"Connection error: {e}")
-    except APIStatusError as e:
-        print(f"API status error: {e}")
-    except Exception as e:
-        print(f"An error occurred: {e}")
-
-    return False
-
 # for Cerebras free mode
 models_and_context_wins = {
     "llama3.1-8b": 8192,  # 32,768 standard context window
@@ -66,23 +41,15 @@ models_and_context_wins = {
 
 def select_model(models_and_context_wins: dict) -> str | None:
     """
-    Select a model that is not rate limited
-    do quick rate limit test to see if we should change models
+    Select the first model whose circuit breaker lets calls through.
+    Health comes from the outcomes of real calls, so no test request is sent.
+    Returns None if every model's circuit is open.
     """
-    for model_name in models_and_context_wins.keys():
-        if not is_model_rate_limited(
-            client = get_cerebras_client(),
-            model_name = model_name
-        ):
-            print(f'Running on {model_name}')
-            return model_name
-    if not model_name:
-        sys.exit("No model found that is not rate limited")
-    return None
-
-
-MODEL_NAME = select_model(models_and_context_wins)
-CONTEXT_WINDOW = models_and_context_wins[MODEL_NAME]
+    return health_registry.select_model("cerebras", list(models_and_context_wins))
+
+
+# Chunks are cut before a model is picked, so they must fit the smallest window
+CONTEXT_WINDOW = min(models_and_context_wins.values())
 PROMPT_TOKENS = 250
 TARGET_OUTPUT_TOKENS = 1000
 MAX_OUTPUT_TOKENS = int(1.2 * TARGET_OUTPUT_TOKENS)
@@ -273,24 +240,43 @@ def summarize_all_chunks(
             {"role": "user", "content": user_prompt},
         ]
 
+        model_name = health_registry.select_model("cerebras", list(models_and_context_wins))
+        if model_name is None:
+            print(f"Skipping chunk {idx}: every Cerebras model's circuit is open")
+            continue
+        if debug:
+            print(f'#{idx}: running on {model_name}')
+        # Leave the completion whatever the chosen model's window has room for
+        context_window = models_and_context_wins[model_name]
+        completion_tokens = min(
+            max_output_tokens,
+            context_window - PROMPT_TOKENS - len(tokenizer.encode(chunk_str))
+        )
+
         response = None
+        start_time = time.time()
         try:
             response = client.chat.completions.create(
-                model=MODEL_NAME,
+                model=model_name,
                 messages=input_data,
-                max_completion_tokens=max_output_tokens,
+                max_completion_tokens=completion_tokens,
                 stream=False, # default is False
                 temperature=0.8,
                 timeout=3,
             )
+            health_registry.record_success("cerebras", model_name, time.time() - start_time)
         except APIConnectionError as e:
             print(f"APIConnectionError: {str(e)}")
+            record_failure(model_name, e)
         except RateLimitError as e:
             print(f"RateLimitError: {str(e)}")
+            record_failure(model_name, e)
         except APIStatusError as e:
             print(f"APIStatusError: {str(e)}")
+            record_failure(model_name, e)
         except Exception as e:
             print(f"Exception: {str(e)}")
+            record_failure(model_name, e)
 
         if response is None:
             print("No response found")
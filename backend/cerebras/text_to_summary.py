@@ -76,7 +76,9 @@ if not LLAMA_API_KEY:
 
 # Constants for API configuration
 GROQ_MODEL = os.getenv("GROQ_MODEL", "llama-3.1-8b-instant")  # Groq model
-GROQ_API_KEY = "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"
+GROQ_API_KEY = os.getenv("GROQ_API_KEY")
+if not GROQ_API_KEY:
+    raise ValueError("GROQ_API_KEY not found in environment variables")
 
 # Initialize API client
 llama = LlamaAPI(GROQ_API_KEY)  # We'll override the endpoint in make_api_call
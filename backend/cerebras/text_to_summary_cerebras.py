@@ -10,6 +10,8 @@ It can handle large files by splitting them into chunks and then combining the s
 import os
 import sys
 import math
+import time
+import asyncio
 from typing import List, Tuple, Dict
 
 from ..utils.decorators import timeit
@@ -26,13 +28,13 @@ from dotenv import load_dotenv
 load_dotenv()
 
 from ..huggingface.hf_tokenizer import count_tokens
+from ..utils.health_registry import health_registry
+from .utils.cerebras_helpers import get_async_cerebras_client, record_failure
 from ..prompts.t2s_system import SYSTEM_PROMPT as SYSTEM_PROMPT
 from ..prompts.t2s_user import USER_PROMPT as USER_PROMPT
 from .cerebras_common import (
     models_and_context_wins,
-    select_model,
     digest_input,
-    get_cerebras_client,
     get_max_input_tokens_per_chunk,
     chunkify_text,
     wrap_text_with_indent
@@ -43,12 +45,14 @@ sys.path.append(ROOT)
 INPUT_DIR = os.path.join(ROOT, "output", "text")
 OUTPUT_DIR = os.path.join(ROOT, "output", "summaries")
 
-MODEL_NAME = select_model(models_and_context_wins)
-CONTEXT_WINDOW = models_and_context_wins[MODEL_NAME]
+# Models are picked per call, so chunks must fit the smallest window
+CONTEXT_WINDOW = min(models_and_context_wins.values())
 MAX_CHUNK_INPUT_TOKENS = get_max_input_tokens_per_chunk(CONTEXT_WINDOW)
 
 TARGET_OUTPUT_TOKENS = 500
 STRICT_MAX_OUTPUT_TOKENS = int(1.3 * TARGET_OUTPUT_TOKENS)
+MAX_CONCURRENT_REQUESTS = int(os.getenv("MAX_CONCURRENT_REQUESTS", 8))
+REQUEST_TIMEOUT = 3  # Seconds per call; a timeout is a connection error to the SDK
 
 
 @timeit
@@ -57,33 +61,43 @@ def summarize_chunk(chunk_text: str, client: Cerebras) -> str | None:
     Summarize an individual chunk of text
     by calling Cerebras API with text, system prompt, and user prompt
     """
-    system_prompt = SYSTEM_PROMPT.format(NUM_TOKENS=TARGET_OUTPUT_TOKENS)
+    system_prompt = SYSTEM_PROMPT.format(TARGET_TOKENS=TARGET_OUTPUT_TOKENS)
     user_prompt = USER_PROMPT.format(
         TEXT=chunk_text,
-        NUM_TOKENS=TARGET_OUTPUT_TOKENS,
+        TARGET_TOKENS=TARGET_OUTPUT_TOKENS,
     )
     input_data = [
         {"role": "system", "content": system_prompt},
         {"role": "user", "content": user_prompt},
     ]
+    model_name = health_registry.select_model("cerebras", list(models_and_context_wins))
+    if model_name is None:
+        print("All Cerebras models have open circuits")
+        return '', 0
     response = None
+    start_time = time.time()
     try:
         response = client.chat.completions.create(
-            model=MODEL_NAME,
+            model=model_name,
             messages=input_data,
             max_completion_tokens=STRICT_MAX_OUTPUT_TOKENS, # buffer above target
             stream=False, # default is False
             temperature=0.8,
-            timeout=3,
+            timeout=REQUEST_TIMEOUT,
         )
+        health_registry.record_success("cerebras", model_name, time.time() - start_time)
     except APIConnectionError as e:
         print(f"APIConnectionError: {str(e)}")
+        record_failure(model_name, e)
     except RateLimitError as e:
         print(f"RateLimitError: {str(e)}")
+        record_failure(model_name, e)
     except APIStatusError as e:
         print(f"APIStatusError: {str(e)}")
+        record_failure(model_name, e)
     except Exception as e:
         print(f"Exception: {str(e)}")
+        record_failure(model_name, e)
 
     if response is None:
         print("No response found")
@@ -146,6 +160,152 @@ def summarize_all_chunks(
     return summarize_all_chunks(text=concatted_summaries, client=client, debug=debug)
 
 
+async def summarize_chunk_async(
+    chunk_text: str,
+    client: AsyncCerebras
+) -> Tuple[str, int]:
+    """
+    Async version of summarize_chunk
+    Token count comes from the API's usage data so the summary is never re-encoded
+    Returns ('', 0) if the call fails so the rest of the round can continue
+    """
+    system_prompt = SYSTEM_PROMPT.format(TARGET_TOKENS=TARGET_OUTPUT_TOKENS)
+    user_prompt = USER_PROMPT.format(
+        TEXT=chunk_text,
+        TARGET_TOKENS=TARGET_OUTPUT_TOKENS,
+    )
+    input_data = [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_prompt},
+    ]
+    model_name = health_registry.select_model("cerebras", list(models_and_context_wins))
+    if model_name is None:
+        print("All Cerebras models have open circuits")
+        return '', 0
+    start_time = time.time()
+    try:
+        response = await client.chat.completions.create(
+            model=model_name,
+            messages=input_data,
+            max_completion_tokens=STRICT_MAX_OUTPUT_TOKENS, # buffer above target
+            stream=False,
+            temperature=0.8,
+            timeout=REQUEST_TIMEOUT,
+        )
+        chunk_summary = response.choices[0].message.content if response.choices else None
+    except APIConnectionError as e:
+        print(f"APIConnectionError: {str(e)}")
+        record_failure(model_name, e)
+        return '', 0
+    except RateLimitError as e:
+        print(f"RateLimitError: {str(e)}")
+        record_failure(model_name, e)
+        return '', 0
+    except APIStatusError as e:
+        print(f"APIStatusError: {str(e)}")
+        record_failure(model_name, e)
+        return '', 0
+    except Exception as e:
+        # e.g. an unexpected response shape; one chunk must not sink the whole round
+        print(f"Exception: {str(e)}")
+        record_failure(model_name, e)
+        return '', 0
+    health_registry.record_success("cerebras", model_name, time.time() - start_time)
+
+    if not chunk_summary:
+        print("No output text generated")
+        return '', 0
+
+    usage = getattr(response, 'usage', None)
+    tokens_out = getattr(usage, 'completion_tokens', None) or count_tokens(chunk_summary)
+    return chunk_summary, tokens_out
+
+
+def pack_summaries(
+    summaries: List[Tuple[int, str]],
+    max_chunk_input_tokens: int
+) -> List[Tuple[int, str]]:
+    """
+    Pack consecutive (tokens, summary) pairs into the next round's chunks
+    using the counts carried over from the previous round
+    """
+    chunks = []
+    batch = []
+    batch_tokens = 0
+    for summary_tokens, summary_text in summaries:
+        if batch and batch_tokens + summary_tokens > max_chunk_input_tokens:
+            chunks.append(concat_summaries(batch))
+            batch = []
+            batch_tokens = 0
+        batch.append((summary_tokens, summary_text))
+        batch_tokens += summary_tokens
+    if batch:
+        chunks.append(concat_summaries(batch))
+    return chunks
+
+
+@timeit
+async def summarize_all_chunks_async(
+    text: str,
+    client: AsyncCerebras,
+    max_concurrency: int = MAX_CONCURRENT_REQUESTS,
+    debug: bool = False
+) -> Tuple[str, List[Dict]]:
+    """
+    Summarize all chunks round by round, running each round's API calls concurrently
+
+    The text is tokenized once. Later rounds are packed from the summaries'
+    token counts, so no round re-encodes its input.
+
+    Returns:
+        (final summary, per-round stats with calls, tokens and seconds)
+    """
+    chunks = chunkify_text(text, MAX_CHUNK_INPUT_TOKENS)
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+    round_stats = []
+
+    async def bounded_summary(chunk_text: str) -> Tuple[str, int]:
+        async with semaphore:
+            return await summarize_chunk_async(chunk_text, client)
+
+    round_num = 0
+    while chunks:
+        start_time = time.perf_counter()
+        results = await asyncio.gather(
+            *[bounded_summary(chunk_text) for _, chunk_text in chunks]
+        )
+        summaries = [
+            (summary_tokens, summary_txt)
+            for summary_txt, summary_tokens in results
+            if summary_txt
+        ]
+
+        stats = {
+            "round": round_num,
+            "calls": len(chunks),
+            "failed": len(chunks) - len(summaries),
+            "input_tokens": sum(chunk_tokens for chunk_tokens, _ in chunks),
+            "output_tokens": sum(summary_tokens for summary_tokens, _ in summaries),
+            "seconds": time.perf_counter() - start_time,
+        }
+        round_stats.append(stats)
+        if debug:
+            print(f'round #{round_num}: {stats["calls"]} calls, '
+                  f'{stats["input_tokens"]:,} -> {stats["output_tokens"]:,} tokens '
+                  f'in {stats["seconds"]:.2f}s')
+
+        if not summaries:
+            raise RuntimeError(f"No summaries generated in round {round_num}")
+        if len(chunks) == 1:
+            return summaries[0][1], round_stats
+
+        # funnel down: next round's input is this round's summaries
+        chunks = pack_summaries(summaries, MAX_CHUNK_INPUT_TOKENS)
+        round_num += 1
+
+    return '', round_stats
+
+
 def num_chunks_reqd(num_tokens: int) -> int:
     """ ceiling division for chunks necessary given context window """
 
@@ -158,7 +318,7 @@ def target_tokens_per_chunk(total_tokens: int, num_chunks: int) -> int:
     return math.ceil(total_tokens / num_chunks)
 
 
-def concat_summaries(summaries: List[int, str]) -> Tuple[int, str]:
+def concat_summaries(summaries: List[Tuple[int, str]]) -> Tuple[int, str]:
     """ output text combining each of the summaries and the token length """
     n = len(summaries)
     concatted = '\n'.join([summaries[x][1] for x in range(n)])
@@ -243,14 +403,14 @@ if __name__ == "__main__":
         ROOT, 'examples_io', 'output', 'text', 'situational_awareness.txt')
 
     text_to_summarize = digest_input(text_to_summ_fullpath)
-    cerebras_client = get_cerebras_client()
+    cerebras_client = get_async_cerebras_client()
 
-    # TODO: add final summary of summaries
-    summary = summarize_all_chunks(
+    summary, round_stats = asyncio.run(summarize_all_chunks_async(
         text=text_to_summarize,
         client=cerebras_client,
-        debug=True # prints chunks and full summary
-    )
+        debug=True # prints per-round timing
+    ))
+    print(wrap_text_with_indent(summary))
 
 
 
@@ -307,4 +467,5 @@ done
 """
 if API lets us do parallel calls, then each round can be parallelized
 but sequential wait necessary for concat between rounds
+-> summarize_all_chunks_async: 15 -> 2 -> 1 calls in ~3 round-trip latencies
 """
@@ -1,18 +1,44 @@
-from cerebras.cloud.sdk import Cerebras
+from cerebras.cloud.sdk import AsyncCerebras, Cerebras, APIStatusError
+from functools import lru_cache
 from typing import Dict, Any, Optional
 import os
 import json
+import time
 import logging
 
+from backend.utils.health_registry import health_registry
+
 logger = logging.getLogger(__name__)
 
-def get_cerebras_client():
+def _get_api_key() -> str:
     api_key = os.getenv('CEREBRAS_API_KEY')
     if not api_key:
         raise ValueError("CEREBRAS_API_KEY not found in environment variables")
-    return Cerebras(api_key=api_key)
+    return api_key
+
+@lru_cache(maxsize=1)
+def get_cerebras_client() -> Cerebras:
+    """Process-wide client; its connection pool is reused across calls."""
+    return Cerebras(api_key=_get_api_key())
+
+@lru_cache(maxsize=1)
+def get_async_cerebras_client() -> AsyncCerebras:
+    """Process-wide async client; its connection pool is reused across calls."""
+    return AsyncCerebras(api_key=_get_api_key())
+
+def record_failure(model: str, error: Exception) -> None:
+    """Feed a failed Cerebras call to the model's circuit breaker."""
+    status_code = None
+    retry_after = None
+    if isinstance(error, APIStatusError):
+        status_code = error.status_code
+        try:
+            retry_after = float(error.response.headers.get("retry-after"))
+        except (TypeError, ValueError):
+            pass
+    health_registry.record_failure("cerebras", model, str(error) or type(error).__name__, status_code, retry_after)
 
-def make_api_call(
+async def make_api_call(
     messages: list,
     model: str = "llama-3.1-8b-instant",
     temperature: float = 0.7,
@@ -21,10 +47,17 @@ def make_api_call(
 ) -> Optional[str]:
     """
     Make an API call to Cerebras, following the same pattern as Groq.
+
+    Streamed responses are read here and their fragments joined once at the end.
+    Returns None without calling Cerebras while the model's circuit is open.
     """
+    if not health_registry.allow("cerebras", model):
+        logger.warning(f"Circuit open for cerebras/{model}; skipping call")
+        return None
+    start_time = time.time()
     try:
-        client = get_cerebras_client()
-        response = client.chat.completions.create(
+        client = get_async_cerebras_client()
+        response = await client.chat.completions.create(
             messages=messages,
             model=model,
             temperature=temperature,
@@ -33,9 +66,17 @@ def make_api_call(
         )
         
         if stream:
-            return response
-        return response.choices[0].message.content
-        
+            parts = []
+            async for chunk in response:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    parts.append(chunk.choices[0].delta.content)
+            content = "".join(parts)
+        else:
+            content = response.choices[0].message.content
+        health_registry.record_success("cerebras", model, time.time() - start_time)
+        return content
+
     except Exception as e:
         logger.error(f"Cerebras API error: {str(e)}")
-        return None
\ No newline at end of file
+        record_failure(model, e)
+        return None
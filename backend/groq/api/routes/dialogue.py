@@ -27,7 +27,7 @@ async def generate_dialogue_endpoint(
                 f.write(summary)
             
             # Generate dialogue using the imported generate_dialogue function
-            dialogue_result = generate_dialogue(
+            dialogue_result = await generate_dialogue(
                 summary=summary,
                 language="English",
                 num_guests=5,
@@ -61,7 +61,7 @@ async def process_pdf_endpoint(
             
             # Generate dialogue from summary
             dialogue_path = Path(temp_dir) / "dialogue.txt"
-            dialogue_result = generate_dialogue(
+            dialogue_result = await generate_dialogue(
                 summary=summary_text,  # Pass the text directly
                 language="English",
                 num_guests=5,
@@ -1,4 +1,4 @@
-from fastapi import FastAPI, HTTPException, APIRouter, UploadFile, Form, File
+from fastapi import FastAPI, HTTPException, APIRouter, UploadFile, Form, File, Request
 from pydantic import BaseModel
 from typing import List, Dict, Any
 import logging
@@ -22,8 +22,11 @@ sys.path.append(ROOT)
 
 from backend.groq.api.pdf_to_text import process_pdf
 from backend.groq.api.text_to_summary import process_text_document, ProcessingStatus, ProcessingProgress
+from backend.utils.job_registry import job_registry
+from backend.utils.disconnect import cancel_on_disconnect
 from backend.utils.decorators import timeit
 from backend.groq.api.summary_to_dialogue import generate_dialogue
+from backend.utils.model_cascade import current_stage_report
 
 app = FastAPI()
 logging.basicConfig(level=logging.INFO)
@@ -51,23 +54,18 @@ async def run_pdf_processing(pdf_path: str, text_path: str) -> None:
     """Run PDF processing asynchronously."""
     await process_pdf(pdf_path, text_path)
 
-@router.post("/process-pdf")
-@timeit
-async def process_pdf_endpoint(
-    file: UploadFile = File(...),
-    sourceId: str = Form(...),
-    notebookId: str = Form(...),
-    userId: str = Form(...)
+async def run_pdf_pipeline(
+    content: bytes,
+    filename: str,
+    sourceId: str,
+    progress: ProcessingProgress
 ) -> Dict[str, Any]:
-    """Process uploaded PDF file through the conversion pipeline."""
+    """Run PDF -> text -> summary -> dialogue for one uploaded file."""
     try:
-        logger.info(f"Processing PDF for source {sourceId}")
-        
         # Create temp directory for processing
         with tempfile.TemporaryDirectory() as temp_dir:
             # Save uploaded file
             pdf_path = Path(temp_dir) / "input.pdf"
-            content = await file.read()
             with open(pdf_path, "wb") as f:
                 f.write(content)
             
@@ -81,23 +79,26 @@ async def process_pdf_endpoint(
             
             # Start text processing
             summary_path = Path(temp_dir) / "summary.txt"
-            result = await process_text_document(extracted_text, str(summary_path))
+            result = await process_text_document(extracted_text, str(summary_path), progress=progress)
             
             if result["status"] == ProcessingStatus.ERROR:
                 return {
                     "status": "error",
                     "message": result["error"],
                     "sourceId": sourceId,
-                    "fileName": file.filename
+                    "fileName": filename
                 }
             
             # Read final summary
             with open(summary_path, "r") as f:
                 summary_text = f.read()
+
+            # Summary is done but the job isn't - keep pollers waiting for the dialogue
+            progress.status = ProcessingStatus.PROCESSING
+            await job_registry.save(progress)
             
-            # Generate dialogue from summary
-            dialogue_path = Path(temp_dir) / "dialogue.txt"
-            dialogue_result = generate_dialogue(
+            # Awaited on the async client, so a disconnect cancels the provider request too
+            dialogue_result = await generate_dialogue(
                 summary=summary_text,  # Pass the text directly
                 language="English",
                 num_guests=5,
@@ -109,32 +110,87 @@ async def process_pdf_endpoint(
             else:
                 dialogue_text = ""
 
-            return {
+            # Started by process_text_document; now also holds the dialogue call
+            stage_report = current_stage_report()
+            result = {
                 "status": "success",
                 "message": "PDF processed successfully",
                 "sourceId": sourceId,
-                "fileName": file.filename,
+                "fileName": filename,
                 "extractedText": extracted_text,
                 "summary": summary_text,
                 "dialogue": dialogue_text,
                 "contentLength": len(summary_text),
-                "progress": 100
+                "progress": 100,
+                "stages": stage_report.to_dict() if stage_report else {}
             }
+            # Store the full pipeline output as the job result
+            progress.complete(result)
+            await job_registry.save(progress)
+            return result
+
+    except asyncio.CancelledError:
+        logger.info(f"Processing of source {sourceId} cancelled")
+        progress.cancel()
+        await job_registry.save(progress)
+        raise
             
     except Exception as e:
         logger.error(f"Error processing file: {str(e)}")
+        progress.set_error(str(e))
+        await job_registry.save(progress)
         return {
             "status": "error",
             "message": str(e),
             "sourceId": sourceId,
-            "fileName": file.filename,
-            "progress": 0  # Fixed progress reference
+            "fileName": filename,
+            "progress": progress.progress
         }
 
+@router.post("/process-pdf")
+@timeit
+async def process_pdf_endpoint(
+    request: Request,
+    file: UploadFile = File(...),
+    sourceId: str = Form(...),
+    notebookId: str = Form(...),
+    userId: str = Form(...),
+    background: bool = Form(False)
+) -> Dict[str, Any]:
+    """Process uploaded PDF file through the conversion pipeline.
+
+    Progress is tracked per source and can be polled at /status/{sourceId}.
+    With background=true the pipeline runs detached and 202 is returned at once.
+    Otherwise the pipeline is cancelled if the client disconnects before it ends.
+    """
+    logger.info(f"Processing PDF for source {sourceId}")
+    progress = job_registry.create(job_id=sourceId)
+    content = await file.read()
+    pipeline = run_pdf_pipeline(content, file.filename, sourceId, progress)
+
+    if background:
+        job_registry.run_in_background(progress, pipeline)
+        return JSONResponse(
+            status_code=202,
+            content={
+                "status": progress.status,
+                "sourceId": sourceId,
+                "fileName": file.filename,
+                "statusUrl": f"status/{sourceId}"
+            }
+        )
+
+    return await cancel_on_disconnect(request, pipeline)
+
 @router.get("/status/{sourceId}")
 async def get_processing_status_endpoint(sourceId: str) -> Dict[str, Any]:
     """Get current processing status for a source."""
-    status = await get_processing_status()
+    status = await job_registry.get(sourceId)
+    if status is None:
+        raise HTTPException(
+            status_code=404,
+            detail=f"No processing job for source {sourceId}"
+        )
     return {
         "sourceId": sourceId,
         **status
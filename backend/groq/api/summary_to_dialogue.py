@@ -11,15 +11,17 @@ output: ./output/dialogue/*.txt
 import os
 import sys
 import argparse
+import asyncio
 import time
 from dotenv import load_dotenv
-from groq import Groq
+from groq import AsyncGroq
 import glob
 
 ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
 sys.path.append(ROOT)
 
-from .utils.llama_api_helpers import make_api_call
+from .utils.llama_api_helpers import make_api_call, estimate_token_cost_per_model
+from backend.utils.model_cascade import record_stage_call, stage_model
 
 from .utils.decorators import timeit
 
@@ -32,7 +34,7 @@ load_dotenv()
 GROQ_API_KEY = os.getenv('GROQ_API_KEY')
 if not GROQ_API_KEY:
     raise ValueError("GROQ_API_KEY environment variable not set")
-groq_client = Groq(api_key=GROQ_API_KEY)
+groq_client = AsyncGroq(api_key=GROQ_API_KEY)
 
 # To this:
 DIALOGUE_PROMPT_PATH = os.path.join(ROOT, "prompts", "multi_lang_guests.txt")
@@ -93,14 +95,20 @@ def validate_args(args: argparse.Namespace) -> None:
 
 
 @timeit
-def generate_dialogue(
+async def generate_dialogue(
     summary: str,
     language: str = "English",
     num_guests: int = 1,
     num_tokens: int = 1000,
     debug: bool = False
 ) -> str:
-    """Generate natural dialogue using Groq model."""
+    """Generate natural dialogue using Groq model.
+
+    Runs on DIALOGUE_MODEL (backend.utils.model_cascade) and is recorded as
+    the dialogue stage of the current job. The request is awaited on the
+    async client, so cancelling the awaiting task (e.g. a client disconnect)
+    closes the HTTP request instead of letting the completion run on.
+    """
     
     # Replace template variables in base prompt
     system_prompt = (DIALOGUE_PROMPT
@@ -112,14 +120,16 @@ def generate_dialogue(
 
     try:
         print("Starting Groq API request")
-        completion = groq_client.chat.completions.create(
+        model = stage_model("dialogue")
+        started_at = time.monotonic()
+        completion = await groq_client.chat.completions.create(
             messages=[
                 {
                     "role": "system",
                     "content": system_prompt
                 }
             ],
-            model="mixtral-8x7b-32768",
+            model=model,
             temperature=0.7,
             max_tokens=num_tokens,
             top_p=1,
@@ -131,6 +141,13 @@ def generate_dialogue(
             return ""
 
         dialogue = completion.choices[0].message.content
+        usage = completion.usage
+        prompt_tokens = usage.prompt_tokens if usage else 0
+        completion_tokens = usage.completion_tokens if usage else 0
+        record_stage_call(
+            "dialogue", model, prompt_tokens, completion_tokens, started_at,
+            estimate_token_cost_per_model(model, prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+        )
 
         if debug:
             print("\nRaw API Response:")
@@ -153,7 +170,11 @@ def generate_dialogues_from_summaries(
     """
     Read in all files in summaries folder and generate dialogue for each one.
     """
+    # One event loop for every file: the shared AsyncGroq client's
+    # connections belong to the loop they were opened on
+    asyncio.run(_generate_dialogues(num_guests, language, num_tokens, debug))
 
+async def _generate_dialogues(num_guests: int, language: str, num_tokens: int, debug: bool) -> None:
     # Process each summary file
     for summary_file in glob.glob(os.path.join(INPUT_DIR, "*.txt")):
         try:
@@ -164,7 +185,7 @@ def generate_dialogues_from_summaries(
                 summary = f.read().strip()
 
             # Generate dialogue
-            dialogue = generate_dialogue(
+            dialogue = await generate_dialogue(
                 summary=summary,
                 language=language,
                 num_guests=num_guests,
@@ -187,7 +208,7 @@ def generate_dialogues_from_summaries(
             print(f"Error processing {summary_file}: {str(e)}")
             continue
 
-        time.sleep(0.1)
+        await asyncio.sleep(0.1)
 
 if __name__ == "__main__":
     args = parse_args()
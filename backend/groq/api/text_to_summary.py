@@ -10,7 +10,7 @@ Requirements:
     - backoff
     - tiktoken
     - python-dotenv
-    - requests
+    - httpx
 """
 
 # Standard library imports
@@ -23,39 +23,52 @@ from typing import List, Dict, Any
 import textwrap
 import asyncio
 import aiofiles
+import uuid
 import logging
-import functools
 
 # Third-party imports
 from dotenv import load_dotenv
 from llamaapi import LlamaAPI
 
 # Local imports
+from backend.utils.job_registry import ProcessingStatus, ProcessingProgress, job_registry
+from backend.utils.metrics import metrics
+from backend.utils.health_registry import health_registry
+from backend.utils.retry_budget import MAX_ATTEMPTS_PER_CALL, record_job_retries, start_retry_budget, take_retry
+from backend.utils.latency_tracker import latency_tracker
+from backend.utils.model_cascade import record_stage_call, stage_model, start_stage_report
 from .utils.decorators import timeit
 from .utils.token_counter import count_tokens
 from .utils.llama_api_token_limits import get_llama_total_token_limit
 from .utils.llama_api_helpers import (
     estimate_token_cost_per_model,
     APIError,
+    StreamStats,
     make_api_call,
     calculate_timeout
 )
+from .utils.credential_pool import CredentialPool, AUTH_FAILURE_STATUS_CODES
 
 # Constants for API request timeout
 BASE_TIMEOUT = 30
 CONNECT_TIMEOUT = 10  # Time to establish connection
 BASE_READ_TIMEOUT = 30  # Base time to wait for response
 TIMEOUT_PER_1K_TOKENS = 3  # Additional seconds per 1K tokens
-SLEEP_BETWEEN_REQUESTS = 0.2  # Seconds to sleep between API requests
-MAX_RETRIES = 3  # Reduced from 5 since we're using smaller chunks
+CONCURRENT_REQUESTS_PER_KEY = int(os.getenv("CONCURRENT_REQUESTS_PER_KEY", 3))  # Chunk calls in flight per Groq key
+# Errors worth another attempt. 401/403 quarantine the key and retry only while another key is
+# usable (call_llama); 422 is a bad request or an empty answer and would fail the same way again
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504, 520, 524}
+TIMEOUT_RETRY_GROWTH = 1.5  # Read timeout multiplier for the retry of a timed-out call
 
 # Token limits
-TOTAL_TOKEN_LIMIT = 6000  # Groq's rate limit per minute
+TOTAL_TOKEN_LIMIT = int(os.getenv("GROQ_TOKENS_PER_MINUTE", 6000))  # Groq's rate limit per minute
+REQUESTS_PER_MINUTE = int(os.getenv("GROQ_REQUESTS_PER_MINUTE", 30))  # Groq's request limit per minute
 DESIRED_OUTPUT_TOKENS = 1000  # Reduced target length
 OVERHEAD_TOKENS = 100  # System prompt, formatting, etc
 CHUNK_OVERLAP = 100  # Reduced overlap between chunks
 MAX_INPUT_TOKENS = TOTAL_TOKEN_LIMIT - DESIRED_OUTPUT_TOKENS - OVERHEAD_TOKENS
 TARGET_SUMMARY_TOKENS = 800  # Reduced target summary length
+MAX_SUMMARY_TOKENS = int(1.3 * TARGET_SUMMARY_TOKENS)  # Hard stop for streamed summaries
 
 # Constants for token management
 MAX_TOKENS_PER_CHUNK = 3000  # Groq's recommended max per request
@@ -74,12 +87,19 @@ LLAMA_API_KEY = os.getenv('LLAMA_API_KEY')
 if not LLAMA_API_KEY:
     raise ValueError("LLAMA_API_KEY not found in environment variables")
 
-# Constants for API configuration
-GROQ_MODEL = os.getenv("GROQ_MODEL", "llama-3.1-8b-instant")  # Groq model
-GROQ_API_KEY = "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"
+# Groq models per stage (MAP_MODEL, REDUCE_MODEL, FINAL_MODEL, default GROQ_MODEL) come from backend.utils.model_cascade
 
-# Initialize API client
-llama = LlamaAPI(GROQ_API_KEY)  # We'll override the endpoint in make_api_call
+# Groq keys from GROQ_API_KEYS/GROQ_API_KEY; each gets its own client and its own RPM/TPM buckets per model.
+# Every call reserves a request and prompt + max_tokens on a key with room, so concurrent chunks stay under the limits
+groq_keys = CredentialPool(
+    "groq", "GROQ_API_KEY", requests_per_minute=REQUESTS_PER_MINUTE, tokens_per_minute=TOTAL_TOKEN_LIMIT
+)
+# More keys, more calls in flight
+MAX_CONCURRENT_REQUESTS = int(os.getenv("MAX_CONCURRENT_REQUESTS", CONCURRENT_REQUESTS_PER_KEY * len(groq_keys)))
+llama_clients = {
+    credential.key_id: LlamaAPI(credential.api_key)  # We'll override the endpoint in make_api_call
+    for credential in groq_keys.credentials
+}
 
 # Prompt to summarize input text
 prompt_summary = """You are a precise summarization assistant. Your task is to create a DETAILED summary of TARGET_TOKENS tokens. \
@@ -101,65 +121,122 @@ Text to summarize:
 # Add a logger
 logger = logging.getLogger(__name__)
 
-# Add status tracking constants
-class ProcessingStatus:
-    PENDING = "pending"
-    PROCESSING = "processing"
-    COMPLETED = "completed"
-    ERROR = "error"
-
-class ProcessingProgress:
-    def __init__(self):
-        self.status = ProcessingStatus.PENDING
-        self.progress = 0
-        self.total_chunks = 0
-        self.processed_chunks = 0
-        self.current_chunk = 0
-        self.error = None
-
-    def update(self, chunk_num: int, total_chunks: int):
-        self.current_chunk = chunk_num
-        self.total_chunks = total_chunks
-        self.processed_chunks = chunk_num
-        self.progress = int((chunk_num / total_chunks) * 100)
-        self.status = ProcessingStatus.PROCESSING
-
-    def complete(self):
-        self.status = ProcessingStatus.COMPLETED
-        self.progress = 100
-
-    def set_error(self, error: str):
-        self.status = ProcessingStatus.ERROR
-        self.error = error
-
-# Global progress tracker
-processing_progress = ProcessingProgress()
-
-def retry_with_backoff(func):
-    """Decorator to retry async functions with exponential backoff."""
-    @functools.wraps(func)
-    async def wrapper(*args, **kwargs):
-        for attempt in range(MAX_RETRIES):
-            try:
-                return await func(*args, **kwargs)
-            except APIError as e:
-                await e.handle(attempt, MAX_RETRIES)
-                if attempt == MAX_RETRIES - 1:
-                    raise
-            except (TimeoutError, ConnectionError) as e:
-                wait_time = 2 * (2 ** attempt)
-                if attempt < MAX_RETRIES - 1:
-                    logger.warning(f"Connection error on attempt {attempt + 1}: {str(e)}")
-                    logger.info(f"Waiting {wait_time} seconds before retry...")
-                    await asyncio.sleep(wait_time)
-                else:
-                    logger.error(f"All {MAX_RETRIES} attempts failed")
+def request_timeout(model: str, input_tokens: int) -> tuple[int, float]:
+    """(connect, read) timeouts from Groq's observed time to first token for calls of this size.
+
+    Falls back to the linear calculate_timeout estimate until enough calls
+    have been measured.
+    """
+    read_timeout = latency_tracker.read_timeout("groq", model, input_tokens)
+    if read_timeout is None:
+        return calculate_timeout(input_tokens)
+    return (CONNECT_TIMEOUT, read_timeout)
+
+async def call_llama_once(
+    messages: List[Dict[str, str]],
+    model: str,
+    timeout,
+    idempotency_key: str = None
+) -> str:
+    """Make one streamed API call on the pooled client.
+
+    The call uses the Groq key with the most tokens left; a key Groq rejects
+    as unauthorized is quarantined so retries move to another one.
+    Outcomes feed the model's circuit breaker; while it is open calls fail
+    fast with a 503 instead of reaching Groq. Each attempt first waits for
+    a key whose requests- and tokens-per-minute buckets for the model can
+    take one request and its prompt plus max_tokens (backend.utils.rate_limiter,
+    shared with the other workers through Redis). The tokens Groq reports
+    left are fed back into the buckets, and a 429 holds the key for as long
+    as Groq asks.
+    If the awaiting task is cancelled (client disconnect, failed sibling
+    chunk), the stream is closed right away instead of running to completion.
+    """
+    if not health_registry.allow("groq", model):
+        raise APIError(503, f"Circuit open for groq/{model}")
+    input_tokens = sum(count_tokens(message["content"]) for message in messages)
+    reserved_tokens = input_tokens + MAX_SUMMARY_TOKENS
+    credential = await groq_keys.acquire(model, reserved_tokens)
+    stats = StreamStats()
+    try:
+        content = await make_api_call(
+            llama_client=llama_clients[credential.key_id],
+            messages=messages,
+            model=model,
+            timeout=timeout,
+            max_output_tokens=MAX_SUMMARY_TOKENS,
+            stats=stats,
+            idempotency_key=idempotency_key
+        )
+        health_registry.record_success("groq", model, time.time() - stats.start_time)
+        await groq_keys.observe(credential, model, remaining_tokens=stats.remaining_tokens)
+        if stats.time_to_first_token is not None:
+            latency_tracker.record("groq", model, input_tokens, stats.time_to_first_token)
+        return content
+    except APIError as e:
+        if e.status_code in AUTH_FAILURE_STATUS_CODES:
+            groq_keys.quarantine(credential, e.message)
+        if e.status_code == 429:
+            await groq_keys.observe(credential, model, hold=e.extract_wait_time())
+        if e.status_code == 524:
+            # The wait lasted at least this long; keep the timeout from ratcheting down
+            latency_tracker.record("groq", model, input_tokens, timeout[1])
+        health_registry.record_failure("groq", model, e.message, e.status_code, e.extract_wait_time())
+        raise
+    except asyncio.CancelledError:
+        metrics.increment("llm_calls_cancelled", provider="groq", model=model)
+        health_registry.abandon("groq", model)
+        raise
+    finally:
+        groq_keys.release(credential, stats.remaining_tokens, reserved_tokens)
+
+async def call_llama(messages: List[Dict[str, str]], model: str, timeout) -> str:
+    """Make an API call, retrying retryable errors.
+
+    This is the only layer that retries. Each retry draws on the job's retry
+    budget (backend.utils.retry_budget), so once it is spent the error is
+    raised at once. All attempts carry the same Idempotency-Key header, and
+    the retry of a timed-out call gets a longer read timeout. An unauthorized
+    key is retried at once on another key, and fails fast once no key is
+    left outside quarantine.
+    """
+    idempotency_key = uuid.uuid4().hex
+    attempt = 0
+    while True:
+        attempt += 1
+        try:
+            return await call_llama_once(messages, model, timeout, idempotency_key)
+        except APIError as e:
+            if e.status_code in AUTH_FAILURE_STATUS_CODES:
+                if not groq_keys.usable() or not take_retry(attempt, model):
                     raise
-        return None
-    return wrapper
+                continue
+            if e.status_code not in RETRYABLE_STATUS_CODES or not take_retry(attempt, model):
+                raise
+            if e.status_code == 524:
+                timeout = (timeout[0], timeout[1] * TIMEOUT_RETRY_GROWTH)
+            await e.handle(attempt - 1, MAX_ATTEMPTS_PER_CALL)
+
+async def call_stage(messages: List[Dict[str, str]], stage: str) -> str:
+    """Make a call on the model configured for a pipeline stage (map, reduce or final).
+
+    The call, retries included, is recorded under the stage with its tokens,
+    time and estimated cost (backend.utils.model_cascade).
+    """
+    model = stage_model(stage)
+    input_tokens = sum(count_tokens(message["content"]) for message in messages)
+    # Timeout from the observed latency of calls this size
+    timeout = request_timeout(model, input_tokens)
+    started_at = time.monotonic()
+    content = await call_llama(messages, model, timeout)
+    output_tokens = count_tokens(content)
+    record_stage_call(
+        stage, model, input_tokens, output_tokens, started_at,
+        estimate_token_cost_per_model(model, prompt_tokens=input_tokens, completion_tokens=output_tokens)
+    )
+    return content
 
 
-@retry_with_backoff
 async def process_chunk(chunk: str) -> str:
     """Process a single chunk."""
     chunk_tokens = count_tokens(chunk)
@@ -175,24 +252,15 @@ async def process_chunk(chunk: str) -> str:
         "content": prompt
     }]
 
-    # Calculate appropriate timeout based on chunk size
-    timeout = calculate_timeout(chunk_tokens)
+    return await call_stage(messages, "map")
 
-    loop = asyncio.get_running_loop()
-    return await loop.run_in_executor(
-        None,
-        lambda: make_api_call(
-            llama_client=llama,
-            messages=messages,
-            model=GROQ_MODEL,
-            timeout=timeout
-        )
-    )
 
+async def combine_summaries(summaries: List[str], stage: str = "final") -> str:
+    """Combine multiple summaries into one.
 
-@retry_with_backoff
-async def combine_summaries(summaries: List[str]) -> str:
-    """Combine multiple summaries into one."""
+    The top-level combine is the final stage; the combines of halves that
+    are too large to merge at once are reduce stages.
+    """
     if not summaries:
         return ""
     if len(summaries) == 1:
@@ -203,8 +271,10 @@ async def combine_summaries(summaries: List[str]) -> str:
     if total_tokens > MAX_TOKENS_PER_CHUNK * 2:
         # If too large, recursively combine smaller groups
         mid = len(summaries) // 2
-        first_half = await combine_summaries(summaries[:mid])
-        second_half = await combine_summaries(summaries[mid:])
+        first_half, second_half = await asyncio.gather(
+            combine_summaries(summaries[:mid], stage="reduce"),
+            combine_summaries(summaries[mid:], stage="reduce")
+        )
         combined = [first_half, second_half]
     else:
         combined = summaries
@@ -242,19 +312,7 @@ async def combine_summaries(summaries: List[str]) -> str:
         "content": prompt
     }]
 
-    # Calculate appropriate timeout based on prompt size
-    timeout = calculate_timeout(count_tokens(prompt))
-
-    loop = asyncio.get_running_loop()
-    return await loop.run_in_executor(
-        None,
-        lambda: make_api_call(
-            llama_client=llama,
-            messages=messages,
-            model=GROQ_MODEL,  # Use GROQ_MODEL instead of LLAMA_MODEL
-            timeout=timeout
-        )
-    )
+    return await call_stage(messages, stage)
 
 def truncate_text_to_tokens(text: str, max_tokens: int) -> str:
     """Truncate text to fit within token limit."""
@@ -278,7 +336,7 @@ def truncate_text_to_tokens(text: str, max_tokens: int) -> str:
 
 @timeit
 async def process_chunks_sequential(chunks: List[str]) -> List[str]:
-    """Process chunks sequentially with waits between."""
+    """Process chunks one at a time; call_llama_once paces them against the rate limits."""
     summaries = []
     for i, chunk in enumerate(chunks, 1):
         print(f"\nProcessing chunk {i}/{len(chunks)}...")
@@ -287,13 +345,43 @@ async def process_chunks_sequential(chunks: List[str]) -> List[str]:
         if not summary:
             return None
         summaries.append(summary)
-        if i < len(chunks):
-            print(f"Waiting {SLEEP_BETWEEN_REQUESTS}s before next chunk...")
-            await asyncio.sleep(SLEEP_BETWEEN_REQUESTS)
     return summaries
 
 
-@retry_with_backoff
+@timeit
+async def process_chunks_concurrent(
+    chunks: List[str],
+    max_concurrency: int = MAX_CONCURRENT_REQUESTS,
+    progress: ProcessingProgress = None
+) -> List[str]:
+    """Process chunks with bounded concurrency, keeping summaries in chunk order.
+
+    Every call waits for a key with room in its requests- and
+    tokens-per-minute buckets (call_llama_once), so concurrent chunks queue
+    instead of running into 429s.
+    """
+    if progress is None:
+        progress = ProcessingProgress()
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+    total_chunks = len(chunks)
+
+    async def summarize(chunk: str) -> str:
+        async with semaphore:
+            summary = await process_chunk(chunk)
+        progress.advance(total_chunks)
+        await job_registry.save(progress)
+        return summary
+
+    tasks = [asyncio.create_task(summarize(chunk)) for chunk in chunks]
+    try:
+        return await asyncio.gather(*tasks)
+    except BaseException:
+        # A failed chunk or a cancelled job - stop the other chunk calls too
+        for task in tasks:
+            task.cancel()
+        raise
+
+
 async def get_summary(text: str) -> str:
     """Get summary from LlamaAPI."""
     default_prompt = prompt_summary.split('. ')
@@ -305,41 +393,46 @@ async def get_summary(text: str) -> str:
         "content": default_prompt.strip()
     }]
 
-    # Calculate appropriate timeout based on text size
-    total_tokens = count_tokens(text)
-    timeout = calculate_timeout(total_tokens)
+    # Timeout from the observed latency of calls this size
+    timeout = request_timeout(LLAMA_MODEL, count_tokens(text))
 
-    loop = asyncio.get_running_loop()
-    result = await loop.run_in_executor(
-        None,
-        lambda: make_api_call(
-            llama_client=llama,
-            messages=messages,
-            model=LLAMA_MODEL,
-            timeout=timeout
-        )
-    )
-    return result
+    return await call_llama(messages, LLAMA_MODEL, timeout)
 
 
 @timeit
-async def process_text_document(text: str, output_path: str = None) -> Dict[str, Any]:
-    """Process a text document and return status updates."""
+async def process_text_document(
+    text: str,
+    output_path: str = None,
+    progress: ProcessingProgress = None
+) -> Dict[str, Any]:
+    """Process a text document and return status updates.
+
+    Pass a ProcessingProgress from the job registry to make progress pollable.
+    Failed calls are retried within a budget shared by the whole job; the
+    result reports the retries used. Each stage runs on its own model (see
+    backend.utils.model_cascade) and the result reports per-stage calls,
+    tokens, time and cost under stages.
+    """
+    if progress is None:
+        progress = ProcessingProgress()
+    retry_budget = None
     try:
-        processing_progress.status = ProcessingStatus.PROCESSING
+        progress.status = ProcessingStatus.PROCESSING
         chunks = split_text_into_chunks(text)
-        processing_progress.total_chunks = len(chunks)
+        progress.total_chunks = len(chunks)
+        progress.processed_chunks = 0
+        await job_registry.save(progress)
+        # Chunk and combine tasks created below inherit this job's retry budget
+        retry_budget = start_retry_budget(len(chunks) + 1)
+        stage_report = start_stage_report()
         
-        summaries = []
-        for i, chunk in enumerate(chunks, 1):
-            processing_progress.update(i, len(chunks))
-            summary = await process_chunk(chunk)
-            if summary:
-                summaries.append(summary)
+        chunk_summaries = await process_chunks_concurrent(chunks, progress=progress)
+        summaries = [summary for summary in chunk_summaries if summary]
                 
         if not summaries:
             error = "No valid summaries generated"
-            processing_progress.set_error(error)
+            progress.set_error(error)
+            await job_registry.save(progress)
             return {
                 "status": ProcessingStatus.ERROR,
                 "error": error
@@ -351,23 +444,38 @@ async def process_text_document(text: str, output_path: str = None) -> Dict[str,
             async with aiofiles.open(output_path, 'w') as f:
                 await f.write(final_summary)
                 
-        processing_progress.complete()
-        return {
+        result = {
             "status": ProcessingStatus.COMPLETED,
             "summary": final_summary,
-            "progress": 100
+            "progress": 100,
+            "retries": retry_budget.used,
+            "stages": stage_report.to_dict()
         }
+        logger.info(f"Stages: {result['stages']}")
+        progress.complete(result)
+        await job_registry.save(progress)
+        return result
+
+    except asyncio.CancelledError:
+        logger.info("Text processing cancelled")
+        progress.cancel()
+        await job_registry.save(progress)
+        raise
         
     except Exception as e:
         error_msg = str(e)
         logger.error(f"Error processing text: {error_msg}")
-        processing_progress.set_error(error_msg)
+        progress.set_error(error_msg)
+        await job_registry.save(progress)
         return {
             "status": ProcessingStatus.ERROR,
             "error": error_msg,
-            "progress": processing_progress.progress
+            "progress": progress.progress
         }
 
+    finally:
+        record_job_retries(retry_budget)
+
 def split_text_into_chunks(text: str) -> List[str]:
     """Split text into chunks that fit within token limits."""
     if not text:
@@ -481,6 +589,7 @@ def summarize_full_flow(test_api_limits: bool = False, verbose: bool = False):
 
     if test_api_limits:
         TOTAL_TOKEN_LIMIT = get_llama_total_token_limit(verbose=verbose)
+        groq_keys.tokens_per_minute = TOTAL_TOKEN_LIMIT
         MAX_INPUT_TOKENS = TOTAL_TOKEN_LIMIT - DESIRED_OUTPUT_TOKENS - OVERHEAD_TOKENS
     else:
         print("\nToken limit calculations:")
@@ -556,24 +665,17 @@ async def split_and_process_chunk(chunk: str) -> str:
         if sub_summary:
             summaries.append(sub_summary)
     
-    # Combine sub-summaries
+    # Combine sub-summaries; this is an intermediate combine, not the document's final one
     if not summaries:
         raise ValueError("No valid summaries generated from sub-chunks")
         
-    return await combine_summaries(summaries)
+    return await combine_summaries(summaries, stage="reduce")
 
 
 # Add status endpoint
-async def get_processing_status() -> Dict[str, Any]:
-    """Get current processing status."""
-    return {
-        "status": processing_progress.status,
-        "progress": processing_progress.progress,
-        "total_chunks": processing_progress.total_chunks,
-        "processed_chunks": processing_progress.processed_chunks,
-        "current_chunk": processing_progress.current_chunk,
-        "error": processing_progress.error
-    }
+async def get_processing_status(job_id: str) -> Dict[str, Any]:
+    """Get processing status for a job, or None if the job is unknown."""
+    return await job_registry.get(job_id)
 
 
 if __name__ == '__main__':
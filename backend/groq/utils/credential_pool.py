@@ -0,0 +1,5 @@
+"""
+API key pool for the Groq pipeline; re-exports backend/utils/credential_pool.py.
+"""
+
+from backend.utils.credential_pool import *  # noqa: F401,F403
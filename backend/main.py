@@ -11,6 +11,7 @@ sys.path.append(root)
 
 # Import centralized routers
 from backend.routers import routers
+from backend.utils.llama_api_helpers import close_http_client
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -39,5 +40,10 @@ for router_config in routers.values():
         tags=router_config["tags"]
     )
 
+@app.on_event("shutdown")
+async def close_http_clients():
+    """Close pooled provider connections."""
+    await close_http_client()
+
 if __name__ == "__main__":
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
@@ -0,0 +1,6 @@
+"""Shared test setup: the repository root on the import path, for backend.* imports."""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
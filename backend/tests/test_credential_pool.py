@@ -0,0 +1,55 @@
+import asyncio
+
+import pytest
+
+from backend.utils import credential_pool, rate_limiter
+from backend.utils.credential_pool import CredentialPool
+
+@pytest.fixture(autouse=True)
+def in_memory(monkeypatch):
+    monkeypatch.setattr(rate_limiter, "get_redis_client", lambda: None)
+    monkeypatch.setattr(rate_limiter, "RATE_LIMIT_REQUESTS", True)
+    monkeypatch.setattr(credential_pool, "rate_limiter", rate_limiter.RateLimiter())
+    monkeypatch.setenv("TEST_API_KEYS", "key-a,key-b")
+    monkeypatch.delenv("TEST_API_KEY", raising=False)
+
+def test_acquire_spreads_calls_over_keys():
+    pool = CredentialPool("test", "TEST_API_KEY", requests_per_minute=100, tokens_per_minute=1000)
+
+    async def run():
+        return [await pool.acquire("m", 400) for _ in range(2)]
+
+    first, second = asyncio.run(run())
+    assert first is not second
+    assert first.reserved_tokens == second.reserved_tokens == 400
+
+def test_acquire_waits_until_a_key_has_room(monkeypatch):
+    pool = CredentialPool("test", "TEST_API_KEY", requests_per_minute=1, tokens_per_minute=1000)
+    clock = [1000.0]
+    sleeps = []
+
+    async def fake_sleep(seconds):
+        sleeps.append(seconds)
+        clock[0] += seconds
+
+    monkeypatch.setattr(rate_limiter.time, "monotonic", lambda: clock[0])
+    monkeypatch.setattr(credential_pool.asyncio, "sleep", fake_sleep)
+
+    async def run():
+        held = [await pool.acquire("m", 10) for _ in range(2)]
+        return held, await pool.acquire("m", 10)
+
+    held, third = asyncio.run(run())
+    assert len(sleeps) == 1
+    assert sleeps[0] == pytest.approx(60, abs=0.5)
+    assert third in held
+
+def test_observed_hold_moves_calls_to_the_other_key():
+    pool = CredentialPool("test", "TEST_API_KEY", requests_per_minute=100, tokens_per_minute=1000)
+    held = pool.credentials[0]
+
+    async def run():
+        await pool.observe(held, "m", hold=30)
+        return [await pool.acquire("m", 10) for _ in range(3)]
+
+    assert all(credential is pool.credentials[1] for credential in asyncio.run(run()))
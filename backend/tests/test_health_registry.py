@@ -0,0 +1,97 @@
+import pytest
+
+from backend.utils import health_registry
+from backend.utils.health_registry import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, HealthRegistry
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(health_registry.time, "monotonic", clock)
+    monkeypatch.setattr(health_registry, "CIRCUIT_FAILURE_THRESHOLD", 3)
+    monkeypatch.setattr(health_registry, "CIRCUIT_OPEN_SECONDS", 30)
+    return clock
+
+def tripped(clock):
+    breaker = CircuitBreaker("groq", "llama-3.1-8b-instant")
+    for _ in range(3):
+        breaker.record_failure("server error", 500)
+    return breaker
+
+def test_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker("groq", "llama-3.1-8b-instant")
+    breaker.record_failure("server error", 500)
+    breaker.record_failure("timeout")
+    assert breaker.state == CLOSED and breaker.allow()
+    breaker.record_failure("server error", 502)
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+
+def test_rate_limit_opens_at_once_for_the_retry_after(clock):
+    breaker = CircuitBreaker("groq", "llama-3.1-8b-instant")
+    breaker.record_failure("rate limited", 429, retry_after=90)
+    assert breaker.state == OPEN
+    clock.now += 60
+    assert not breaker.allow()
+    clock.now += 31
+    assert breaker.allow()
+
+def test_client_errors_leave_the_breaker_closed(clock):
+    breaker = CircuitBreaker("groq", "llama-3.1-8b-instant")
+    for _ in range(5):
+        breaker.record_failure("bad request", 400)
+    assert breaker.state == CLOSED
+    assert breaker.consecutive_failures == 0
+
+def test_half_open_lets_one_trial_through(clock):
+    breaker = tripped(clock)
+    clock.now += 30
+    assert breaker.status()["state"] == HALF_OPEN
+    assert breaker.allow()
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allow()
+
+def test_trial_success_closes(clock):
+    breaker = tripped(clock)
+    clock.now += 30
+    breaker.allow()
+    breaker.record_success(0.4)
+    assert breaker.state == CLOSED
+    assert breaker.allow() and breaker.allow()
+
+def test_trial_failure_reopens(clock):
+    breaker = tripped(clock)
+    clock.now += 30
+    breaker.allow()
+    breaker.record_failure("server error", 503)
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+
+def test_abandoned_or_stale_trial_frees_the_slot(clock):
+    breaker = tripped(clock)
+    clock.now += 30
+    breaker.allow()
+    breaker.record_failure("bad request", 422)
+    assert breaker.allow()
+    clock.now += 31
+    assert breaker.allow()
+
+def test_registry_keeps_one_breaker_per_provider_and_model(clock):
+    registry = HealthRegistry()
+    assert registry.breaker("groq", "a") is registry.breaker("groq", "a")
+    assert registry.breaker("groq", "a") is not registry.breaker("groq", "b")
+
+def test_select_model_skips_open_circuits(clock):
+    registry = HealthRegistry()
+    for _ in range(3):
+        registry.record_failure("cerebras", "llama3.1-8b", "server error", 500)
+    assert registry.select_model("cerebras", ["llama3.1-8b", "llama3.3-70b"]) == "llama3.3-70b"
+    for _ in range(3):
+        registry.record_failure("cerebras", "llama3.3-70b", "server error", 500)
+    assert registry.select_model("cerebras", ["llama3.1-8b", "llama3.3-70b"]) is None
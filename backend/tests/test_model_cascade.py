@@ -0,0 +1,28 @@
+import importlib
+
+import pytest
+
+from backend.utils import model_cascade
+
+@pytest.fixture
+def reload_with(monkeypatch):
+    def reload(**env):
+        for name in ("GROQ_MODEL", "MAP_MODEL", "REDUCE_MODEL", "FINAL_MODEL", "DIALOGUE_MODEL"):
+            monkeypatch.delenv(name, raising=False)
+        for name, value in env.items():
+            monkeypatch.setenv(name, value)
+        return importlib.reload(model_cascade)
+    yield reload
+    monkeypatch.undo()
+    importlib.reload(model_cascade)
+
+def test_stages_default_to_groq_model(reload_with):
+    cascade = reload_with(GROQ_MODEL="small")
+    assert [cascade.stage_model(stage) for stage in ("map", "reduce", "final")] == ["small"] * 3
+    assert cascade.stage_model("dialogue") == "llama-3.3-70b-versatile"
+
+def test_reduce_follows_map_and_final_is_separate(reload_with):
+    cascade = reload_with(GROQ_MODEL="small", MAP_MODEL="fast", FINAL_MODEL="large")
+    assert cascade.stage_model("map") == "fast"
+    assert cascade.stage_model("reduce") == "fast"
+    assert cascade.stage_model("final") == "large"
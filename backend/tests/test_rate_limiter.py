@@ -0,0 +1,59 @@
+import asyncio
+
+import pytest
+
+from backend.utils import rate_limiter
+from backend.utils.rate_limiter import RateLimiter
+
+@pytest.fixture(autouse=True)
+def enabled(monkeypatch):
+    monkeypatch.setattr(rate_limiter, "RATE_LIMIT_REQUESTS", True)
+
+def test_buckets_in_memory(monkeypatch):
+    monkeypatch.setattr(rate_limiter, "get_redis_client", lambda: None)
+    limiter = RateLimiter()
+
+    async def run():
+        admitted = [await limiter.reserve("groq:m:k", 2, 1000, 100) for _ in range(3)]
+        too_big = await limiter.reserve("groq:m:other", 100, 1000, 5000)
+        return admitted, too_big
+
+    admitted, too_big = asyncio.run(run())
+    assert admitted[:2] == [0, 0]
+    assert admitted[2] == pytest.approx(30, abs=0.5)
+    # A call larger than the bucket only waits for a full one
+    assert too_big == 0
+
+def test_observe_lowers_tokens_and_holds_the_key(monkeypatch):
+    monkeypatch.setattr(rate_limiter, "get_redis_client", lambda: None)
+    limiter = RateLimiter()
+
+    async def run():
+        await limiter.observe("groq:m:k", 100, 1000, remaining_tokens=100)
+        low = await limiter.reserve("groq:m:k", 100, 1000, 400)
+        await limiter.observe("groq:m:held", 100, 1000, hold=5)
+        held = await limiter.reserve("groq:m:held", 100, 1000, 10)
+        return low, held
+
+    low, held = asyncio.run(run())
+    assert low == pytest.approx(18, abs=0.5)
+    assert held == pytest.approx(5, abs=0.5)
+
+def test_limiters_share_buckets_through_redis(monkeypatch):
+    # The Lua scripts need fakeredis with lupa
+    pytest.importorskip("lupa")
+    redis = pytest.importorskip("fakeredis").aioredis.FakeRedis(decode_responses=True)
+    monkeypatch.setattr(rate_limiter, "get_redis_client", lambda: redis)
+    first, second = RateLimiter(), RateLimiter()
+
+    async def run():
+        await redis.flushall()
+        return [
+            await first.reserve("groq:m:k", 2, 1000, 100),
+            await second.reserve("groq:m:k", 2, 1000, 100),
+            await first.reserve("groq:m:k", 2, 1000, 100),
+        ]
+
+    waits = asyncio.run(run())
+    assert waits[:2] == [0, 0]
+    assert waits[2] == pytest.approx(30, abs=0.5)
@@ -0,0 +1,156 @@
+"""
+Pool of provider API keys.
+
+Keys come from NAME_API_KEYS (comma-separated) and NAME_API_KEY, so adding
+keys multiplies the rate limits a provider allows us. With RPM/TPM limits
+every call reserves a request and its tokens in the key's buckets for the
+model (backend.utils.rate_limiter, shared through Redis), and waits until
+some key can admit it. Keys are tried in order of most limit left - the
+buckets, or without limits the provider's last x-ratelimit-remaining-tokens
+minus what calls in flight have reserved - then fewest calls in flight, so
+concurrent calls spread over the keys. A key the provider rejects as
+unauthorized is quarantined for a while.
+"""
+
+import os
+import time
+import asyncio
+import hashlib
+from typing import List, Optional
+
+from backend.utils.metrics import metrics
+from backend.utils.rate_limiter import rate_limiter
+
+CREDENTIAL_QUARANTINE_SECONDS = float(os.getenv("CREDENTIAL_QUARANTINE_SECONDS", 600))
+AUTH_FAILURE_STATUS_CODES = {401, 403}
+
+def load_api_keys(env_name: str) -> List[str]:
+    """Keys from NAME_API_KEYS (comma-separated) and NAME_API_KEY, without duplicates."""
+    keys = [key.strip() for key in os.getenv(env_name + "S", "").split(",")]
+    keys.append((os.getenv(env_name) or "").strip())
+    return list(dict.fromkeys(key for key in keys if key))
+
+class Credential:
+    def __init__(self, api_key: str):
+        self.api_key = api_key
+        # Identifies the key in logs and metrics without exposing it
+        self.key_id = hashlib.sha256(api_key.encode()).hexdigest()[:12]
+        self.in_flight = 0
+        self.reserved_tokens = 0  # Prompt + max_tokens of the calls in flight
+        self.remaining_tokens: Optional[int] = None
+        self.quarantined_until = 0.0
+
+    @property
+    def quarantined(self) -> bool:
+        return time.monotonic() < self.quarantined_until
+
+    @property
+    def headroom(self) -> float:
+        """Tokens the provider has left for this key, less what in-flight calls will use."""
+        remaining = self.remaining_tokens if self.remaining_tokens is not None else float("inf")
+        return remaining - self.reserved_tokens
+
+class CredentialPool:
+    def __init__(
+        self,
+        provider: str,
+        env_name: str,
+        requests_per_minute: Optional[int] = None,
+        tokens_per_minute: Optional[int] = None
+    ):
+        self.provider = provider
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.credentials = [Credential(api_key) for api_key in load_api_keys(env_name)]
+        if not self.credentials:
+            raise ValueError(f"{env_name} (or {env_name}S) not found in environment variables")
+
+    def __len__(self) -> int:
+        return len(self.credentials)
+
+    @property
+    def limited(self) -> bool:
+        return bool(self.requests_per_minute and self.tokens_per_minute)
+
+    def bucket(self, credential: Credential, model: str) -> str:
+        """Rate-limit bucket of a key for a model."""
+        return f"{self.provider}:{model}:{credential.key_id}"
+
+    def _headroom(self, credential: Credential, model: str) -> float:
+        if self.limited:
+            return rate_limiter.headroom(self.bucket(credential, model))
+        return credential.headroom
+
+    def usable(self) -> List[Credential]:
+        """Keys that are not quarantined."""
+        return [credential for credential in self.credentials if not credential.quarantined]
+
+    async def acquire(self, model: str, tokens: int = 0) -> Credential:
+        """
+        Take the key with the most headroom that can admit the call, waiting until one can.
+
+        Args:
+            model: Model the call goes to; each key has buckets per model
+            tokens: Prompt + max_tokens of the call
+
+        Quarantined keys are only used if nothing else is left.
+        """
+        waited = False
+        while True:
+            candidates = self.usable() or self.credentials
+            candidates = sorted(candidates, key=lambda c: (-self._headroom(c, model), c.in_flight))
+            credential = None
+            waits = []
+            for candidate in candidates:
+                wait = 0.0
+                if self.limited:
+                    wait = await rate_limiter.reserve(
+                        self.bucket(candidate, model), self.requests_per_minute, self.tokens_per_minute, tokens
+                    )
+                if wait <= 0:
+                    credential = candidate
+                    break
+                waits.append(wait)
+            if credential is not None:
+                break
+            if not waited:
+                metrics.increment("rate_limit_waits", provider=self.provider, model=model)
+                waited = True
+            await asyncio.sleep(min(waits))
+
+        credential.in_flight += 1
+        credential.reserved_tokens += tokens
+        return credential
+
+    def release(self, credential: Credential, remaining_tokens: Optional[int] = None, tokens: int = 0) -> None:
+        """Return a key after a call, with the provider's latest remaining-token count if known."""
+        credential.in_flight -= 1
+        credential.reserved_tokens -= tokens
+        if remaining_tokens is not None:
+            credential.remaining_tokens = remaining_tokens
+            metrics.set_gauge(
+                "rate_limit_remaining", remaining_tokens,
+                provider=self.provider, key=credential.key_id, kind="tokens"
+            )
+
+    async def observe(
+        self,
+        credential: Credential,
+        model: str,
+        remaining_tokens: Optional[int] = None,
+        hold: float = 0.0
+    ) -> None:
+        """Lower a key's buckets to what the provider reported, and hold it for `hold` seconds."""
+        if self.limited:
+            await rate_limiter.observe(
+                self.bucket(credential, model), self.requests_per_minute, self.tokens_per_minute,
+                remaining_tokens=remaining_tokens, hold=hold or 0.0
+            )
+
+    def quarantine(self, credential: Credential, reason: str) -> None:
+        """Stop using a key for CREDENTIAL_QUARANTINE_SECONDS."""
+        if credential.quarantined:
+            return
+        credential.quarantined_until = time.monotonic() + CREDENTIAL_QUARANTINE_SECONDS
+        metrics.increment("credentials_quarantined", provider=self.provider, key=credential.key_id)
+        print(f"Quarantined {self.provider} key {credential.key_id} for {CREDENTIAL_QUARANTINE_SECONDS:.0f}s: {reason}")
@@ -0,0 +1,50 @@
+"""
+Cancel request work when the HTTP client goes away.
+
+Long synchronous endpoints (e.g. /process-pdf without background=true) run
+their pipeline as a task and poll the connection. When the client
+disconnects the task is cancelled, which propagates CancelledError through
+the summarizer and stops in-flight provider calls.
+"""
+
+import asyncio
+import logging
+from typing import Any, Awaitable
+
+from fastapi import Request
+from fastapi.responses import JSONResponse
+
+from .metrics import metrics
+
+DISCONNECT_POLL_SECONDS = 1.0
+
+# Non-standard status (nginx) for "client closed request"; nobody reads it
+CLIENT_CLOSED_REQUEST = 499
+
+logger = logging.getLogger(__name__)
+
+async def cancel_on_disconnect(
+    request: Request,
+    job: Awaitable[Any],
+    poll_interval: float = DISCONNECT_POLL_SECONDS
+) -> Any:
+    """Await job, cancelling it if the client disconnects first."""
+    task = asyncio.ensure_future(job)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=poll_interval)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                break
+
+        logger.info(f"Client disconnected from {request.url.path}, cancelling its work")
+        metrics.increment("requests_cancelled", reason="client_disconnect")
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        return JSONResponse(status_code=CLIENT_CLOSED_REQUEST, content={"status": "cancelled"})
+    finally:
+        task.cancel()
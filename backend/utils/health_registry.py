@@ -0,0 +1,172 @@
+"""
+Provider health tracked from real traffic.
+
+Every model call reports its outcome here instead of the service sending
+probe completions. Each (provider, model) has a circuit breaker:
+
+- closed: calls flow; CIRCUIT_FAILURE_THRESHOLD failures in a row open it,
+  and a 429 opens it at once for at least the provider's retry-after
+- open: calls are refused for CIRCUIT_OPEN_SECONDS
+- half-open: one trial call is let through; its success closes the
+  breaker, its failure opens it again
+
+Health endpoints read this state, so they answer without network calls.
+"""
+
+import os
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from backend.utils.metrics import metrics
+
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", 3))
+CIRCUIT_OPEN_SECONDS = float(os.getenv("CIRCUIT_OPEN_SECONDS", 30))
+# Client errors other than these say nothing about the provider's health
+TRANSIENT_CLIENT_ERRORS = {408, 429}
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+class CircuitBreaker:
+    def __init__(self, provider: str, model: str):
+        self.provider = provider
+        self.model = model
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+        self.trial_started_at: Optional[float] = None
+        self.last_success_at: Optional[float] = None
+        self.last_failure_at: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.latency_ewma: Optional[float] = None
+
+    def allow(self) -> bool:
+        """Whether a call may go out now; in half-open this claims the single trial."""
+        now = time.monotonic()
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN:
+            if now < self.open_until:
+                return False
+            self.state = HALF_OPEN
+            self.trial_started_at = None
+        # A trial that never reported back (e.g. cancelled) expires
+        if self.trial_started_at is not None and now - self.trial_started_at < CIRCUIT_OPEN_SECONDS:
+            return False
+        self.trial_started_at = now
+        return True
+
+    def record_success(self, latency: float = None) -> None:
+        self.last_success_at = time.monotonic()
+        self.consecutive_failures = 0
+        if latency is not None:
+            self.latency_ewma = latency if self.latency_ewma is None else 0.8 * self.latency_ewma + 0.2 * latency
+        if self.state != CLOSED:
+            print(f"Circuit closed for {self.provider}/{self.model}")
+        self.state = CLOSED
+        self.trial_started_at = None
+        metrics.set_gauge("circuit_open", 0, provider=self.provider, model=self.model)
+
+    def record_failure(self, reason: str, status_code: int = None, retry_after: float = None) -> None:
+        if status_code is not None and 400 <= status_code < 500 and status_code not in TRANSIENT_CLIENT_ERRORS:
+            # The request was at fault, not the provider
+            self.abandon()
+            return
+        now = time.monotonic()
+        self.last_failure_at = now
+        self.last_error = reason
+        self.consecutive_failures += 1
+        if self.state == HALF_OPEN or status_code == 429 or self.consecutive_failures >= CIRCUIT_FAILURE_THRESHOLD:
+            self._open(now, max(CIRCUIT_OPEN_SECONDS, retry_after or 0))
+
+    def abandon(self) -> None:
+        """Give up a half-open trial without a verdict so another call can try."""
+        if self.state == HALF_OPEN:
+            self.trial_started_at = None
+
+    def _open(self, now: float, seconds: float) -> None:
+        if self.state != OPEN:
+            metrics.increment("circuit_trips", provider=self.provider, model=self.model)
+            print(f"Circuit opened for {self.provider}/{self.model} for {seconds:.0f}s: {self.last_error}")
+        self.state = OPEN
+        self.open_until = max(self.open_until, now + seconds)
+        self.trial_started_at = None
+        metrics.set_gauge("circuit_open", 1, provider=self.provider, model=self.model)
+
+    def status(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        state = HALF_OPEN if self.state == OPEN and now >= self.open_until else self.state
+        return {
+            "state": state,
+            "consecutive_failures": self.consecutive_failures,
+            "retry_in_seconds": round(max(0.0, self.open_until - now), 1) if state == OPEN else 0,
+            "seconds_since_success": None if self.last_success_at is None else round(now - self.last_success_at, 1),
+            "seconds_since_failure": None if self.last_failure_at is None else round(now - self.last_failure_at, 1),
+            "last_error": self.last_error,
+            "latency_seconds": None if self.latency_ewma is None else round(self.latency_ewma, 3),
+        }
+
+class HealthRegistry:
+    def __init__(self):
+        self._breakers: Dict[Tuple[str, str], CircuitBreaker] = {}
+
+    def breaker(self, provider: str, model: str) -> CircuitBreaker:
+        key = (provider, model)
+        if key not in self._breakers:
+            self._breakers[key] = CircuitBreaker(provider, model)
+        return self._breakers[key]
+
+    def allow(self, provider: str, model: str) -> bool:
+        return self.breaker(provider, model).allow()
+
+    def record_success(self, provider: str, model: str, latency: float = None) -> None:
+        self.breaker(provider, model).record_success(latency)
+
+    def record_failure(
+        self,
+        provider: str,
+        model: str,
+        reason: str,
+        status_code: int = None,
+        retry_after: float = None
+    ) -> None:
+        """
+        Report a failed call.
+
+        Args:
+            reason: Short description for the health endpoint
+            status_code: HTTP status, or None for connection errors and timeouts
+            retry_after: Seconds the provider asked us to wait, if any
+        """
+        self.breaker(provider, model).record_failure(reason, status_code, retry_after)
+
+    def abandon(self, provider: str, model: str) -> None:
+        """Report a call that ended without an outcome (e.g. cancelled)."""
+        self.breaker(provider, model).abandon()
+
+    def select_model(self, provider: str, models: List[str]) -> Optional[str]:
+        """First model, in preference order, whose breaker lets a call through; None if all are open."""
+        for model in models:
+            if self.allow(provider, model):
+                return model
+        return None
+
+    def health(self, provider: str) -> Dict[str, Any]:
+        """Cached health of a provider's models: ok, degraded (some open) or error (all open)."""
+        models = {
+            model: breaker.status()
+            for (name, model), breaker in self._breakers.items()
+            if name == provider
+        }
+        open_count = sum(1 for status in models.values() if status["state"] == OPEN)
+        if not open_count:
+            status = "ok"
+        elif open_count < len(models):
+            status = "degraded"
+        else:
+            status = "error"
+        return {"status": status, "provider": provider, "models": models}
+
+# Shared registry for the process
+health_registry = HealthRegistry()
@@ -0,0 +1,67 @@
+"""
+Rolling time-to-first-token samples per provider, model and request size.
+
+Streamed calls are bounded by httpx's read timeout, the longest wait for
+the next bytes, and the longest of those waits is the one before the first
+token. So the read timeout is taken from the observed p99 time to first
+token for calls of that size, times TIMEOUT_FACTOR: tight for a fast
+provider, generous for a slow one. Until a key has enough samples the
+linear calculate_timeout estimate is used. A call that times out is
+recorded at its timeout, so a provider that slows down pushes its own
+timeout up. Samples are per worker process.
+"""
+
+import os
+import math
+from collections import defaultdict, deque
+from typing import Deque, Dict, Optional, Tuple
+
+from backend.utils.metrics import metrics
+
+LATENCY_WINDOW = 200  # Samples kept per key
+LATENCY_MIN_SAMPLES = 20  # Below this a percentile is not trusted
+TIMEOUT_PERCENTILE = float(os.getenv("TIMEOUT_PERCENTILE", 99))
+TIMEOUT_FACTOR = float(os.getenv("TIMEOUT_FACTOR", 2.0))
+TIMEOUT_MIN_SECONDS = float(os.getenv("TIMEOUT_MIN_SECONDS", 5))
+TIMEOUT_MAX_SECONDS = float(os.getenv("TIMEOUT_MAX_SECONDS", 120))
+
+def size_bucket(input_tokens: int) -> int:
+    """Round a request size up to a power-of-two number of 1K tokens (1, 2, 4, ...)."""
+    kilo_tokens = max(1, math.ceil(input_tokens / 1000))
+    return 1 << (kilo_tokens - 1).bit_length()
+
+class LatencyTracker:
+    def __init__(self, window: int = LATENCY_WINDOW, min_samples: int = LATENCY_MIN_SAMPLES):
+        self.window = window
+        self.min_samples = min_samples
+        self._samples: Dict[Tuple[str, str, int], Deque[float]] = defaultdict(
+            lambda: deque(maxlen=self.window)
+        )
+
+    def record(self, provider: str, model: str, input_tokens: int, seconds: float) -> None:
+        """Record a call's time to first token (or its timeout, if it timed out)."""
+        self._samples[(provider, model, size_bucket(input_tokens))].append(seconds)
+
+    def percentile(self, provider: str, model: str, input_tokens: int, pct: float) -> Optional[float]:
+        """Observed percentile for calls of this size, or None with too few samples."""
+        samples = self._samples.get((provider, model, size_bucket(input_tokens)))
+        if not samples or len(samples) < self.min_samples:
+            return None
+        ordered = sorted(samples)
+        index = min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1)
+        return ordered[max(0, index)]
+
+    def read_timeout(self, provider: str, model: str, input_tokens: int) -> Optional[float]:
+        """p99 time to first token times TIMEOUT_FACTOR within the bounds, or None until measured."""
+        observed = self.percentile(provider, model, input_tokens, TIMEOUT_PERCENTILE)
+        if observed is None:
+            return None
+        seconds = min(TIMEOUT_MAX_SECONDS, max(TIMEOUT_MIN_SECONDS, observed * TIMEOUT_FACTOR))
+        metrics.set_gauge(
+            "call_timeout_seconds", round(seconds, 2),
+            provider=provider, model=model, bucket=size_bucket(input_tokens)
+        )
+        return seconds
+
+# Shared tracker for the process
+latency_tracker = LatencyTracker()
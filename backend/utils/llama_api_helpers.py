@@ -12,8 +12,9 @@ load_dotenv()
 from backend.utils.llama_api_helpers import *
 """
 
-from typing import Dict, Any
-import requests
+from typing import Dict, Any, Optional
+import logging
+import httpx
 import json
 from llamaapi import LlamaAPI
 from .token_counter import count_tokens
@@ -21,6 +22,29 @@ import time
 import asyncio
 import re
 
+GROQ_CHAT_URL = "https://api.groq.com/openai/v1/chat/completions"
+MAX_CONNECTIONS = 20  # Pooled connections to the provider
+MAX_KEEPALIVE_CONNECTIONS = 10  # Idle connections kept open between calls
+KEEPALIVE_EXPIRY = 60  # Seconds an idle connection is kept
+
+DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+
+logger = logging.getLogger(__name__)
+
+def parse_duration(value: str) -> float:
+    """Seconds in a rate-limit header value such as "1s", "6m0s", "20ms" or "0.5"."""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    units = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+    parts = DURATION_PART.findall(value)
+    if not parts:
+        return None
+    return sum(float(amount) * units[unit] for amount, unit in parts)
+
 class APIError(Exception):
     """Custom exception for API errors"""
     ERROR_MESSAGES = {
@@ -35,14 +59,20 @@ class APIError(Exception):
         524: "Request timed out"
     }
 
-    def __init__(self, status_code: int, response_body: str = None):
+    def __init__(self, status_code: int, response_body: str = None, headers: dict = None):
         self.status_code = status_code
         self.response_body = response_body
+        self.headers = headers or {}
         self.message = self.ERROR_MESSAGES.get(status_code, f"Unknown error {status_code}")
         super().__init__(self.message)
 
     def extract_wait_time(self) -> float:
-        """Extract wait time from Groq error message."""
+        """Wait time from the retry-after/rate-limit reset headers, else from Groq's error message."""
+        for header in ("retry-after", "x-ratelimit-reset-requests", "x-ratelimit-reset-tokens"):
+            wait_time = parse_duration(self.headers.get(header))
+            if wait_time:
+                return wait_time
+
         if not self.response_body:
             return None
         
@@ -89,6 +119,40 @@ class APIError(Exception):
 
         await asyncio.sleep(wait_time)
 
+_http_client: Optional[httpx.AsyncClient] = None
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+def get_http_client() -> httpx.AsyncClient:
+    """Process-wide pooled client, so calls reuse warm keep-alive connections.
+
+    HTTP/2 is used when the h2 package is installed, letting concurrent chunk
+    calls share one connection.
+    """
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            http2=_http2_available(),
+            limits=httpx.Limits(
+                max_connections=MAX_CONNECTIONS,
+                max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=KEEPALIVE_EXPIRY
+            )
+        )
+    return _http_client
+
+async def close_http_client() -> None:
+    """Close the pooled client (on app shutdown)."""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
 def handle_api_response(response: dict) -> str:
     """Handle API response and extract summary text."""
     if not response:
@@ -113,14 +177,85 @@ def handle_api_response(response: dict) -> str:
 
     return ""
 
-def make_api_call(
+class StreamStats:
+    """Per-call timing and output token accounting for streamed completions."""
+
+    def __init__(self):
+        self.start_time = time.time()
+        self.first_token_time = None
+        self.end_time = None
+        self.output_tokens = 0
+        self.stopped_early = False
+        # Tokens left on the API key per the response's rate-limit headers
+        self.remaining_tokens = None
+
+    def record(self, content: str) -> int:
+        """Count a streamed delta and return the running output token total."""
+        if self.first_token_time is None:
+            self.first_token_time = time.time()
+        self.output_tokens += count_tokens(content)
+        return self.output_tokens
+
+    def finish(self) -> None:
+        self.end_time = time.time()
+
+    @property
+    def time_to_first_token(self) -> float:
+        """Seconds from request start to the first content delta."""
+        if self.first_token_time is None:
+            return None
+        return self.first_token_time - self.start_time
+
+    @property
+    def tokens_per_second(self) -> float:
+        """Output rate measured from the first token to the end of the stream."""
+        if self.first_token_time is None or self.end_time is None:
+            return 0.0
+        elapsed = self.end_time - self.first_token_time
+        if elapsed <= 0:
+            return 0.0
+        return self.output_tokens / elapsed
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "output_tokens": self.output_tokens,
+            "time_to_first_token": self.time_to_first_token,
+            "tokens_per_second": self.tokens_per_second,
+            "stopped_early": self.stopped_early,
+        }
+
+def trim_to_last_sentence(text: str) -> str:
+    """Drop a trailing partial sentence left behind by an early stop."""
+    cut = max(text.rfind(". "), text.rfind(".\n"), text.rfind("! "), text.rfind("? "))
+    if text.rstrip().endswith((".", "!", "?")) or cut == -1:
+        return text
+    return text[:cut + 1]
+
+async def make_api_call(
     llama_client: LlamaAPI,
     messages: list,
     model: str,
     timeout: tuple[int, int] = (10, 30),
-    stream: bool = True
+    stream: bool = True,
+    max_output_tokens: int = None,
+    stats: StreamStats = None,
+    idempotency_key: str = None
 ) -> str:
-    """Make API call with error handling."""
+    """Make API call with error handling.
+
+    Uses the pooled client from get_http_client, so no connection setup is
+    paid per call once the pool is warm.
+    When streaming, output tokens are counted as the deltas arrive. If
+    max_output_tokens is given the stream is closed as soon as the count
+    passes it and the text is trimmed back to the last full sentence.
+    Pass a StreamStats instance to read time to first token and tokens
+    per second for the call.
+    Cancelling the awaiting task closes the stream right away.
+    Pass the same idempotency_key for every attempt of one logical call.
+    """
+    if stats is None:
+        stats = StreamStats()
+    connect_timeout, read_timeout = timeout
     try:
         api_request = {
             "model": model,
@@ -135,72 +270,92 @@ def make_api_call(
         if total_tokens > 4000:  # Groq's recommended max per request
             raise APIError(400, f"Request too large: {total_tokens} tokens")
 
-        response = requests.post(
-            "https://api.groq.com/openai/v1/chat/completions",
-            headers={"Authorization": f"Bearer {llama_client.api_token}"},
+        client = get_http_client()
+        async with client.stream(
+            "POST",
+            GROQ_CHAT_URL,
+            headers={
+                "Authorization": f"Bearer {llama_client.api_token}",
+                **({"Idempotency-Key": idempotency_key} if idempotency_key else {})
+            },
             json=api_request,
-            timeout=timeout,
-            stream=stream
-        )
-
-        if response.status_code != 200:
-            error_body = None
-            try:
-                error_body = response.json()
-            except Exception:
-                error_body = str(response.content)
-            raise APIError(response.status_code, error_body)
-
-        if not stream:
-            response_json = response.json()
-            if not response_json:
-                raise APIError(422, "Empty JSON response")
-
-            content = handle_api_response(response_json)
-            if not content:
-                raise APIError(422, "No valid content in response")
-            return content.strip()
-
-        # Process streamed response
-        full_content = ""
-        try:
-            for line in response.iter_lines():
-                if not line:
-                    continue
-                if line == b'data: [DONE]':
-                    break
-
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout)
+        ) as response:
+            if response.status_code != 200:
+                body = await response.aread()
                 try:
-                    if line.startswith(b'data: '):
-                        line = line[6:]
-                    json_response = json.loads(line)
-                    if content := handle_api_response(json_response):
-                        full_content += content
-                except json.JSONDecodeError as e:
-                    # Log but continue - one bad line shouldn't fail the whole response
-                    print(f"Warning: Failed to parse line: {str(e)}")
-                    continue
-
-        except requests.Timeout as err:
-            raise APIError(524, f"Stream timed out after {timeout[1]} seconds") from err
-        except Exception as err:
-            # Any other error during streaming is unexpected and should be treated as a server error
-            raise APIError(500, f"Stream processing failed: {str(err)}") from err
-
+                    error_body = json.loads(body)
+                except Exception:
+                    error_body = body.decode(errors="replace")
+                raise APIError(response.status_code, error_body, dict(response.headers))
+            try:
+                stats.remaining_tokens = int(response.headers["x-ratelimit-remaining-tokens"])
+            except (KeyError, ValueError):
+                pass
+
+            if not stream:
+                response_json = json.loads(await response.aread())
+                if not response_json:
+                    raise APIError(422, "Empty JSON response")
+
+                content = handle_api_response(response_json)
+                if not content:
+                    raise APIError(422, "No valid content in response")
+                return content.strip()
+
+            # Process streamed response; parts are joined once at the end
+            parts = []
+            try:
+                async for line in response.aiter_lines():
+                    if not line:
+                        continue
+                    if line == 'data: [DONE]':
+                        break
+
+                    try:
+                        if line.startswith('data: '):
+                            line = line[6:]
+                        json_response = json.loads(line)
+                        if content := handle_api_response(json_response):
+                            parts.append(content)
+                            output_tokens = stats.record(content)
+                            if max_output_tokens and output_tokens >= max_output_tokens:
+                                # Budget reached - stop paying for tokens we will throw away
+                                stats.stopped_early = True
+                                break
+                    except json.JSONDecodeError as e:
+                        # Log but continue - one bad line shouldn't fail the whole response
+                        print(f"Warning: Failed to parse line: {str(e)}")
+                        continue
+
+            except httpx.TimeoutException as err:
+                raise APIError(524, f"Stream timed out after {read_timeout} seconds") from err
+            except Exception as err:
+                # Any other error during streaming is unexpected and should be treated as a server error
+                raise APIError(500, f"Stream processing failed: {str(err)}") from err
+            finally:
+                stats.finish()
+
+        full_content = "".join(parts)
         if not full_content:
             raise APIError(422, "No valid content in response")
 
+        ttft = stats.time_to_first_token
+        logger.debug(
+            f"Stream stats: {stats.output_tokens:,} tokens, "
+            f"ttft {ttft:.2f}s, {stats.tokens_per_second:.1f} tokens/s"
+            + (f" (stopped at {max_output_tokens:,} token budget)" if stats.stopped_early else "")
+        )
+
+        if stats.stopped_early:
+            full_content = trim_to_last_sentence(full_content)
+
         return full_content.strip()
 
-    except requests.Timeout as err:
-        raise APIError(524, f"Request timed out after {timeout[1]} seconds") from err
-    except requests.ConnectionError as e:
+    except httpx.TimeoutException as err:
+        raise APIError(524, f"Request timed out after {read_timeout} seconds") from err
+    except httpx.TransportError as e:
         raise APIError(503, f"Connection failed: {str(e)}") from e  # Service unavailable
-    except requests.RequestException as err:
-        if hasattr(err, 'response') and err.response is not None:
-            status_code = err.response.status_code
-            raise APIError(status_code, err.response.text) from err
-        raise APIError(500, str(err)) from err
     except Exception as e:
         if isinstance(e, APIError):
             raise  # Re-raise APIError as is
@@ -298,6 +453,14 @@ def estimate_token_cost_per_model(
         "Qwen1.5-72B-Chat": 0.0028,
         "Qwen1.5-7B-Chat": 0.0004,
         "Qwen2-72B-Instruct": 0.0028,
+
+        # Groq model ids (completion price, an upper bound for prompt tokens)
+        "llama-3.1-8b-instant": 0.00008,
+        "llama3-8b-8192": 0.00008,
+        "llama-3.3-70b-versatile": 0.00079,
+        "llama3-70b-8192": 0.00079,
+        "gemma2-9b-it": 0.0002,
+        "mixtral-8x7b-32768": 0.00024,
     }
 
     try:
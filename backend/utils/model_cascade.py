@@ -0,0 +1,135 @@
+"""
+Model cascade: which model each stage of a job runs on, and what each stage cost.
+
+Chunk summaries (map) are most of a job's calls and a fast, cheap model
+does them well; the final combine and the dialogue are single calls whose
+quality the user sees. So each stage's model is set on its own:
+
+    MAP_MODEL       per-chunk summaries (default: GROQ_MODEL)
+    REDUCE_MODEL    intermediate combines of large documents (default: MAP_MODEL)
+    FINAL_MODEL     the combine that produces the summary (default: GROQ_MODEL)
+    DIALOGUE_MODEL  summary to dialogue (default: llama-3.3-70b-versatile)
+
+Every call is recorded under its stage - calls, tokens, call seconds, wall
+seconds and estimated cost - in the metrics and in the job's StageReport,
+so the split can be tuned. Like the retry budget, the report lives in a
+context variable, so every task the job creates records into it.
+"""
+
+import os
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+
+from backend.utils.metrics import metrics
+
+DEFAULT_MODEL = os.getenv("GROQ_MODEL", "llama-3.1-8b-instant")
+MAP_MODEL = os.getenv("MAP_MODEL", DEFAULT_MODEL)
+STAGE_MODELS = {
+    "map": MAP_MODEL,
+    "reduce": os.getenv("REDUCE_MODEL", MAP_MODEL),
+    "final": os.getenv("FINAL_MODEL", DEFAULT_MODEL),
+    "dialogue": os.getenv("DIALOGUE_MODEL", "llama-3.3-70b-versatile"),
+}
+
+def stage_model(stage: str) -> str:
+    """Model configured for a stage: map, reduce, final or dialogue."""
+    return STAGE_MODELS[stage]
+
+class StageStats:
+    """Calls, tokens, time and cost of one stage of a job."""
+
+    def __init__(self, model: str):
+        self.model = model
+        self.calls = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.call_seconds = 0.0
+        self.cost = 0.0
+        self.first_started: Optional[float] = None
+        self.last_finished: Optional[float] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        # Map calls overlap, so wall time is what the stage adds to the job
+        wall_seconds = 0.0
+        if self.first_started is not None:
+            wall_seconds = self.last_finished - self.first_started
+        return {
+            "model": self.model,
+            "calls": self.calls,
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+            "call_seconds": round(self.call_seconds, 2),
+            "wall_seconds": round(wall_seconds, 2),
+            "cost_usd": round(self.cost, 6),
+        }
+
+class StageReport:
+    """Per-stage stats of one job."""
+
+    def __init__(self):
+        self.stages: Dict[str, StageStats] = {}
+
+    def record(
+        self,
+        stage: str,
+        model: str,
+        input_tokens: int,
+        output_tokens: int,
+        started_at: float,
+        finished_at: float,
+        cost: float
+    ) -> None:
+        stats = self.stages.setdefault(stage, StageStats(model))
+        stats.calls += 1
+        stats.input_tokens += input_tokens
+        stats.output_tokens += output_tokens
+        stats.call_seconds += finished_at - started_at
+        stats.cost += cost
+        if stats.first_started is None or started_at < stats.first_started:
+            stats.first_started = started_at
+        if stats.last_finished is None or finished_at > stats.last_finished:
+            stats.last_finished = finished_at
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {stage: stats.to_dict() for stage, stats in self.stages.items()}
+
+_stage_report: ContextVar[Optional[StageReport]] = ContextVar("stage_report", default=None)
+
+def start_stage_report() -> StageReport:
+    """Give the current job an empty report."""
+    report = StageReport()
+    _stage_report.set(report)
+    return report
+
+def current_stage_report() -> Optional[StageReport]:
+    """The current job's report, or None outside a job."""
+    return _stage_report.get()
+
+def record_stage_call(
+    stage: str,
+    model: str,
+    input_tokens: int,
+    output_tokens: int,
+    started_at: float,
+    cost: float
+) -> None:
+    """
+    Record a finished call of a stage.
+
+    Args:
+        stage: map, reduce, final or dialogue
+        model: Model the call ran on
+        input_tokens: Prompt tokens
+        output_tokens: Completion tokens
+        started_at: time.monotonic() when the call started, retries included
+        cost: Estimated USD cost of the call
+    """
+    finished_at = time.monotonic()
+    metrics.increment("stage_calls", stage=stage, model=model)
+    metrics.increment("stage_tokens", input_tokens + output_tokens, stage=stage, model=model)
+    metrics.increment("stage_seconds", round(finished_at - started_at, 3), stage=stage, model=model)
+    metrics.increment("stage_cost_usd", cost, stage=stage, model=model)
+    report = _stage_report.get()
+    if report is not None:
+        report.record(stage, model, input_tokens, output_tokens, started_at, finished_at, cost)
@@ -0,0 +1,82 @@
+"""
+Per-job retry budget for LLM calls.
+
+Retries happen in one place only, the single provider call (call_llama).
+Each retry takes one from the job's budget, so a flaky provider costs a
+job a bounded number of extra requests instead of the product of nested
+retry loops; once the budget is spent the next failure fails the job. The
+budget lives in a context variable, so every chunk and combine task the
+job creates draws from the same one.
+"""
+
+import os
+import math
+from contextvars import ContextVar
+from typing import Optional
+
+from backend.utils.metrics import metrics
+
+RETRY_BUDGET_FRACTION = float(os.getenv("RETRY_BUDGET_FRACTION", 0.2))  # Retries per planned call
+RETRY_BUDGET_MIN = int(os.getenv("RETRY_BUDGET_MIN", 3))
+MAX_ATTEMPTS_PER_CALL = int(os.getenv("MAX_ATTEMPTS_PER_CALL", 3))
+
+class RetryBudget:
+    """Caps how many retries one job may make across all of its calls."""
+
+    def __init__(self, max_retries: int):
+        self.max_retries = max_retries
+        self.used = 0
+        self.exhausted = False
+
+    def try_acquire(self) -> bool:
+        if self.used >= self.max_retries:
+            self.exhausted = True
+            return False
+        self.used += 1
+        return True
+
+_retry_budget: ContextVar[Optional[RetryBudget]] = ContextVar("retry_budget", default=None)
+
+def start_retry_budget(num_calls: int) -> RetryBudget:
+    """Give the current job a budget proportional to its planned call count."""
+    budget = RetryBudget(max(RETRY_BUDGET_MIN, math.ceil(num_calls * RETRY_BUDGET_FRACTION)))
+    _retry_budget.set(budget)
+    return budget
+
+def take_retry(attempt: int, model: str) -> bool:
+    """
+    Whether a call that just failed may make another attempt.
+
+    Args:
+        attempt: Attempts the call has made so far
+        model: Model, for the metrics
+
+    Calls outside a job (no budget) are only bounded by MAX_ATTEMPTS_PER_CALL.
+    """
+    if attempt >= MAX_ATTEMPTS_PER_CALL:
+        metrics.increment("retries_refused", model=model, reason="call")
+        return False
+    budget = _retry_budget.get()
+    if budget is not None and not budget.try_acquire():
+        metrics.increment("retries_refused", model=model, reason="budget")
+        print(f"Retry budget of {budget.max_retries} spent, failing the call")
+        return False
+    metrics.increment("llm_retries", model=model)
+    return True
+
+def record_job_retries(budget: Optional[RetryBudget]) -> None:
+    """Add a finished job's retry count to the metrics."""
+    if budget is None:
+        return
+    if budget.used == 0:
+        bucket = "0"
+    elif budget.used <= 2:
+        bucket = "1-2"
+    elif budget.used <= 5:
+        bucket = "3-5"
+    else:
+        bucket = "6+"
+    metrics.increment("jobs_by_retries", retries=bucket)
+    metrics.increment("job_retries", budget.used)
+    if budget.exhausted:
+        metrics.increment("jobs_retry_budget_exhausted")
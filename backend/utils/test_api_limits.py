@@ -14,7 +14,9 @@ if not LLAMA_API_KEY:
     raise ValueError("LLAMA_API_KEY environment variable not set")
 
 # Constants
-GROQ_API_KEY = "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"
+GROQ_API_KEY = os.getenv("GROQ_API_KEY")
+if not GROQ_API_KEY:
+    raise ValueError("GROQ_API_KEY environment variable not set")
 GROQ_MODEL = "llama-3.1-8b-instant"
 MAX_TOKENS_PER_REQUEST = 4000  # Groq's recommended max
 RATE_LIMIT_TPM = 6000  # Tokens per minute limit